@@ -0,0 +1,257 @@
+import sys
+import gc
+import json
+
+'''
+Benchmarks of the driver and lights, so that the cost of dispatching tasks, building intersections and writing to the pins
+can be tracked from one change to the next. Each benchmark produces a single result (a JSON object per line), such that the
+results of two runs can be compared via compare().
+
+* dispatch - timings dispatched per second by the driver, for an increasing number of intersections
+* build - time and memory taken to build an increasing number of intersections
+* writes - pin writes issued (and skipped as redundant) per transition performed
+
+On CPython the benchmarks run against the mocks in tests/mocks (so the pins are not real, and the numbers are only good for
+comparing one run to another). On the board (micropython) they run against the actual pins, so the pins used must be free.
+The driver is run against a VirtualClock in both cases, so that the dispatching is timed without any of the waiting.
+
+Run from the root of the repository:
+
+python benchmarks/bench.py [results.ndjson]
+python benchmarks/bench.py --compare baseline.ndjson results.ndjson
+
+or on the board:
+
+import benchmarks.bench as bench
+bench.run()
+'''
+
+IS_MICROPYTHON = sys.implementation.name == 'micropython'
+
+if not IS_MICROPYTHON:
+    import os
+    import time
+    import tracemalloc
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.join(root, 'tests'))
+    sys.path.insert(0, root)
+    import mocks.mock_micropython
+    import mocks.micropython.mock_machine as mockMachine
+else:
+    import utime
+
+import common.driver
+from common.driver import Driver
+from common.virtualclock import VirtualClock
+from lights.trafficlight import IntersectionBuilder
+
+# Number of intersections for which the dispatch and build are measured
+SIZES = (1, 5, 10, 20)
+# Simulated time (ms) for which the intersections are driven
+DISPATCH_MS = 60 * 60 * 1000
+
+'''
+Get a timestamp (us) for timing the benchmarks
+'''
+def nowUs():
+    if IS_MICROPYTHON:
+        return utime.ticks_us()
+    return time.perf_counter_ns() // 1000
+
+'''
+Get the time (us) elapsed since the timestamp
+'''
+def elapsedUs(start):
+    if IS_MICROPYTHON:
+        return utime.ticks_diff(utime.ticks_us(), start)
+    return time.perf_counter_ns() // 1000 - start
+
+'''
+Start tracking the memory allocated, returning the baseline from which memoryUsed() is measured
+'''
+def memoryStart():
+    gc.collect()
+    if IS_MICROPYTHON:
+        return gc.mem_alloc()
+    tracemalloc.start()
+    return tracemalloc.get_traced_memory()[0]
+
+'''
+Get the memory (bytes) allocated since the baseline, and stop tracking
+'''
+def memoryUsed(baseline):
+    gc.collect()
+    if IS_MICROPYTHON:
+        return gc.mem_alloc() - baseline
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return used
+
+'''
+Driver which counts the number of times it triggers (the timings dispatched)
+'''
+class CountingDriver(Driver):
+
+    def __init__(self):
+        super(CountingDriver, self).__init__(Driver.MODE.ABSOLUTE, VirtualClock())
+        self.dispatched = 0
+
+    def _trigger(self):
+        self.dispatched += 1
+        Driver._trigger(self)
+
+'''
+Build the specified number of intersections (of 4 traffic lights each) with the driver.instance, with each using its own
+pins where available
+
+* count - number of intersections to build
+
+Returns the IntersectionBuilder of each intersection
+'''
+def buildIntersections(count):
+    builders = []
+    for i in range(count):
+        builder = IntersectionBuilder(IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 3)
+        for j in range(4):
+            pin = (i * 12 + j * 3) % 27
+            builder.addTrafficLight(pin, pin + 1, pin + 2, 10 + i % 7 + j * 5)
+        builder.build()
+        builders.append(builder)
+    return builders
+
+'''
+Clear what the mocked pins have logged, so that it doesn't grow throughout the benchmarks
+'''
+def resetPins():
+    if not IS_MICROPYTHON:
+        mockMachine.resetPinLog()
+
+'''
+Measure the number of timings dispatched per second for the number of intersections
+'''
+def benchDispatch(count):
+    driver = CountingDriver()
+    common.driver.instance = driver
+    builders = buildIntersections(count)
+    transitions = sum([len(b._table) for b in builders])
+
+    gc.collect()
+    start = nowUs()
+    driver.runFor(DISPATCH_MS)
+    elapsed = elapsedUs(start)
+    resetPins()
+    return {'benchmark': 'dispatch', 'intersections': count, 'transitions': transitions, 'dispatched': driver.dispatched,
+            'us': elapsed, 'perSec': driver.dispatched * 1000000 // max(elapsed, 1)}
+
+'''
+Measure the time and memory taken to build the number of intersections
+'''
+def benchBuild(count):
+    common.driver.instance = CountingDriver()
+    baseline = memoryStart()
+    start = nowUs()
+    buildIntersections(count)
+    elapsed = elapsedUs(start)
+    used = memoryUsed(baseline)
+    resetPins()
+    return {'benchmark': 'build', 'intersections': count, 'us': elapsed, 'bytes': used}
+
+'''
+Measure the number of pin writes issued (and skipped) per transition performed
+'''
+def benchWrites():
+    driver = CountingDriver()
+    common.driver.instance = driver
+    builders = buildIntersections(SIZES[-1])
+    before = [b.writeStats() for b in builders]
+    driver.runFor(DISPATCH_MS)
+
+    transitions = 0
+    for b in builders:
+        # Every transition of the table is performed once per cycle (plus those of the partial last cycle)
+        table = b._table
+        cycles = DISPATCH_MS // table.period()
+        remainder = DISPATCH_MS % table.period()
+        transitions += cycles * len(table) + len([t for t in table._times if t <= remainder])
+    issued = sum([b.writeStats()[0] for b in builders]) - sum([w[0] for w in before])
+    skipped = sum([b.writeStats()[1] for b in builders]) - sum([w[1] for w in before])
+    resetPins()
+    return {'benchmark': 'writes', 'intersections': SIZES[-1], 'transitions': transitions, 'issued': issued,
+            'skipped': skipped, 'issuedPerTransition': issued / transitions}
+
+'''
+Run all of the benchmarks
+
+* out - stream to which to write the results (one JSON object per line), or None (default) to print them
+
+Returns the list of results
+'''
+def run(out = None):
+    default = common.driver.instance
+    results = []
+    try:
+        for count in SIZES:
+            results.append(benchDispatch(count))
+        for count in SIZES:
+            results.append(benchBuild(count))
+        results.append(benchWrites())
+    finally:
+        common.driver.instance = default
+
+    platform = sys.implementation.name + ' ' + sys.platform
+    for result in results:
+        result['platform'] = platform
+        line = json.dumps(result)
+        if out is None:
+            print(line)
+        else:
+            out.write(line + '\n')
+    return results
+
+'''
+Load the results of a run from a file
+
+* path - of the file of results (one JSON object per line)
+'''
+def load(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+'''
+Compare the results of two runs, printing the change of each measurement from the baseline
+
+* baseline - list of results to compare against
+* results - list of results to compare
+
+Returns a list of (benchmark, intersections, measurement, baseline value, value, change %)
+'''
+def compare(baseline, results):
+    byKey = {}
+    for result in baseline:
+        byKey[(result['benchmark'], result['intersections'])] = result
+
+    changes = []
+    for result in results:
+        base = byKey.get((result['benchmark'], result['intersections']))
+        if base is None:
+            continue
+        for name in sorted(result.keys()):
+            value = result[name]
+            if name in ('benchmark', 'intersections', 'platform') or not name in base:
+                continue
+            change = 0 if base[name] == value else (value - base[name]) * 100 / base[name] if base[name] else None
+            changes.append((result['benchmark'], result['intersections'], name, base[name], value, change))
+
+    for change in changes:
+        percent = 'n/a' if change[5] is None else '%+.1f%%' % change[5]
+        print('%-8s %3d %-20s %12s -> %12s %s' % (change[0], change[1], change[2], change[3], change[4], percent))
+    return changes
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--compare':
+        compare(load(sys.argv[2]), load(sys.argv[3]))
+    elif len(sys.argv) == 2:
+        with open(sys.argv[1], 'w') as f:
+            run(f)
+    else:
+        run()
@@ -0,0 +1,72 @@
+from common.driver import Driver
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+"""
+Cooperative driver, which runs the registered tasks as a coroutine on the (u)asyncio event loop. Rather than blocking the
+thread while waiting for the next task(s), the driver awaits a sleep until their deadline, allowing any other coroutines
+(i.e.: polling of sensors, a serial console) to run on the same event loop in the meantime.
+
+As with the Driver in MODE.ABSOLUTE, deadlines are tracked from the start of the cycle, so the time taken by the tasks (or
+by other coroutines delaying the driver) does not accumulate. Registering tasks and stopping is the same as with the Driver.
+The driver can either be run as part of an existing event loop via run(), or start() can be used to hand control of the
+thread over to a new event loop that runs the driver.
+
+Example:
+
+driver = AsyncDriver()
+driver.register(1, myTask1)
+driver.register(2, myTask2)
+
+async def main():
+    asyncio.create_task(driver.run())
+    await pollSensors()
+
+asyncio.run(main())
+
+"""
+class AsyncDriver(Driver):
+
+    '''
+    CTOR
+    '''
+    def __init__(self):
+        super(AsyncDriver, self).__init__(Driver.MODE.ABSOLUTE)
+
+    """
+    Starts the driver by running it within a new event loop. This is a blocking call that will not return until after
+    the driver has been stopped. To run the driver alongside other coroutines, use run() instead.
+    """
+    def start(self):
+        asyncio.run(self.run())
+
+    """
+    Coroutine which runs the driver until it is stopped. It must be run within an event loop, whether awaited directly
+    or scheduled as a task (i.e.: asyncio.create_task(driver.run())).
+    """
+    async def run(self):
+        self._prepare()
+
+        print('Driver starting...')
+        while self._isAlive:
+            # Always yield to the event loop, even if the deadline has passed, so that other coroutines can progress
+            remaining = self._clock.ticks_diff(self._nextDeadline(), self._clock.ticks_ms())
+            if self._collectIfIdle(remaining):
+                remaining = self._clock.ticks_diff(self._nextDeadline(), self._clock.ticks_ms())
+            await _sleepMs(remaining if remaining > 0 else 0)
+            self._trigger()
+        self._thaw()
+
+'''
+Await the specified number of milliseconds. uasyncio provides sleep_ms directly, whereas CPython asyncio only sleeps in seconds.
+
+* ms - number of milliseconds to sleep
+'''
+if hasattr(asyncio, 'sleep_ms'):
+    _sleepMs = asyncio.sleep_ms
+else:
+    def _sleepMs(ms):
+        return asyncio.sleep(ms / 1000)
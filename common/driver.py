@@ -1,4 +1,11 @@
+import gc
 import utime
+import common.enum as enum
+
+try:
+    import heapq
+except ImportError:
+    import uheapq as heapq
 
 """
 Single threaded driver which will continuously loop through registered tasks, executing them at the specified intervals.
@@ -6,6 +13,10 @@ The driver runs in the same thread in which it is started, and all tasks are exe
 that each task will be quick and not delay proceedings. Multiple tasks registered at the same time will all be executed in
 the order they were registered when the appropriate time is reached.
 
+Internally all timings are tracked as integer milliseconds, so that no floating point math is required while the driver
+is running. Tasks can be registered either in seconds (including fractions of a second) via register, or directly in
+milliseconds via registerMs.
+
 The driver can be stopped, however given that the driver is synchronous, it must be called (whether directly or indirectly)
 by a registered task, or asynchronously. Stop will not immediately stop the driver, but rather prevent from moving on to
 calling the next task. Any wait in progress and the task waiting to trigger will still take place.
@@ -25,26 +36,194 @@ In this case:
 * 1 second after myTask3 completes myTask1 will be called
 * and so on
 
+Alternatively the driver can be created in MODE.ABSOLUTE, in which case each timing is treated as an absolute deadline
+relative to the start of the cycle (tracked via the millisecond tick counter). The driver then only sleeps for whatever
+time remains until the next deadline, so the time taken by the tasks (or any overshoot of the sleep) does not accumulate,
+and every cycle ends exactly on its period. In the example above myTask2 would be called 2 seconds after starting,
+regardless of how long myTask1 takes to complete.
+
+driver = Driver(Driver.MODE.ABSOLUTE)
+
+The driver can also be run against a VirtualClock in place of the actual time, in which case waiting for the next task(s)
+takes no time at all. Combined with runFor, this allows for hours of tasks to be simulated within moments.
+
+driver = Driver(Driver.MODE.ABSOLUTE, VirtualClock())
+driver.runFor(3600000)
+
+Tasks registered directly with the driver form a single cycle, however any number of additional Schedules (each with their
+own period) can be added to the driver. Each schedule repeats independently of the others, with the driver always moving
+on to whichever schedule has the next task(s) due (tracked via a heap, so finding the next task(s) is O(log n) in the number
+of schedules). Should multiple schedules have tasks due at the same time, they are triggered in the order in which the
+schedules were added (with the tasks registered directly with the driver first).
+
+schedule = Schedule(51000)
+schedule.register(0, myTask4)
+driver.add(schedule)
+
+To see how late each timing is triggered and how long its tasks take, the driver can be instrumented with a LatencyMonitor.
+When not instrumented the driver does no additional work.
+
+driver.instrument(LatencyMonitor())
+
+Should garbage collection pauses be a concern, the driver can be frozen before starting. All schedules are then frozen into
+preallocated structures, so that the loop allocates no memory, with automatic garbage collection disabled and garbage
+instead collected only when the driver is about to wait for a while anyway (or, should it never wait that long, at most
+a set time apart regardless).
+
+driver.freeze()
+
+Should a slow task, a garbage collection pause or a USB stall delay the driver past later deadlines, by default the
+missed tasks are all triggered as soon as possible (in order). In MODE.ABSOLUTE an overrun policy can instead be set, for
+the driver to skip the missed tasks, or coalesce them into a single trigger, so that the schedules are back in phase
+straight away. How often each policy was applied is counted.
+
+driver.overrun(Driver.OVERRUN.SKIP)
+
+Rather than only running at fixed times, tasks can be triggered by inputs (i.e.: a train detected by a sensor) through an
+EventSource added to the driver (in MODE.ABSOLUTE). Such tasks can in turn play a schedule, starting its cycle there and then, with a schedule
+created with repeat=False running through its cycle only once each time it is played.
+
+crossing = Schedule(repeat = False)
+crossing.register(0, lightsOn)
+crossing.register(30, lightsOff)
+driver.add(EventSource(Pin(5, Pin.IN), lambda: driver.play(crossing)))
+
+Effects with many steps (i.e.: a chase sequence, or a self test of all LEDs) can be written as a generator, and spawned as
+a Sequence. The driver resumes the generator in time slices between the deadlines of everything else, with the generator
+yielding a delay (ms) to wait before its next step, or nothing (None) at a step after which it may be paused should its time
+slice be used up.
+
+def chase():
+    for led in leds:
+        led.on()
+        yield 100
+        led.off()
+
+driver.spawn(chase())
+
 """
 class Driver:
-    
-    def __init__(self):
-        self._tasks = {}
-        self._timings = []
-        self._index = 0
-        self._currentTime = 0
+
+    # How the driver waits between tasks. RELATIVE waits the delay between timings after the tasks complete,
+    # ABSOLUTE waits until the deadline of the next timing
+    MODE = enum.create('RELATIVE', 'ABSOLUTE')
+
+    # How timings that are missed (when the following timing of the same schedule is also already due) are handled.
+    # CATCH_UP triggers every missed timing in order, SKIP triggers only the latest due timing, and COALESCE triggers the
+    # tasks of all missed timings together with the latest due timing, each task only once
+    OVERRUN = enum.create('CATCH_UP', 'SKIP', 'COALESCE')
+
+    # Once the time (ms) since the start reaches this, it is rebased so that it always remains a small int
+    _REBASE_AT = 1 << 28
+    # Spawned sequences are ordered after all schedules (in the order spawned), should they be due at the same time
+    _SPAWN_ORDER = 1 << 16
+
+    '''
+    CTOR
+
+    * mode - MODE indicating how the driver waits between tasks (default MODE.RELATIVE)
+    * clock - providing the ticks_ms/ticks_add/ticks_diff/sleep_ms functions through which the driver tracks and waits for
+              time (i.e.: a VirtualClock). If None (default) utime is used
+    '''
+    def __init__(self, mode = MODE.RELATIVE, clock = None):
+        self._default = Schedule()
+        self._schedules = [self._default]
+        self._queue = []
+        self._now = 0
+        self._rebased = 0
+        self._epoch = 0
         self._isAlive = False
+        self._mode = mode
+        self._clock = utime if clock is None else clock
+        self._monitor = None
+        self._gcIdleMs = None
+        self._gcMaxMs = None
+        self._collectedAt = 0
+        self._frozenWait = None
+        self._overrun = None
+        self._overruns = [0, 0, 0]
+        self._spawned = 0
     
+    """
+    Get the clock through which the driver tracks and waits for time (utime unless another clock was specified)
+    """
+    def clock(self):
+        return self._clock
+
     """
     Register a task with the driver
     
-    * time = timestamp in seconds when the task should be called (i.e.: number of seconds from start)
+    * time = timestamp in seconds when the task should be called (i.e.: number of seconds from start). Fractions
+             of a second are allowed, with the time rounded to the nearest millisecond
     * task = the task to call at the specified time (must be callable as task())
     """
     def register(self, time, task):
-        if not time in self._tasks:
-            self._tasks[time] = []
-        self._tasks[time].append(task)
+        self.registerMs(toMs(time), task)
+
+    """
+    Register a task with the driver, with the timestamp specified in milliseconds. This is the timebase which the
+    driver uses internally, as such no conversion is required.
+
+    * timeMs = timestamp in milliseconds (integer) when the task should be called (i.e.: number of milliseconds from start)
+    * task = the task to call at the specified time (must be callable as task())
+    """
+    def registerMs(self, timeMs, task):
+        self._default.registerMs(timeMs, task)
+
+    """
+    Add a schedule to the driver, which is run alongside all other schedules (and tasks registered directly with the driver)
+    but repeats with its own period.
+
+    * schedule - the Schedule to add
+    """
+    def add(self, schedule):
+        self._checkMode(schedule)
+        self._schedules.append(schedule)
+
+    """
+    Play the schedule, starting its cycle at the time of the task(s) currently being triggered (so it is intended to be
+    called from a task, i.e.: one triggered by an EventSource, but not one of the schedule itself). If the schedule is
+    already running its cycle is restarted,
+    and if it is not yet added to the driver it is added. When called before the driver is started, the schedule simply
+    starts along with all others.
+
+    * schedule - the Schedule to play
+    """
+    def play(self, schedule):
+        if not schedule in self._schedules:
+            self._checkMode(schedule)
+            self._schedules.append(schedule)
+        if not self._isAlive or not schedule.hasTasks():
+            return
+
+        self.cancel(schedule)
+        deadline = self._now + schedule._reset()
+        if self._gcIdleMs is not None:
+            schedule._freeze()
+        heapq.heappush(self._queue, [deadline, self._schedules.index(schedule), schedule])
+
+    '''
+    Ensure that the schedule can be run in the MODE of the driver, as an EventSource (which is dispatched every pollMs for
+    as long as the driver runs) requires MODE.ABSOLUTE
+
+    * schedule - to be run by the driver
+    '''
+    def _checkMode(self, schedule):
+        if self._mode != self.MODE.ABSOLUTE and isinstance(schedule, EventSource):
+            raise ValueError("EventSource requires MODE.ABSOLUTE", schedule)
+
+    """
+    Cancel the cycle of a schedule being played (or any other schedule), so that none of its remaining tasks are
+    triggered until it is next played (or the driver is restarted)
+
+    * schedule - the Schedule to cancel
+    """
+    def cancel(self, schedule):
+        for i in range(len(self._queue)):
+            if self._queue[i][2] is schedule:
+                self._queue.pop(i)
+                heapq.heapify(self._queue)
+                return
 
     """
     Starts the driver. This is a synchronous blocking call that will not return until after the driver
@@ -57,37 +236,328 @@ class Driver:
 
     """
     def start(self):
-        if not bool(self._tasks):
-            raise Exception("Cannot start driver if it has no tasks registered")
-        
-        self._isAlive = True
-        self._index = 0
-        self._organizeTasks()
+        self._prepare()
         
         # Some kind of output is required for VS Code/pico-w-go to connect and control the execution
         print('Driver starting...')
+        self._run()
+
+    '''
+    Run the (prepared) driver until it is stopped
+    '''
+    def _run(self):
+        wait = self._waitFunction()
         while self._isAlive:
             # Wait to trigger the next task(s)
-            nextTaskTime = self._timings[self._index]
-            utime.sleep(nextTaskTime - self._currentTime)
-            
-            # Trigger the next task(s)
-            for task in self._tasks[nextTaskTime]:
-                task()
-                
-            # Move on to the next task(s)
-            self._index += 1
-            self._currentTime = nextTaskTime
-            if self._index >= len(self._timings):
-                self._index = 0
-                self._currentTime = 0
-    
+            wait(self._queue[0][0])
+            self._trigger()
+        self._thaw()
+
+    """
+    Runs the driver for the specified duration, triggering all tasks which are due within it. This is a synchronous blocking
+    call which returns once the duration has elapsed (or the driver is stopped). When the driver employs a VirtualClock, the
+    waiting takes no actual time, so hours of tasks can be run (i.e.: simulated) within moments.
+
+    * durationMs - the time (ms) from the start for which to run. Note in RELATIVE mode this is the time according to the
+                   schedule(s), which does not include the time taken by the tasks themselves
+    """
+    def runFor(self, durationMs):
+        self._prepare()
+
+        wait = self._waitFunction()
+        while self._isAlive and self._rebased + self._queue[0][0] <= durationMs:
+            wait(self._queue[0][0])
+            self._trigger()
+
+        # Wait out whatever remains of the duration
+        if self._isAlive:
+            wait(durationMs - self._rebased)
+            self._now = durationMs - self._rebased
+        self._isAlive = False
+        self._thaw()
+
+    """
+    Freeze the driver, so that its loop allocates no memory while running (avoiding garbage collection pauses at random
+    moments). On start all schedules are frozen into preallocated structures and automatic garbage collection is disabled,
+    with garbage instead being collected explicitly only when the time until the next deadline is at least gcIdleMs (so that
+    any pause takes place while the driver would be waiting anyway). Should no wait be that long (i.e.: a fast flasher, a
+    Fader or an EventSource keep the driver busy), garbage is collected before the next wait regardless once gcMaxMs has
+    passed since the last collection, so that the heap never runs out. Automatic garbage collection is re-enabled once the
+    driver stops. Note that while frozen, tasks registered after starting are only picked up once the driver is restarted.
+
+    * gcIdleMs - minimum time (ms) until the next deadline for garbage to be collected (default 50). None to unfreeze
+    * gcMaxMs - maximum time (ms) between collections, after which garbage is collected even if the driver is not idle for
+                long enough (default 1000). None to only ever collect when idle
+    """
+    def freeze(self, gcIdleMs = 50, gcMaxMs = 1000):
+        if gcMaxMs is not None and gcMaxMs <= 0:
+            raise ValueError("Maximum time between collections must be greater than 0", gcMaxMs)
+        self._gcIdleMs = gcIdleMs
+        self._gcMaxMs = gcMaxMs
+
+    """
+    Spawn a generator as a Sequence, which the driver resumes in time slices until the generator is exhausted. When
+    called before the driver is started, the sequence starts along with the schedules, otherwise it starts at the time of
+    the task(s) currently being triggered.
+
+    * generator - to run, yielding the delay (ms) until its next step, None at steps after which its time slice may end,
+                  or 0 to hand back to the driver right away
+    * budgetMs - time (ms) for which the generator runs at most before handing back to the driver (default 5)
+
+    Returns the Sequence
+    """
+    def spawn(self, generator, budgetMs = 5):
+        sequence = Sequence(self, generator, budgetMs)
+        if not self._isAlive:
+            self._schedules.append(sequence)
+        else:
+            self._spawned += 1
+            deadline = self._now + sequence._reset()
+            heapq.heappush(self._queue, [deadline, self._SPAWN_ORDER + self._spawned, sequence])
+        return sequence
+
     '''
-    Organize registered tasks in preparation for running
+    Prepare the driver to start running all of the schedules from the beginning
     '''
-    def _organizeTasks(self):
-        self._timings = list(self._tasks.keys())
-        self._timings.sort()
+    def _prepare(self):
+        self._queue = []
+        for order in range(len(self._schedules)):
+            schedule = self._schedules[order]
+            if schedule.hasTasks():
+                heapq.heappush(self._queue, [schedule._reset(), order, schedule])
+
+        if not self._queue:
+            raise Exception("Cannot start driver if it has no tasks registered")
+
+        if self._gcIdleMs is not None:
+            for entry in self._queue:
+                entry[2]._freeze()
+            gc.collect()
+            gc.disable()
+            self._collectedAt = self._clock.ticks_ms()
+
+        self._isAlive = True
+        self._now = 0
+        self._rebased = 0
+        self._epoch = self._clock.ticks_ms()
+
+    '''
+    Get the function through which to wait, as per the MODE of the driver
+    '''
+    def _waitFunction(self):
+        wait = self._waitAbsolute if self._mode == self.MODE.ABSOLUTE else self._waitRelative
+        if self._gcIdleMs is None:
+            return wait
+        self._frozenWait = wait
+        return self._waitCollecting
+
+    '''
+    Wait as per the MODE of the driver, collecting garbage first should there be enough time until the specified time
+
+    * time - (ms) from the start until which to wait
+    '''
+    def _waitCollecting(self, time):
+        start = self._clock.ticks_ms()
+        if self._mode == self.MODE.ABSOLUTE:
+            remaining = self._clock.ticks_diff(self._clock.ticks_add(self._epoch, time), start)
+        else:
+            remaining = time - self._now
+        if self._collectIfIdle(remaining) and self._mode != self.MODE.ABSOLUTE:
+            # The collection takes up part of the wait (in MODE.ABSOLUTE the wait is until the deadline, so it already is)
+            remaining -= self._clock.ticks_diff(self._clock.ticks_ms(), start)
+            if remaining > 0:
+                self._clock.sleep_ms(remaining)
+            return
+        self._frozenWait(time)
+
+    '''
+    Collect garbage if the driver is frozen and the time remaining until the next deadline allows for it, or regardless
+    should gcMaxMs have passed since garbage was last collected
+
+    * remaining - time (ms) until the next deadline
+
+    Returns True if garbage was collected (i.e.: the time remaining must be recalculated)
+    '''
+    def _collectIfIdle(self, remaining):
+        if self._gcIdleMs is None:
+            return False
+        now = self._clock.ticks_ms()
+        if remaining >= self._gcIdleMs or (self._gcMaxMs is not None and
+                                           self._clock.ticks_diff(now, self._collectedAt) >= self._gcMaxMs):
+            gc.collect()
+            self._collectedAt = self._clock.ticks_ms()
+            return True
+        return False
+
+    '''
+    Restore automatic garbage collection once a frozen driver stops
+    '''
+    def _thaw(self):
+        if self._gcIdleMs is not None:
+            gc.enable()
+
+    '''
+    Wait the difference between the specified time and the time of the last triggered task(s), as that is
+    what remains after the tasks have completed
+
+    * time - (ms) from the start until which to wait
+    '''
+    def _waitRelative(self, time):
+        self._clock.sleep_ms(time - self._now)
+
+    '''
+    Wait only for the time remaining until the specified time. Deadlines are tracked in ticks (milliseconds) from
+    the start of the driver, with the wrap around of the tick counter accounted for via ticks_add/ticks_diff.
+
+    * time - (ms) from the start until which to wait
+    '''
+    def _waitAbsolute(self, time):
+        remaining = self._clock.ticks_diff(self._clock.ticks_add(self._epoch, time), self._clock.ticks_ms())
+        if remaining > 0:
+            self._clock.sleep_ms(remaining)
+
+    '''
+    Get the deadline (in ticks) of the next task(s) to trigger
+    '''
+    def _nextDeadline(self):
+        return self._clock.ticks_add(self._epoch, self._queue[0][0])
+
+    '''
+    Trigger the next task(s) that are due, and queue the schedule they belong to for its subsequent task(s)
+    '''
+    def _trigger(self):
+        entry = heapq.heappop(self._queue)
+        self._now = entry[0]
+        delay = entry[2]._fire()
+        if delay is not None:
+            entry[0] += delay
+            heapq.heappush(self._queue, entry)
+        elif not self._queue:
+            # The schedule has run its (only) cycle, and nothing else remains to be triggered
+            self._isAlive = False
+
+        if self._now >= self._REBASE_AT:
+            self._rebase()
+
+    '''
+    Trigger the next task(s) as with _trigger, recording how late they were triggered and how long they took in the
+    monitor. Only employed in place of _trigger while the driver is instrumented.
+    '''
+    def _triggerInstrumented(self):
+        if self._overrun is not None:
+            self._applyOverrun()
+        clock = self._clock
+        time = self._queue[0][0]
+        deadline = clock.ticks_add(self._epoch, time)
+        timeMs = self._rebased + time
+
+        start = clock.ticks_ms()
+        Driver._trigger(self)
+        end = clock.ticks_ms()
+        self._monitor.record(timeMs, clock.ticks_diff(start, deadline), clock.ticks_diff(end, start))
+
+    """
+    Instrument the driver, recording how late each timing is triggered and how long its tasks take to execute in the
+    specified monitor. The instrumented trigger replaces the regular one only while a monitor is set, so that the driver
+    does no additional work when not instrumented.
+
+    * monitor - LatencyMonitor in which to record the samples, or None to remove the instrumentation
+    """
+    def instrument(self, monitor):
+        self._monitor = monitor
+        self._selectTrigger()
+
+    """
+    Set how the driver handles timings which are missed, when it is delayed past the deadline of the following timing
+    of the same schedule (i.e.: by a slow task or a garbage collection pause). Only applicable in MODE.ABSOLUTE, as in
+    MODE.RELATIVE the timings are never late (the delay simply shifts all following timings). Note that SKIP drops the tasks
+    of the missed timings of a Schedule outright, so COALESCE is to be preferred for tasks which set state (i.e.: turn a
+    light on or off).
+
+    * policy - OVERRUN policy to apply, or None (default) for missed timings to be triggered in order without them being
+               checked for or counted (the driver then does no additional work)
+    """
+    def overrun(self, policy):
+        if policy is not None and self._mode != self.MODE.ABSOLUTE:
+            raise ValueError("Overrun policy requires MODE.ABSOLUTE", policy)
+        if policy is not None and not policy in (self.OVERRUN.CATCH_UP, self.OVERRUN.SKIP, self.OVERRUN.COALESCE):
+            raise ValueError("Invalid overrun policy", policy)
+        self._overrun = policy
+        self._selectTrigger()
+
+    """
+    Get the number of missed timings which each policy was applied to
+
+    Returns a tupple of (caughtUp, skipped, coalesced)
+    """
+    def overrunStats(self):
+        return tuple(self._overruns)
+
+    """
+    Reset the counts of missed timings
+    """
+    def resetOverrunStats(self):
+        self._overruns = [0, 0, 0]
+
+    '''
+    Select the trigger to employ, so that the additional work of instrumenting or checking for missed timings is only
+    done when required
+    '''
+    def _selectTrigger(self):
+        if self._monitor is not None:
+            self._trigger = self._triggerInstrumented
+        elif self._overrun is not None:
+            self._trigger = self._triggerOverrun
+        else:
+            try:
+                del self._trigger
+            except AttributeError:
+                pass
+
+    '''
+    Trigger the next task(s) as with _trigger, first applying the overrun policy. Only employed in place of _trigger while
+    an overrun policy is set.
+    '''
+    def _triggerOverrun(self):
+        self._applyOverrun()
+        Driver._trigger(self)
+
+    '''
+    Apply the overrun policy to the next timing should the following timing of the same schedule also already be due,
+    so that the next timing to trigger is the latest one due. Moving a schedule on past its missed timings pushes its
+    deadline back, so it is taken off the heap while doing so (as with _trigger) and pushed back into its place, with the
+    policy then applied to whichever timing is next instead.
+    '''
+    def _applyOverrun(self):
+        queue = self._queue
+        policy = self._overrun
+        nowMs = self._clock.ticks_diff(self._clock.ticks_ms(), self._epoch)
+
+        entry = queue[0]
+        while entry[0] + entry[2]._nextDelay() <= nowMs:
+            if policy == self.OVERRUN.CATCH_UP:
+                self._overruns[policy] += 1
+                return
+
+            # Popped and pushed back rather than replaced, as uheapq has no heapreplace (and the flushed tasks may queue others)
+            heapq.heappop(queue)
+            timeline = entry[2]
+            while entry[0] + timeline._nextDelay() <= nowMs:
+                entry[0] += timeline._coalesce() if policy == self.OVERRUN.COALESCE else timeline._skip()
+                self._overruns[policy] += 1
+            timeline._flush()
+            heapq.heappush(queue, entry)
+            entry = queue[0]
+
+    '''
+    Move the start of the driver up to the current time, so that the time tracked since the start remains small
+    '''
+    def _rebase(self):
+        for entry in self._queue:
+            entry[0] -= self._now
+        self._epoch = self._clock.ticks_add(self._epoch, self._now)
+        self._rebased += self._now
+        self._now = 0
 
     """
     Stops the driver from progressing past the current task. Note that any task currently waiting to be triggered
@@ -97,6 +567,570 @@ class Driver:
     def stop(self):
         self._isAlive = False
 
+"""
+A cyclic schedule of tasks with its own period, which is run by a Driver alongside any other schedules that are added to it.
+Each schedule repeats independently of all others, so that for example two intersections with periods of 51 and 96 seconds
+both remain periodic when run by the same driver (without needing to combine their cycles into one).
+
+Tasks are registered at a time from the start of the cycle, with the cycle repeating once the period has elapsed. If no
+period is specified, the cycle is as long as the latest registered task (the tasks at the start of the next cycle follow
+immediately after the tasks at the end of the current one).
+
+Example:
+
+schedule = Schedule(51000)
+schedule.register(0, myTask1)
+schedule.register(20, myTask2)
+driver.add(schedule)
+
+"""
+class Schedule:
+
+    '''
+    CTOR
+
+    * periodMs - the period of the schedule in milliseconds (default None, the period is the latest registered task)
+    * repeat - whether the cycle repeats (default True). If False the schedule runs through its cycle once (each time it
+               is played), being dropped by the driver once its last task(s) are triggered
+    '''
+    def __init__(self, periodMs = None, repeat = True):
+        if periodMs is not None and periodMs <= 0:
+            raise ValueError("Period must be greater than 0", periodMs)
+
+        self._tasks = {}
+        self._timings = []
+        self._index = 0
+        self._periodMs = periodMs
+        self._repeat = repeat
+        self._cycleMs = 0
+        self._deferred = []
+
+    '''
+    Register a task with the schedule
+
+    * time = timestamp in seconds from the start of the cycle when the task should be called (fractions of a second are allowed)
+    * task = the task to call at the specified time (must be callable as task())
+    '''
+    def register(self, time, task):
+        self.registerMs(toMs(time), task)
+
+    '''
+    Register a task with the schedule, with the timestamp specified in milliseconds
+
+    * timeMs = timestamp in milliseconds (integer) from the start of the cycle when the task should be called
+    * task = the task to call at the specified time (must be callable as task())
+    '''
+    def registerMs(self, timeMs, task):
+        if self._periodMs is not None and timeMs > self._periodMs:
+            raise ValueError("Time is beyond the period of the schedule", timeMs)
+
+        if not timeMs in self._tasks:
+            self._tasks[timeMs] = []
+        self._tasks[timeMs].append(task)
+
+    '''
+    Check whether any tasks are registered with the schedule
+    '''
+    def hasTasks(self):
+        return bool(self._tasks)
+
+    '''
+    Get the period (ms) of the schedule
+    '''
+    def period(self):
+        if self._periodMs is not None:
+            return self._periodMs
+        return max(self._tasks.keys())
+
+    '''
+    Prepare the schedule to run from the start of its cycle
+
+    Returns the time (ms) from the start at which the first task(s) are due
+    '''
+    def _reset(self):
+        try:
+            del self._fire
+        except AttributeError:
+            pass
+
+        self._timings = list(self._tasks.keys())
+        self._timings.sort()
+        self._index = 0
+        self._cycleMs = self.period()
+        self._deferred = []
+        return self._timings[0]
+
+    '''
+    Trigger the task(s) that are due and move on to the next ones. Once the last task(s) are triggered the
+    schedule returns to the start of its cycle.
+
+    Returns the time (ms) from now at which the next task(s) are due, None if the schedule does not repeat and its
+    last task(s) were triggered
+    '''
+    def _fire(self):
+        currentTime = self._timings[self._index]
+        for task in self._tasks[currentTime]:
+            task()
+
+        self._index += 1
+        if self._index >= len(self._timings):
+            self._index = 0
+            if not self._repeat:
+                return None
+            return self._cycleMs - currentTime + self._timings[0]
+        return self._timings[self._index] - currentTime
+
+    '''
+    Get the time (ms) from the timing that is due until the one following it
+    '''
+    def _nextDelay(self):
+        timings = self._timings
+        index = self._index
+        if index + 1 < len(timings):
+            return timings[index + 1] - timings[index]
+        if not self._repeat:
+            # Nothing follows the last timing, so it can never be missed
+            return _NEVER
+        return self._cycleMs - timings[index] + timings[0]
+
+    '''
+    Move on past the timing that is due, without triggering its task(s). The tasks are dropped, as those of a schedule are
+    opaque (unlike the transitions of an EventTable, their effect cannot be carried over): whatever state a skipped task
+    would have set is lost until the task is next triggered. Tasks which set state should be coalesced instead.
+
+    Returns the time (ms) from the skipped timing at which the next task(s) are due
+    '''
+    def _skip(self):
+        delay = self._nextDelay()
+        self._index = self._index + 1 if self._index + 1 < len(self._timings) else 0
+        return delay
+
+    '''
+    Move on past the timing that is due, deferring its task(s) to be triggered along with those of the following timing
+    (via _flush). Should a task be deferred more than once, it is only triggered once (in the order of its last deferral).
+
+    Returns the time (ms) from the deferred timing at which the next task(s) are due
+    '''
+    def _coalesce(self):
+        deferred = self._deferred
+        for task in self._tasks[self._timings[self._index]]:
+            if task in deferred:
+                deferred.remove(task)
+            deferred.append(task)
+        return self._skip()
+
+    '''
+    Trigger the deferred task(s) ahead of firing the timing that is due, other than those which that timing triggers anyway
+    '''
+    def _flush(self):
+        deferred = self._deferred
+        if not deferred:
+            return
+        self._deferred = []
+        due = self._tasks[self._timings[self._index]]
+        for task in deferred:
+            if not task in due:
+                task()
+
+    '''
+    Resync the (running) schedule after tasks have been registered with it, so that any new timings are picked up without
+    restarting its cycle. New timings which fall between the last triggered task(s) and the timing which was next due (within
+    the same cycle) are included, with the schedule otherwise continuing on from the timing which was next due.
+
+    * nextDeadline - time (ms from the start of the driver) at which the schedule was next due
+    * now - time (ms from the start of the driver) of the last triggered task(s)
+
+    Returns the time (ms from the start of the driver) at which the schedule is now next due
+    '''
+    def _resync(self, nextDeadline, now):
+        nextTime = self._timings[self._index]
+        cycleStart = nextDeadline - nextTime
+
+        self._timings = list(self._tasks.keys())
+        self._timings.sort()
+        self._cycleMs = self.period()
+        index = 0
+        while self._timings[index] < nextTime and cycleStart + self._timings[index] <= now:
+            index += 1
+        self._index = index
+        return cycleStart + self._timings[index]
+
+    '''
+    Freeze the schedule (once reset) into preallocated structures, with the tasks of each timing and the delay until the
+    following timing prepared ahead of time. Until the schedule is next reset, it is fired without allocating any memory
+    (tasks registered in the meantime are not picked up).
+    '''
+    def _freeze(self):
+        timings = self._timings
+        self._slots = tuple(tuple(self._tasks[t]) for t in timings)
+        delays = [timings[i + 1] - timings[i] for i in range(len(timings) - 1)]
+        delays.append(self._cycleMs - timings[-1] + timings[0] if self._repeat else None)
+        self._delays = tuple(delays)
+        self._fire = self._fireFrozen
+
+    '''
+    Trigger the task(s) that are due as with _fire, from the frozen structures. Only employed once frozen.
+
+    Returns the time (ms) from now at which the next task(s) are due, None if the schedule does not repeat and its
+    last task(s) were triggered
+    '''
+    def _fireFrozen(self):
+        index = self._index
+        tasks = self._slots[index]
+        for i in range(len(tasks)):
+            tasks[i]()
+
+        self._index = index + 1 if index + 1 < len(self._slots) else 0
+        return self._delays[index]
+
+    '''
+    Get the position of the schedule within its cycle, so that it can be kept while the board is reset (i.e.: by a deepsleep)
+    '''
+    def _position(self):
+        return self._index
+
+    '''
+    Continue on from a position within the cycle (once reset), as kept via _position. The task(s) ahead of the position are
+    not triggered again, so whatever they set up before the board was reset is not restored.
+
+    * position - within the cycle
+
+    Returns True if resumed, False if the position is not within the cycle
+    '''
+    def _resume(self, position):
+        if position < 0 or position >= len(self._timings):
+            return False
+        self._index = position
+        return True
+
+"""
+Source of events from an input pin (i.e.: a sensor detecting a train), which triggers a task on each event. The edges of
+the pin are caught via Pin.irq, so that no event is missed in between, however the task is not called from the IRQ. Instead
+the IRQ only counts the event, with the source (added to a driver alongside its schedules) dispatching the counted events
+to the task on the driver thread every pollMs. The task is thus free to allocate memory and to play schedules on the driver.
+
+Contact bounce is filtered out within the IRQ, with any edge within debounceMs of the last event being ignored. The IRQ
+itself allocates no memory, and the counts of the IRQ and driver thread are kept apart (each only ever incremented by one
+side), so that no locking is required.
+
+As the IRQ cannot wake a driver which is waiting, the source remains queued for as long as the driver runs, with the driver
+woken every pollMs to dispatch the events. The source thus requires MODE.ABSOLUTE (in MODE.RELATIVE the time taken by each
+dispatch would accumulate as drift on all schedules), and the driver never waits longer than pollMs at a time (i.e.: a
+SleepDriver only lightsleeps should pollMs exceed its threshold, and never deepsleeps). The poll time is thus a trade off
+between how quickly the events are handled and how long the board can sleep. Likewise a frozen driver is never idle for
+gcIdleMs (unless pollMs is at least as long), so it collects garbage every gcMaxMs instead (see Driver.freeze).
+
+Example:
+
+sensor = EventSource(Pin(5, Pin.IN, Pin.PULL_UP), trainDetected, debounceMs = 50, trigger = Pin.IRQ_FALLING)
+driver.add(sensor)
+"""
+class EventSource:
+
+    '''
+    CTOR
+
+    * pin - the (input) machine.Pin from which the events come
+    * task - the task to call on each event (must be callable as task())
+    * debounceMs - time (ms) after an event during which further edges are ignored as bounces (default 20)
+    * trigger - the edge(s) of the pin on which an event occurs (default None, the rising edge Pin.IRQ_RISING)
+    * pollMs - time (ms) between the events being dispatched by the driver (default 10)
+    * clock - providing ticks_ms/ticks_diff through which the bounces are timed. If None (default) utime is used
+    '''
+    def __init__(self, pin, task, debounceMs = 20, trigger = None, pollMs = 10, clock = None):
+        if debounceMs < 0:
+            raise ValueError("Debounce time cannot be negative", debounceMs)
+        if pollMs <= 0:
+            raise ValueError("Poll time must be greater than 0", pollMs)
+
+        self._pin = pin
+        self._task = task
+        self._debounceMs = debounceMs
+        self._edges = pin.IRQ_RISING if trigger is None else trigger
+        self._pollMs = pollMs
+        self._clock = utime if clock is None else clock
+        # Only incremented by the IRQ
+        self._raised = 0
+        self._bounced = 0
+        self._lastMs = 0
+        # Only incremented by the driver thread
+        self._handled = 0
+        # The bound method is created once, as no allocation is allowed within the IRQ
+        self._onIrqRef = self._onIrq
+        self.enable()
+
+    '''
+    Enable the IRQ of the pin, so that its events are picked up
+    '''
+    def enable(self):
+        self._pin.irq(handler=self._onIrqRef, trigger=self._edges)
+
+    '''
+    Disable the IRQ of the pin, with no further events being picked up (those already picked up are still dispatched)
+    '''
+    def disable(self):
+        self._pin.irq(handler=None)
+
+    '''
+    Get the number of events picked up, and the number of edges ignored as bounces
+
+    Returns a tupple of (events, bounced)
+    '''
+    def stats(self):
+        return (self._raised, self._bounced)
+
+    '''
+    IRQ handler, counting the event unless it is a bounce of the last one. Must not allocate memory.
+
+    * pin - which raised the IRQ
+    '''
+    def _onIrq(self, pin):
+        now = self._clock.ticks_ms()
+        if self._raised != 0 and self._clock.ticks_diff(now, self._lastMs) < self._debounceMs:
+            self._bounced += 1
+            return
+        self._lastMs = now
+        self._raised += 1
+
+    '''
+    Call the task for each event which has been picked up since the last dispatch (on the driver thread)
+    '''
+    def _dispatch(self):
+        while self._handled != self._raised:
+            self._handled += 1
+            self._task()
+
+    '''
+    The source always runs, so that events are dispatched whenever they come
+    '''
+    def hasTasks(self):
+        return True
+
+    '''
+    Get the period (ms) of the source, being the time between dispatches
+    '''
+    def period(self):
+        return self._pollMs
+
+    '''
+    Prepare the source to run
+
+    Returns the time (ms) from the start at which the events are first dispatched
+    '''
+    def _reset(self):
+        return self._pollMs
+
+    '''
+    Dispatch the events that have been picked up
+
+    Returns the time (ms) from now at which the events are next dispatched
+    '''
+    def _fire(self):
+        self._dispatch()
+        return self._pollMs
+
+    '''
+    Get the time (ms) until the following dispatch
+    '''
+    def _nextDelay(self):
+        return self._pollMs
+
+    '''
+    Move on past the dispatch that is due, leaving the events to the following one (so none are lost)
+
+    Returns the time (ms) until the next dispatch
+    '''
+    def _skip(self):
+        return self._pollMs
+
+    '''
+    Skip the dispatch that is due, as with _skip
+
+    Returns the time (ms) until the next dispatch
+    '''
+    def _coalesce(self):
+        return self._pollMs
+
+    '''
+    Nothing is deferred by skipped dispatches
+    '''
+    def _flush(self):
+        pass
+
+    '''
+    Dispatching allocates nothing of its own (beyond what the task does), so there is nothing to prepare
+    '''
+    def _freeze(self):
+        pass
+
+    '''
+    The events picked up by the IRQ are lost when the board is reset, so the source has no position which can be kept
+    '''
+    def _position(self):
+        return None
+
+    '''
+    The source cannot continue on from a position
+    '''
+    def _resume(self, position):
+        return False
+
+"""
+Long running task, in the form of a generator, which is resumed by a Driver in time slices between the deadlines of
+everything else that it drives (so that the timings of the schedules are not held up). Created via Driver.spawn.
+
+Each time the sequence is due, the generator is resumed and runs until it yields:
+
+* a delay (ms) - its next step is due the delay after the current step was due (so a sequence of steps does not drift)
+* None - it is at a step after which it can be paused, and carries straight on unless it has used up budgetMs of time
+* 0 - it hands back to the driver right away
+
+When its time slice is used up (or it yields 0), the sequence is resumed once the task(s) which became due in the meantime
+have been triggered. Once the generator is exhausted, the sequence is dropped by the driver.
+"""
+class Sequence:
+
+    '''
+    CTOR
+
+    * driver - by which the sequence is run
+    * generator - to run
+    * budgetMs - time (ms) for which the generator runs at most before handing back to the driver (less should anything
+                 else queued with the driver be due sooner)
+    '''
+    def __init__(self, driver, generator, budgetMs):
+        if budgetMs <= 0:
+            raise ValueError("Time budget must be greater than 0", budgetMs)
+
+        self._generator = generator
+        self._budgetMs = budgetMs
+        self._driver = driver
+        self._clock = driver._clock
+        self._isAbsolute = driver._mode == Driver.MODE.ABSOLUTE
+        self._dueTicks = None
+        self._isDone = False
+
+    '''
+    Check whether the generator has been exhausted
+    '''
+    def isDone(self):
+        return self._isDone
+
+    '''
+    Check whether the sequence remains to be run
+    '''
+    def hasTasks(self):
+        return not self._isDone
+
+    '''
+    A sequence has no period, as it doesn't repeat
+    '''
+    def period(self):
+        return None
+
+    '''
+    Prepare the sequence to run
+
+    Returns the time (ms) from the start at which it is first due (right away)
+    '''
+    def _reset(self):
+        self._dueTicks = None
+        return 0
+
+    '''
+    Resume the generator for a time slice, which ends once the budget is used up or the next deadline queued with the
+    driver is reached (whichever comes first), so that the sequence never holds up what is due in the meantime
+
+    Returns the time (ms) from when the sequence was due at which it is next due, None once the generator is exhausted
+    '''
+    def _fire(self):
+        clock = self._clock
+        start = clock.ticks_ms()
+        if self._dueTicks is None:
+            self._dueTicks = start
+
+        sliceMs = self._budgetMs
+        driver = self._driver
+        if driver._queue:
+            if self._isAbsolute:
+                untilNext = clock.ticks_diff(driver._nextDeadline(), start)
+            else:
+                untilNext = driver._queue[0][0] - driver._now
+            if untilNext < sliceMs:
+                sliceMs = untilNext
+
+        generator = self._generator
+        while True:
+            try:
+                delay = next(generator)
+            except StopIteration:
+                self._isDone = True
+                return None
+
+            if delay is None and clock.ticks_diff(clock.ticks_ms(), start) < sliceMs:
+                continue
+            if not delay:
+                # Hand back, to be resumed once whatever became due in the meantime has been triggered
+                delay = clock.ticks_diff(clock.ticks_ms(), self._dueTicks) if self._isAbsolute else 0
+                if delay < 1:
+                    delay = 1
+            self._dueTicks = clock.ticks_add(self._dueTicks, delay)
+            return delay
+
+    '''
+    Get the time (ms) until the sequence is next due, which is not known until it is resumed (so it is never missed)
+    '''
+    def _nextDelay(self):
+        return _NEVER
+
+    '''
+    A sequence is never missed, so nothing is ever skipped
+    '''
+    def _skip(self):
+        return _NEVER
+
+    '''
+    A sequence is never missed, so nothing is ever coalesced
+    '''
+    def _coalesce(self):
+        return _NEVER
+
+    '''
+    Nothing is deferred by a sequence
+    '''
+    def _flush(self):
+        pass
+
+    '''
+    The generator allocates as it runs, so there is nothing to prepare (spawn sequences sparingly on a frozen driver)
+    '''
+    def _freeze(self):
+        pass
+
+    '''
+    The state of the generator is lost when the board is reset, so the sequence has no position which can be kept
+    '''
+    def _position(self):
+        return None
+
+    '''
+    The sequence cannot continue on from a position
+    '''
+    def _resume(self, position):
+        return False
+
+# Delay which is never reached (while tracked times are rebased), for timings which nothing follows
+_NEVER = 1 << 30
+
+"""
+Convert a time in seconds to the millisecond timebase employed by the driver. Fractions of a second are rounded to the
+nearest millisecond, with the result always being an integer.
+
+* sec - the time in seconds to convert
+"""
+def toMs(sec):
+    return round(sec * 1000)
+
 """
 Singleton style instance that is avaiable for use as a shared driver among different users, so as to allow different
 task creators to easily obtain the same driver and all tasks to be handled within the same thread
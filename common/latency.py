@@ -0,0 +1,138 @@
+from array import array
+
+"""
+Records how late each dispatch of a Driver fires and how long the tasks at each timing take to run. Once a monitor is
+provided to a driver (via Driver.instrument), every timing that is triggered records a sample of:
+
+* the time (ms from the start of the driver) at which the tasks were scheduled
+* how late (ms) the tasks were triggered compared to their deadline
+* how long (ms) the tasks took to execute
+
+The samples are kept in a fixed size ring buffer (preallocated arrays), so that once full the oldest samples are replaced
+by the newest and no memory is allocated as samples are recorded. Alongside the samples a histogram of the lateness is
+maintained, along with the totals and worst cases since the monitor was last reset, so that the overall behavior remains
+available no matter how many samples have been overwritten.
+
+Note that in Driver.MODE.RELATIVE the deadlines drift by the time taken by the tasks, so the lateness recorded includes
+that accumulated drift.
+
+Example (i.e.: over the REPL or serial):
+
+monitor = LatencyMonitor()
+driver.instrument(monitor)
+... driver runs for a while ...
+monitor.report()
+"""
+class LatencyMonitor:
+
+    # Upper bounds (ms, inclusive) of the histogram buckets, with a final bucket for anything later than the last bound
+    BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+    '''
+    CTOR
+
+    * size - the number of samples to keep (default 64)
+    '''
+    def __init__(self, size = 64):
+        if size <= 0:
+            raise ValueError("Sample buffer size must be positive", size)
+
+        self._times = array('l', [0] * size)
+        self._late = array('l', [0] * size)
+        self._durations = array('l', [0] * size)
+        self._histogram = array('l', [0] * (len(self.BUCKETS) + 1))
+        self.reset()
+
+    '''
+    Clear all samples and statistics
+    '''
+    def reset(self):
+        self._next = 0
+        self._count = 0
+        self._totalLate = 0
+        self._totalDuration = 0
+        self._maxLate = 0
+        self._maxDuration = 0
+        for i in range(len(self._histogram)):
+            self._histogram[i] = 0
+
+    '''
+    Record a sample. Called by the driver as each timing is triggered.
+
+    * timeMs - time (ms from the start of the driver) at which the tasks were scheduled
+    * lateMs - how late (ms) the tasks were triggered
+    * durationMs - how long (ms) the tasks took to execute
+    '''
+    def record(self, timeMs, lateMs, durationMs):
+        index = self._next
+        self._times[index] = timeMs
+        self._late[index] = lateMs
+        self._durations[index] = durationMs
+        index += 1
+        self._next = 0 if index == len(self._times) else index
+        self._count += 1
+
+        self._totalLate += lateMs
+        self._totalDuration += durationMs
+        if lateMs > self._maxLate:
+            self._maxLate = lateMs
+        if durationMs > self._maxDuration:
+            self._maxDuration = durationMs
+
+        bucket = 0
+        for bound in self.BUCKETS:
+            if lateMs <= bound:
+                break
+            bucket += 1
+        self._histogram[bucket] += 1
+
+    '''
+    Get the total number of samples recorded since the last reset (including those which have since been overwritten)
+    '''
+    def count(self):
+        return self._count
+
+    '''
+    Get the samples currently held in the buffer, oldest first, as a list of tupples (timeMs, lateMs, durationMs)
+    '''
+    def samples(self):
+        size = len(self._times)
+        if self._count < size:
+            indices = range(self._count)
+        else:
+            indices = [(self._next + i) % size for i in range(size)]
+        return [(self._times[i], self._late[i], self._durations[i]) for i in indices]
+
+    '''
+    Get the histogram of the lateness as a list of tupples (upper bound (ms), number of samples), with the upper bound of the
+    final bucket being None
+    '''
+    def histogram(self):
+        bounds = list(self.BUCKETS) + [None]
+        return [(bounds[i], self._histogram[i]) for i in range(len(bounds))]
+
+    '''
+    Get the overall statistics as a tupple of (count, mean lateness, worst lateness, mean duration, worst duration), with
+    all times in ms
+    '''
+    def stats(self):
+        if self._count == 0:
+            return (0, 0, 0, 0, 0)
+        return (self._count, self._totalLate / self._count, self._maxLate,
+                self._totalDuration / self._count, self._maxDuration)
+
+    '''
+    Print the statistics, histogram and samples (i.e.: to be read over the REPL or serial)
+    '''
+    def report(self):
+        count, meanLate, maxLate, meanDuration, maxDuration = self.stats()
+        print('Samples:', count)
+        print('Late (ms): mean', meanLate, 'max', maxLate)
+        print('Duration (ms): mean', meanDuration, 'max', maxDuration)
+        for bound, num in self.histogram():
+            if bound is None:
+                print('  late >', self.BUCKETS[-1], ':', num)
+            else:
+                print('  late <=', bound, ':', num)
+        for time, late, duration in self.samples():
+            print(' ', time, late, duration)
@@ -0,0 +1,197 @@
+from common.driver import Driver
+import machine
+import struct
+
+try:
+    import heapq
+except ImportError:
+    import uheapq as heapq
+
+"""
+Power aware driver, for boards which run on batteries. Rather than keeping the core fully awake while waiting for the next
+task(s), the driver enters machine.lightsleep whenever the time until the next deadline is at least lightSleepMs, and only
+sleeps normally (utime.sleep_ms) for shorter gaps. The board is woken wakeMarginMs ahead of the deadline, with the remainder
+slept normally, so that the time taken to wake up does not delay the tasks. How late the board actually wakes is tracked,
+and available via wakeStats() to tune the margin.
+
+Optionally, for gaps of at least deepSleepMs, the driver enters machine.deepsleep instead. As the board is reset when waking
+from a deep sleep, the position of the driver (the time until the next deadline of each schedule, and how far into its
+cycle each schedule is) is kept in RTC memory. After the reset, the same tasks must be registered (in the same order) and
+the driver resumed via resume(), at which point it continues on from where it was before sleeping. EventTables place their
+LEDs into the levels they have at the restored position, whereas the tasks of Schedules are not triggered again (so
+whatever they set up ahead of the position is not restored). Only the position of
+Schedules and EventTables can be kept, so while anything else is queued (i.e.: an EventSource, a Sequence or a fading
+Fader) the driver lightsleeps rather than deepsleeps.
+
+As with the Driver in MODE.ABSOLUTE, deadlines are tracked from the start of the cycle, so neither the time taken by the
+tasks nor the time taken to wake up accumulates.
+
+Example:
+
+driver = SleepDriver(lightSleepMs=100, deepSleepMs=60000)
+driver.register(1, myTask1)
+driver.register(300, myTask2)
+driver.resume()
+
+"""
+class SleepDriver(Driver):
+
+    # Identifies the position of the driver stored in RTC memory
+    _MAGIC = 0x5D1E
+    _HEADER = '<HHq'
+    _ENTRY = '<Hii'
+
+    '''
+    CTOR
+
+    * lightSleepMs - minimum time (ms) until the next deadline for the board to lightsleep (default 50). None to never
+                     lightsleep
+    * deepSleepMs - minimum time (ms) until the next deadline for the board to deepsleep (default None, never deepsleep)
+    * wakeMarginMs - how early (ms) ahead of the deadline the board is to wake up (default 5)
+    '''
+    def __init__(self, lightSleepMs = 50, deepSleepMs = None, wakeMarginMs = 5):
+        super(SleepDriver, self).__init__(Driver.MODE.ABSOLUTE)
+        if wakeMarginMs < 0:
+            raise ValueError("Wake margin cannot be negative", wakeMarginMs)
+        if lightSleepMs is not None and lightSleepMs <= wakeMarginMs:
+            raise ValueError("Light sleep threshold must be greater than the wake margin", lightSleepMs)
+        if deepSleepMs is not None and deepSleepMs <= wakeMarginMs:
+            raise ValueError("Deep sleep threshold must be greater than the wake margin", deepSleepMs)
+
+        self._lightSleepMs = lightSleepMs
+        self._deepSleepMs = deepSleepMs
+        self._wakeMarginMs = wakeMarginMs
+        self._rtc = None if deepSleepMs is None else machine.RTC()
+        self.resetWakeStats()
+
+    """
+    Resume the driver after waking from a deepsleep, continuing on from the position stored in RTC memory. Should no position
+    be stored (or it does not match the registered schedules), the driver starts from the beginning as with start. This is a
+    synchronous blocking call that will not return until after the driver has been stopped.
+    """
+    def resume(self):
+        self._prepare()
+        if self._rtc is not None and self._restore(self._rtc.memory()):
+            print('Driver resuming...')
+        else:
+            print('Driver starting...')
+        self._run()
+
+    '''
+    Wait until the specified time, sleeping (light or deep) for as much of it as the thresholds allow
+
+    * time - (ms) from the start until which to wait
+    '''
+    def _waitAbsolute(self, time):
+        clock = self._clock
+        deadline = clock.ticks_add(self._epoch, time)
+        remaining = clock.ticks_diff(deadline, clock.ticks_ms())
+        while remaining > 0:
+            if self._deepSleepMs is not None and remaining >= self._deepSleepMs:
+                data = self._save()
+                # Should the position of anything queued not be kept, the board lightsleeps instead
+                if data is not None:
+                    self._rtc.memory(data)
+                    machine.deepsleep(remaining - self._wakeMarginMs)
+
+            if self._lightSleepMs is None or remaining < self._lightSleepMs:
+                clock.sleep_ms(remaining)
+                return
+
+            sleepMs = remaining - self._wakeMarginMs
+            wakeAt = clock.ticks_add(clock.ticks_ms(), sleepMs)
+            machine.lightsleep(sleepMs)
+            self._recordWake(sleepMs, clock.ticks_diff(clock.ticks_ms(), wakeAt))
+
+            # Woken either ahead of the deadline (as intended, or by some other source) or beyond it
+            remaining = clock.ticks_diff(deadline, clock.ticks_ms())
+
+    '''
+    Record the waking from a lightsleep
+
+    * sleptMs - the time (ms) for which the sleep was requested
+    * lateMs - how late the board woke up, negative if woken early (in which case no latency is recorded)
+    '''
+    def _recordWake(self, sleptMs, lateMs):
+        self._sleeps += 1
+        self._sleptMs += sleptMs
+        if lateMs > 0:
+            self._totalLatencyMs += lateMs
+            if lateMs > self._maxLatencyMs:
+                self._maxLatencyMs = lateMs
+
+    """
+    Get the statistics of the lightsleeps since the last reset, as a tupple of (number of sleeps, total time (ms) requested
+    to sleep, mean wake latency (ms), worst wake latency (ms)). The wake latency is how late the board woke up compared to
+    the time requested, with early wakes counting as 0.
+    """
+    def wakeStats(self):
+        if self._sleeps == 0:
+            return (0, 0, 0, 0)
+        return (self._sleeps, self._sleptMs, self._totalLatencyMs / self._sleeps, self._maxLatencyMs)
+
+    """
+    Reset the statistics of the lightsleeps
+    """
+    def resetWakeStats(self):
+        self._sleeps = 0
+        self._sleptMs = 0
+        self._totalLatencyMs = 0
+        self._maxLatencyMs = 0
+
+    '''
+    Pack the position of the driver, with the deadlines relative to the next one, for storing in RTC memory
+
+    Returns the packed position, None if the position of anything queued (i.e.: an EventSource or Sequence) cannot be kept
+    '''
+    def _save(self):
+        base = self._queue[0][0]
+        data = struct.pack(self._HEADER, self._MAGIC, len(self._queue), self._rebased + base)
+        for entry in self._queue:
+            position = entry[2]._position()
+            if position is None:
+                return None
+            data += struct.pack(self._ENTRY, entry[1], entry[0] - base, position)
+        return data
+
+    '''
+    Restore the position of the (prepared) driver from what was stored in RTC memory, with the next deadline being due
+    right away. The stored position is cleared, so that it is only resumed once.
+
+    * data - stored in RTC memory
+
+    Returns True if the position was restored, False if the data does not match the schedules of the driver (which are then
+    left at the start of their cycles)
+    '''
+    def _restore(self, data):
+        headerSize = struct.calcsize(self._HEADER)
+        entrySize = struct.calcsize(self._ENTRY)
+        if len(data) < headerSize:
+            return False
+        magic, count, elapsed = struct.unpack_from(self._HEADER, data)
+        if magic != self._MAGIC or count != len(self._queue) or len(data) != headerSize + count * entrySize:
+            return False
+
+        byOrder = {}
+        for entry in self._queue:
+            byOrder[entry[1]] = entry
+        positions = [struct.unpack_from(self._ENTRY, data, headerSize + i * entrySize) for i in range(count)]
+        for order, deadline, position in positions:
+            if not order in byOrder:
+                return False
+
+        for order, deadline, position in positions:
+            entry = byOrder[order]
+            if not entry[2]._resume(position):
+                # Start everything from the beginning after all (placing whatever was already resumed back at the start)
+                for queued in self._queue:
+                    queued[2]._resume(0)
+                self._prepare()
+                return False
+            entry[0] = deadline
+        heapq.heapify(self._queue)
+
+        self._rebased = elapsed
+        self._epoch = self._clock.ticks_ms()
+        self._rtc.memory(b'')
+        return True
@@ -0,0 +1,257 @@
+from common.driver import Driver
+import _thread
+
+try:
+    import heapq
+except ImportError:
+    import uheapq as heapq
+
+"""
+Driver which runs in a thread of its own (on the RP2040, on the second core), so that neither the REPL nor any other work
+on the main thread (core) is blocked, and the timing of the tasks is not disturbed by whatever load the main thread is
+under. start returns immediately once the driver thread has been started.
+
+While the driver is running, it must only be modified via its thread safe methods (registerMs/register, add, pause, resume,
+call and stop). Rather than modifying the schedules directly, these post commands to a lock protected queue, which the
+driver thread applies between triggering tasks. So that commands are picked up promptly, the driver thread never waits
+more than pollMs at a time.
+
+As with the Driver in MODE.ABSOLUTE, deadlines are tracked from the start of the cycle, so the time taken by the tasks does
+not accumulate.
+
+Example:
+
+driver = ThreadDriver()
+driver.register(1, myTask1)
+driver.register(2, myTask2)
+driver.start()
+... main thread is free to do other things ...
+driver.register(1.5, myTask3)
+driver.pause()
+driver.resume()
+driver.stop()
+
+"""
+class ThreadDriver(Driver):
+
+    '''
+    CTOR
+
+    * pollMs - the maximum time (ms) the driver thread waits before checking for commands (default 20)
+    * clock - providing the ticks_ms/ticks_add/ticks_diff/sleep_ms functions through which the driver tracks and waits for
+              time. If None (default) utime is used
+    '''
+    def __init__(self, pollMs = 20, clock = None):
+        super(ThreadDriver, self).__init__(Driver.MODE.ABSOLUTE, clock)
+        if pollMs <= 0:
+            raise ValueError("Poll time must be greater than 0", pollMs)
+
+        self._pollMs = pollMs
+        self._lock = _thread.allocate_lock()
+        self._running = _thread.allocate_lock()
+        self._commands = []
+        self._isPaused = False
+        self._pausedAt = 0
+
+    """
+    Starts the driver in a new thread. Returns immediately, with the tasks being triggered by the driver thread until
+    the driver is stopped.
+    """
+    def start(self):
+        self._prepare()
+        self._isPaused = False
+
+        print('Driver starting...')
+        self._running.acquire()
+        _thread.start_new_thread(self._run, ())
+
+    """
+    Wait (blocking) until the driver thread has stopped
+    """
+    def join(self):
+        self._running.acquire()
+        self._running.release()
+
+    """
+    Register a task with the driver, with the timestamp specified in milliseconds. If the driver is running, the task is
+    registered by the driver thread (and is triggered from the next time its timing comes around).
+
+    * timeMs = timestamp in milliseconds (integer) when the task should be called (i.e.: number of milliseconds from start)
+    * task = the task to call at the specified time (must be callable as task())
+    """
+    def registerMs(self, timeMs, task):
+        if self._isAlive:
+            self._post(self._registerNow, (self._default, timeMs, task))
+        else:
+            super(ThreadDriver, self).registerMs(timeMs, task)
+
+    """
+    Add a schedule to the driver. If the driver is running, the schedule is added by the driver thread with its cycle
+    starting at that moment.
+
+    * schedule - the Schedule to add
+    """
+    def add(self, schedule):
+        if self._isAlive:
+            self._post(self._addNow, (schedule,))
+        else:
+            super(ThreadDriver, self).add(schedule)
+
+    """
+    Call the function from the driver thread, between the triggering of tasks. This allows for anything which the driver
+    runs (i.e.: a schedule or the tasks themselves) to be safely changed while the driver is running. Note that changing
+    the timings of a schedule requires it to be resynced, which is done by registering tasks via registerTo.
+
+    * function - to call
+    * args - to call the function with
+    """
+    def call(self, function, *args):
+        self._post(function, args)
+
+    """
+    Register a task with a schedule which has been added to the driver. If the driver is running, the task is registered
+    by the driver thread.
+
+    * schedule - with which to register the task
+    * timeMs = timestamp in milliseconds (integer) from the start of the cycle when the task should be called
+    * task = the task to call at the specified time (must be callable as task())
+    """
+    def registerTo(self, schedule, timeMs, task):
+        if self._isAlive:
+            self._post(self._registerNow, (schedule, timeMs, task))
+        else:
+            schedule.registerMs(timeMs, task)
+
+    """
+    Pause the driver, so that no tasks are triggered until it is resumed. The deadlines are moved on by the time the driver
+    was paused for, so that it continues on from where it left off.
+    """
+    def pause(self):
+        self._post(self._pauseNow, ())
+
+    """
+    Resume the paused driver
+    """
+    def resume(self):
+        self._post(self._resumeNow, ())
+
+    """
+    Check whether the driver is paused
+    """
+    def isPaused(self):
+        return self._isPaused
+
+    '''
+    Queue a command to be applied by the driver thread
+
+    * function - to call
+    * args - tupple of the arguments to call the function with
+    '''
+    def _post(self, function, args):
+        with self._lock:
+            self._commands.append((function, args))
+
+    '''
+    Apply all queued commands (from the driver thread)
+    '''
+    def _applyCommands(self):
+        with self._lock:
+            commands = self._commands
+            self._commands = []
+        for function, args in commands:
+            function(*args)
+
+    '''
+    Run the driver until it is stopped (from the driver thread). When frozen, garbage is collected (once) ahead of each
+    deadline which leaves enough idle time for it.
+    '''
+    def _run(self):
+        clock = self._clock
+        collected = None
+        try:
+            while self._isAlive:
+                if self._commands:
+                    self._applyCommands()
+                    continue
+
+                if self._isPaused:
+                    clock.sleep_ms(self._pollMs)
+                    continue
+
+                deadline = self._nextDeadline()
+                remaining = clock.ticks_diff(deadline, clock.ticks_ms())
+                if remaining > 0:
+                    if collected != deadline and self._collectIfIdle(remaining):
+                        collected = deadline
+                        continue
+                    clock.sleep_ms(remaining if remaining < self._pollMs else self._pollMs)
+                else:
+                    self._trigger()
+        finally:
+            self._thaw()
+            self._running.release()
+
+    '''
+    Get the current time (ms) from the start of the driver
+    '''
+    def _currentMs(self):
+        return self._clock.ticks_diff(self._clock.ticks_ms(), self._epoch)
+
+    '''
+    Register the task with the schedule (from the driver thread), resyncing the schedule to the time of the driver
+
+    * schedule - with which to register the task
+    * timeMs - timestamp in milliseconds from the start of the cycle
+    * task - to register
+    '''
+    def _registerNow(self, schedule, timeMs, task):
+        schedule.registerMs(timeMs, task)
+        for entry in self._queue:
+            if entry[2] is schedule:
+                entry[0] = schedule._resync(entry[0], self._now)
+                if self._gcIdleMs is not None:
+                    schedule._freeze()
+                heapq.heapify(self._queue)
+                return
+
+        # The schedule had nothing registered, so it starts its cycle now
+        if schedule in self._schedules:
+            self._queueNow(schedule, self._schedules.index(schedule))
+
+    '''
+    Add the schedule (from the driver thread), with its cycle starting now
+
+    * schedule - to add
+    '''
+    def _addNow(self, schedule):
+        self._schedules.append(schedule)
+        if schedule.hasTasks():
+            self._queueNow(schedule, len(self._schedules) - 1)
+
+    '''
+    Queue the schedule (from the driver thread), with its cycle starting now
+
+    * schedule - to queue
+    * order - of the schedule within the driver
+    '''
+    def _queueNow(self, schedule, order):
+        deadline = self._currentMs() + schedule._reset()
+        if self._gcIdleMs is not None:
+            schedule._freeze()
+        heapq.heappush(self._queue, [deadline, order, schedule])
+
+    '''
+    Pause the driver (from the driver thread)
+    '''
+    def _pauseNow(self):
+        if not self._isPaused:
+            self._isPaused = True
+            self._pausedAt = self._clock.ticks_ms()
+
+    '''
+    Resume the driver (from the driver thread), moving the deadlines on by the time paused
+    '''
+    def _resumeNow(self):
+        if self._isPaused:
+            self._isPaused = False
+            self._epoch = self._clock.ticks_add(self._epoch, self._clock.ticks_diff(self._clock.ticks_ms(), self._pausedAt))
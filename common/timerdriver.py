@@ -0,0 +1,97 @@
+from common.driver import Driver
+from machine import Timer
+import micropython
+
+"""
+Interrupt driven driver, which rather than blocking the thread in which it is started, employs a hardware timer (machine.Timer)
+to trigger the registered tasks. For each subsequent timing a one shot timer is armed for the time remaining until its deadline,
+and when the timer fires the tasks are dispatched via micropython.schedule (i.e.: outside of the IRQ context, as the tasks are
+free to allocate memory). Once the tasks have been triggered, the timer is armed for the next timing.
+
+As with the Driver in MODE.ABSOLUTE, deadlines are tracked from the start of the cycle, so the time taken by the tasks does not
+accumulate. Registering tasks, starting and stopping is the same as with the Driver, however start returns immediately leaving
+the thread free to perform other work (i.e.: REPL remains available).
+
+Example:
+
+driver = TimerDriver()
+driver.register(1, myTask1)
+driver.register(2, myTask2)
+driver.start()
+... main thread is free to do other things ...
+driver.stop()
+
+"""
+class TimerDriver(Driver):
+
+    '''
+    CTOR
+
+    * timerId - the id of the hardware timer to employ (default -1, a virtual timer)
+    '''
+    def __init__(self, timerId = -1):
+        super(TimerDriver, self).__init__(Driver.MODE.ABSOLUTE)
+        self._timerId = timerId
+        self._timer = None
+        # Bound methods are created once, as no allocation is allowed within the IRQ
+        self._onTimerRef = self._onTimer
+        self._dispatchRef = self._dispatch
+
+    """
+    Starts the driver. This is not a blocking call, the first timer is armed and the call returns immediately. All of the
+    tasks are triggered from the timer (via micropython.schedule) until the driver is stopped.
+    """
+    def start(self):
+        self._prepare()
+
+        print('Driver starting...')
+        self._timer = Timer(self._timerId)
+        self._arm()
+
+    '''
+    Arm the timer to fire at the deadline of the next task(s). Should the deadline have already been reached, the
+    dispatch is scheduled right away.
+    '''
+    def _arm(self):
+        remaining = self._clock.ticks_diff(self._nextDeadline(), self._clock.ticks_ms())
+        if self._collectIfIdle(remaining):
+            remaining = self._clock.ticks_diff(self._nextDeadline(), self._clock.ticks_ms())
+        if remaining > 0:
+            self._timer.init(mode=Timer.ONE_SHOT, period=remaining, callback=self._onTimerRef)
+        else:
+            micropython.schedule(self._dispatchRef, None)
+
+    '''
+    Timer callback, called within the IRQ context. The dispatching of the tasks is deferred via micropython.schedule.
+
+    * timer - which fired
+    '''
+    def _onTimer(self, timer):
+        micropython.schedule(self._dispatchRef, None)
+
+    '''
+    Trigger the tasks which are due and arm the timer for the next ones. Should nothing remain to be triggered, automatic
+    garbage collection is restored (if frozen) as the driver has stopped.
+
+    * arg - required by micropython.schedule (unused)
+    '''
+    def _dispatch(self, arg):
+        if not self._isAlive:
+            return
+
+        self._trigger()
+        if self._isAlive:
+            self._arm()
+        else:
+            # Nothing remains to be triggered, so the driver has stopped (as start would have returned for the Driver)
+            self._thaw()
+
+    """
+    Stops the driver. The timer is disabled so that no further tasks are triggered. If called from a task, the remaining tasks
+    registered for the same time will still be triggered.
+    """
+    def stop(self):
+        self._isAlive = False
+        if self._timer is not None:
+            self._timer.deinit()
+        self._thaw()
@@ -0,0 +1,88 @@
+"""
+Clock which simulates the passing of time, in place of the actual time provided by utime. Time only moves forward when
+slept (or explicitly advanced), at which point it jumps instantly to the end of the sleep. A Driver employing a virtual
+clock thus moves from one task to the next without any actual waiting, allowing for hours (or days) of a layout to be run
+within moments (i.e.: to verify the behavior of a schedule on a laptop or as part of a test, without any hardware).
+
+The tick counter behaves as the micropython one does, wrapping around once it reaches TICKS_PERIOD, with the time elapsed
+since the clock was created available (without wrapping) via elapsedMs().
+
+Example:
+
+clock = VirtualClock()
+driver = Driver(Driver.MODE.ABSOLUTE, clock)
+... register tasks ...
+driver.runFor(24 * 3600 * 1000)
+print(clock.elapsedMs())
+"""
+class VirtualClock:
+
+    # The tick counter wraps around at this period (as with micropython)
+    TICKS_PERIOD = 1 << 30
+    TICKS_MAX = TICKS_PERIOD - 1
+    TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+    '''
+    CTOR
+
+    * startTicks - the value of the tick counter when the clock is created (default 0)
+    '''
+    def __init__(self, startTicks = 0):
+        self._ticks = startTicks & self.TICKS_MAX
+        self._elapsed = 0
+
+    '''
+    Get the current value of the (millisecond) tick counter
+    '''
+    def ticks_ms(self):
+        return self._ticks
+
+    '''
+    Offset the ticks by the specified delta, wrapping around as required
+
+    * ticks - to offset
+    * delta - (ms) to offset by, can be negative
+    '''
+    def ticks_add(self, ticks, delta):
+        return (ticks + delta) & self.TICKS_MAX
+
+    '''
+    Get the signed difference between two tick values (ticks1 - ticks2), accounting for the wrap around
+
+    * ticks1 - from which to subtract
+    * ticks2 - to subtract
+    '''
+    def ticks_diff(self, ticks1, ticks2):
+        return ((ticks1 - ticks2 + self.TICKS_HALFPERIOD) & self.TICKS_MAX) - self.TICKS_HALFPERIOD
+
+    '''
+    Sleep for the specified time, which moves the clock forward instantly
+
+    * ms - the number of milliseconds to sleep for
+    '''
+    def sleep_ms(self, ms):
+        self.advance(ms)
+
+    '''
+    Sleep for the specified time, which moves the clock forward instantly
+
+    * sec - the number of seconds to sleep for
+    '''
+    def sleep(self, sec):
+        self.advance(round(sec * 1000))
+
+    '''
+    Move the clock forward by the specified time
+
+    * ms - the number of milliseconds to move forward by (negative values are ignored)
+    '''
+    def advance(self, ms):
+        if ms > 0:
+            self._ticks = (self._ticks + ms) & self.TICKS_MAX
+            self._elapsed += ms
+
+    '''
+    Get the time (ms) which has elapsed since the clock was created
+    '''
+    def elapsedMs(self):
+        return self._elapsed
@@ -0,0 +1,620 @@
+from array import array
+import struct
+
+"""
+Compact, array backed, table of the transitions of lights over a cycle, which can be added to a Driver in place of a
+Schedule. Rather than registering a callable per transition (each a separate object on the heap), the transitions are
+compiled into packed arrays of (time, channel, level), with each channel identifying a single LED (aspect) of a light.
+When driven, the table is walked by a single dispatcher which places each LED into its scheduled state, without any
+allocation taking place per transition. If the lights are controlled through an output (i.e.: a PortBank), the output is
+committed once all transitions taking place at the same time have been performed.
+
+Transitions are added light by light (in the form of LightActions), and once all are added the table must be compiled
+before it can be driven. Transitions that take place at the same time are performed in the order in which they were added.
+
+Example:
+
+table = EventTable(90000)
+table.addPattern(trafficLight1, actions1)
+table.addPattern(trafficLight2, actions2)
+table.compile()
+driver.add(table)
+
+While the table is being driven, the pattern of a light can be replaced (or added/removed) and the period changed. Such
+changes are staged, and only spliced into the packed arrays at the end of the period of the current cycle (or when the table
+is next reset), so that the phase of the cycle is kept. Changes staged after the last transition of a cycle are spliced in at
+the end of the following cycle. Only the transitions of the changed lights are computed, with the remaining transitions
+carried over as they are in a single merging pass. The merging pass (O(n) in the number of transitions) takes place when the
+change is staged, outside of the dispatch, with the merged arrays held alongside the current ones until the cycle boundary,
+where they are swapped in without any further allocation. When spliced, each changed light is placed into the state it would
+be in at the start of its new cycle (the level of the last transition of each of its LEDs, off if there are none).
+
+The changes are validated as they are staged, with a ValueError raised to the caller (and nothing staged) should any
+transition fall beyond the period, so that nothing is raised from within the dispatch. When shortening the period, the
+lights with transitions beyond the new period must thus be changed first (or along with it). Several changes can be staged
+as a single batch via stageChanges, which validates them against the new period as a whole and merges them in one pass.
+
+table.setPeriod(95000)
+table.replacePattern(trafficLight2, newActions2)
+...
+table.stageChanges([(trafficLight1, newActions1), (trafficLight3, None)], 85000)
+
+Once compiled, the table can be saved as a binary blob (i.e.: to flash), and loaded back in on a later boot instead of
+computing the patterns and compiling them again. The blob is validated by a hash of the config it was compiled from (which
+is up to the creator of the table to determine), and is only loaded if the hash, and the number of channels of the lights,
+match.
+
+with open('table.bin', 'wb') as f:
+    table.save(f, configHash)
+...
+table = EventTable(90000)
+with open('table.bin', 'rb') as f:
+    if not table.load(f, [trafficLight1, trafficLight2], configHash):
+        ... add the patterns and compile ...
+"""
+class EventTable:
+
+    # Maximum number of channels (LEDs) that a single table can control
+    MAX_CHANNELS = 256
+
+    # Header of a saved table (magic, item size of the times, config hash, period, number of channels and transitions)
+    _HEADER = '<HBIIHH'
+    _MAGIC = 0xE7AB
+
+    '''
+    CTOR
+
+    * periodMs - the period (ms) of the cycle of the table
+    '''
+    def __init__(self, periodMs):
+        if periodMs <= 0:
+            raise ValueError("Period must be greater than 0", periodMs)
+
+        self._periodMs = periodMs
+        self._lights = []
+        self._aspects = bytearray()
+        self._firstChannel = {}
+        self._times = array('I')
+        self._channels = bytearray()
+        self._levels = bytearray()
+        self._outputs = []
+        self._pending = []
+        self._index = 0
+        self._staged = {}
+        self._stagedPeriod = None
+        self._merged = None
+        self._initial = []
+        self._markClock = None
+        self._firstTicks = None
+        self._deferred = bytearray()
+        self._hasDeferred = False
+
+    '''
+    Add the transitions for a light to the table
+
+    * light - whose LEDs are to be transitioned (a Light, or anything providing numAspects(), _set(aspect, isOn) and
+              _output through which the LEDs are controlled or None)
+    * actions - list of LightActions to perform (which aspect (colour), which state, at which time)
+    '''
+    def addPattern(self, light, actions):
+        # Pending transitions are kept when staged changes are spliced in, so must also fall within any staged period
+        period = self._periodMs if self._stagedPeriod is None else min(self._periodMs, self._stagedPeriod)
+        self._checkActions(light, actions, period)
+        first = self._addLight(light)
+        for act in actions:
+            self._pending.append((act._time, first + act._colour, 1 if act._isOn else 0))
+
+    '''
+    Stage a batch of changes, to take effect together at the next cycle boundary. The whole batch is validated against the
+    period the table will have once the changes are spliced in (raising a ValueError, with nothing staged, should any
+    transition fall beyond it), and is merged with the rest of the table in a single pass.
+
+    * changes - list of tupples (light, actions), with actions being the list of LightActions making up the new pattern of
+                the light (which is added if not already part of the table), or None for all transitions of the light to
+                be removed (with all of its LEDs turned off, its channels remaining allocated)
+    * periodMs - the new period (ms) of the cycle of the table, None (default) to keep the period
+    '''
+    def stageChanges(self, changes, periodMs = None):
+        if periodMs is not None and periodMs <= 0:
+            raise ValueError("Period must be greater than 0", periodMs)
+        period = periodMs
+        if period is None:
+            period = self._periodMs if self._stagedPeriod is None else self._stagedPeriod
+
+        changed = {}
+        for light, actions in changes:
+            if actions is None:
+                if not light in self._firstChannel:
+                    raise ValueError("Light is not part of the table")
+            else:
+                self._checkActions(light, actions, period)
+            changed[light] = True
+        if periodMs is not None:
+            self._checkKept(changed, period)
+
+        for light, actions in changes:
+            rows = []
+            if actions is not None:
+                first = self._addLight(light)
+                for act in actions:
+                    rows.append((act._time, first + act._colour, 1 if act._isOn else 0))
+                rows.sort(key=lambda t: t[0])
+            self._staged[light] = rows
+        if periodMs is not None:
+            self._stagedPeriod = periodMs
+        self._prepareSplice()
+
+    '''
+    Stage the replacement of all transitions of a light (or the adding of a light), to take effect at the next cycle boundary
+
+    * light - whose transitions are to be replaced
+    * actions - list of LightActions making up the new pattern of the light
+    '''
+    def replacePattern(self, light, actions):
+        self.stageChanges([(light, actions)])
+
+    '''
+    Stage the removal of all transitions of a light, to take effect (with all of its LEDs turned off) at the next cycle
+    boundary. The channels of the light remain allocated.
+
+    * light - whose transitions are to be removed
+    '''
+    def removePattern(self, light):
+        self.stageChanges([(light, None)])
+
+    '''
+    Stage a change of the period, to take effect at the next cycle boundary. All transitions which are kept (those of the
+    lights without staged changes) must fall within the new period, so when shortening the period the patterns of the
+    affected lights are to be staged first (or along with it via stageChanges).
+
+    * periodMs - the new period (ms) of the cycle of the table
+    '''
+    def setPeriod(self, periodMs):
+        self.stageChanges([], periodMs)
+
+    '''
+    Validate the actions of a light
+
+    * light - whose LEDs the actions transition
+    * actions - list of LightActions to validate
+    * period - (ms) within which all actions must fall
+    '''
+    def _checkActions(self, light, actions, period):
+        for act in actions:
+            if act._time > period:
+                raise ValueError("Time is beyond the period of the table", act._time)
+            if act._colour < 0 or act._colour >= light.numAspects():
+                raise ValueError("Invalid aspect specified", act._colour)
+
+    '''
+    Ensure that the transitions which are kept when the changes are spliced in fall within the period
+
+    * changed - dict of the lights which are (about to be) changed, in addition to those already staged
+    * period - (ms) within which the kept transitions must fall
+    '''
+    def _checkKept(self, changed, period):
+        replaced = bytearray(len(self._lights))
+        for light in self._firstChannel:
+            if light in changed or light in self._staged:
+                first = self._firstChannel[light]
+                for aspect in range(light.numAspects()):
+                    replaced[first + aspect] = 1
+        for i in range(len(self._times)):
+            if self._times[i] > period and not replaced[self._channels[i]]:
+                raise ValueError("Time is beyond the period of the table", self._times[i])
+        for light in self._staged:
+            if not light in changed:
+                for row in self._staged[light]:
+                    if row[0] > period:
+                        raise ValueError("Time is beyond the period of the table", row[0])
+
+    '''
+    Check whether any changes are staged, waiting for the next cycle boundary
+    '''
+    def hasStaged(self):
+        return bool(self._staged) or self._stagedPeriod is not None
+
+    '''
+    Prepare the splicing of the staged changes, merging the transitions of the changed lights with all others into new
+    packed arrays (and determining the state of each changed light at the start of its new cycle). This is done when the
+    changes are staged, so that the splice at the cycle boundary only has to swap the arrays in.
+    '''
+    def _prepareSplice(self):
+        replaced = bytearray(len(self._lights))
+        added = []
+        initial = []
+        for light in self._staged:
+            first = self._firstChannel[light]
+            levels = bytearray(light.numAspects())
+            for aspect in range(light.numAspects()):
+                replaced[first + aspect] = 1
+            for time, channel, level in self._staged[light]:
+                levels[channel - first] = level
+            initial.append((light, first, levels))
+            added.extend(self._staged[light])
+        added.sort(key=lambda t: t[0])
+
+        times = array('I')
+        channels = bytearray()
+        levels = bytearray()
+        j = 0
+        for i in range(len(self._times)):
+            if replaced[self._channels[i]]:
+                continue
+            while j < len(added) and added[j][0] < self._times[i]:
+                times.append(added[j][0])
+                channels.append(added[j][1])
+                levels.append(added[j][2])
+                j += 1
+            times.append(self._times[i])
+            channels.append(self._channels[i])
+            levels.append(self._levels[i])
+        for time, channel, level in added[j:]:
+            times.append(time)
+            channels.append(channel)
+            levels.append(level)
+
+        self._merged = (times, channels, levels)
+        self._initial = initial
+
+    '''
+    Splice the staged changes into the table, swapping in the merged arrays (as prepared when the changes were staged) and
+    placing the changed lights into their state at the start of the new cycle. The changes were validated when staged, so
+    nothing is raised from within the dispatch.
+    '''
+    def _splice(self):
+        if self._merged is None:
+            # The transitions were (re)compiled or loaded since the changes were staged
+            self._prepareSplice()
+        self._times, self._channels, self._levels = self._merged
+        if self._stagedPeriod is not None:
+            self._periodMs = self._stagedPeriod
+
+        # Place the changed lights into the state they are in at the start of the new cycle (indexed, so as not to allocate
+        # an iterator)
+        initial = self._initial
+        deferred = self._deferred
+        for i in range(len(initial)):
+            light, first, levels = initial[i]
+            for aspect in range(len(levels)):
+                light._set(aspect, levels[aspect])
+                # Any skipped transitions of the light no longer apply
+                if first + aspect < len(deferred):
+                    deferred[first + aspect] = 0xff
+        outputs = self._outputs
+        for o in range(len(outputs)):
+            outputs[o].commit()
+
+        self._staged.clear()
+        self._stagedPeriod = None
+        self._merged = None
+
+    '''
+    Add a channel for each of the aspects of the light, if not already added
+
+    Returns the channel of the first aspect of the light, with the channels of the remaining aspects following it
+    '''
+    def _addLight(self, light):
+        first = self._firstChannel.get(light)
+        if first is not None:
+            return first
+
+        if len(self._lights) + light.numAspects() > self.MAX_CHANNELS:
+            raise ValueError("Too many channels in the table", len(self._lights) + light.numAspects())
+        first = len(self._lights)
+        for aspect in range(light.numAspects()):
+            self._lights.append(light)
+            self._aspects.append(aspect)
+        self._firstChannel[light] = first
+
+        if light._output is not None and not light._output in self._outputs:
+            self._outputs.append(light._output)
+        return first
+
+    '''
+    Compile all of the added transitions into the packed arrays, ordered by their time. Transitions that take place
+    at the same time remain in the order in which they were added.
+    '''
+    def compile(self):
+        # Include the already compiled transitions, so that the table can be compiled again after more are added
+        transitions = [(self._times[i], self._channels[i], self._levels[i]) for i in range(len(self._times))]
+        transitions.extend(self._pending)
+        transitions.sort(key=lambda t: t[0])
+        self._pending = []
+
+        self._times = array('I', [t[0] for t in transitions])
+        self._channels = bytearray([t[1] for t in transitions])
+        self._levels = bytearray([t[2] for t in transitions])
+        self._merged = None
+
+    '''
+    Save the compiled transitions as a binary blob
+
+    * stream - to write the blob to (i.e.: a file open in binary mode)
+    * configHash - hash (32 bit) of the config from which the transitions were compiled
+    '''
+    def save(self, stream, configHash):
+        if self._pending:
+            raise Exception("Table must be compiled before it can be saved")
+        stream.write(struct.pack(self._HEADER, self._MAGIC, self._times.itemsize, configHash, self._periodMs,
+                                 len(self._lights), len(self._times)))
+        stream.write(self._times)
+        stream.write(self._channels)
+        stream.write(self._levels)
+
+    '''
+    Load the compiled transitions from a binary blob, in place of adding and compiling the patterns of the lights. The
+    lights are added in the order specified, which must be the same order in which their patterns were originally added.
+
+    * stream - to read the blob from (i.e.: a file open in binary mode)
+    * lights - whose LEDs are transitioned by the table, in the order in which their patterns were added
+    * configHash - hash (32 bit) of the config which the transitions must have been compiled from
+
+    Returns True if loaded, False if the blob does not match (in which case the table is left without transitions)
+    '''
+    def load(self, stream, lights, configHash):
+        for light in lights:
+            self._addLight(light)
+
+        header = stream.read(struct.calcsize(self._HEADER))
+        if len(header) != struct.calcsize(self._HEADER):
+            return False
+        magic, itemSize, savedHash, periodMs, numChannels, count = struct.unpack(self._HEADER, header)
+        if (magic != self._MAGIC or itemSize != self._times.itemsize or savedHash != configHash or
+                numChannels != len(self._lights) or periodMs <= 0):
+            return False
+
+        times = stream.read(count * itemSize)
+        channels = stream.read(count)
+        levels = stream.read(count)
+        if len(times) != count * itemSize or len(channels) != count or len(levels) != count:
+            return False
+
+        self._times = array('I', times)
+        self._channels = bytearray(channels)
+        self._levels = bytearray(levels)
+        self._periodMs = periodMs
+        # Any staged changes were validated against the transitions which have been replaced
+        self._staged.clear()
+        self._stagedPeriod = None
+        self._merged = None
+        return True
+
+    '''
+    Record the time at which the first transition(s) of the table are performed (available via firstTransitionTicks()),
+    i.e.: to measure the time from boot until the lights are first set. Only the first transitions are timed.
+
+    * clock - providing ticks_ms from which the time is taken
+    '''
+    def markFirstTransition(self, clock):
+        self._markClock = clock
+        self._firstTicks = None
+        self._fire = self._fireMarked
+
+    '''
+    Get the ticks (ms) at which the first transition(s) were performed, None if not marked or not yet performed
+    '''
+    def firstTransitionTicks(self):
+        return self._firstTicks
+
+    '''
+    Check whether the table contains any (compiled) transitions
+    '''
+    def hasTasks(self):
+        return len(self._times) > 0
+
+    '''
+    Get the period (ms) of the table
+    '''
+    def period(self):
+        return self._periodMs
+
+    '''
+    Get the number of (compiled) transitions in the table
+    '''
+    def __len__(self):
+        return len(self._times)
+
+    '''
+    Get the number of bytes occupied by the compiled transitions
+    '''
+    def sizeBytes(self):
+        return len(self._times) * self._times.itemsize + len(self._channels) + len(self._levels) + len(self._aspects)
+
+    '''
+    Prepare the table to run from the start of its cycle
+
+    Returns the time (ms) from the start at which the first transition(s) are due
+    '''
+    def _reset(self):
+        if self._pending:
+            raise Exception("Table must be compiled before it can be driven")
+        if self.hasStaged():
+            self._splice()
+        self._index = 0
+        self._deferred = bytearray(b'\xff' * len(self._lights))
+        self._hasDeferred = False
+        return self._times[0]
+
+    '''
+    Perform all transitions that are due, and move on to the next ones. Once the last transition(s) are performed the
+    table returns to the start of its cycle (or, with changes staged, to the end of the period at which they are spliced in).
+
+    Returns the time (ms) from now at which the next transition(s) are due
+    '''
+    def _fire(self):
+        times = self._times
+        i = self._index
+        if i >= len(times):
+            return self._boundary()
+        currentTime = times[i]
+        while i < len(times) and times[i] == currentTime:
+            c = self._channels[i]
+            self._lights[c]._set(self._aspects[c], self._levels[i])
+            i += 1
+
+        # Apply all of the transitions together (indexed, so as not to allocate an iterator)
+        outputs = self._outputs
+        for o in range(len(outputs)):
+            outputs[o].commit()
+
+        if i >= len(times):
+            return self._endCycle(currentTime)
+        self._index = i
+        return times[i] - currentTime
+
+    '''
+    Move on from the last transition(s) of the cycle. With changes staged the table is next due at the end of the period,
+    where they are spliced in (via _boundary), so that the current cycle runs its full period. Otherwise the table returns
+    to the start of its cycle. Changes staged after the last transition(s) are thus spliced in at the end of the following
+    cycle.
+
+    * currentTime - (ms) within the cycle of the last transition(s)
+
+    Returns the time (ms) from the last transition(s) at which the table is next due
+    '''
+    def _endCycle(self, currentTime):
+        if self._stagedPeriod is not None or self._staged:
+            self._index = len(self._times)
+            return self._periodMs - currentTime
+        self._index = 0
+        return self._periodMs - currentTime + self._times[0]
+
+    '''
+    Splice in the staged changes at the end of the period, and return to the start of the (new) cycle
+
+    Returns the time (ms) from the end of the period at which the first transition(s) of the new cycle are due
+    '''
+    def _boundary(self):
+        if self._stagedPeriod is not None or self._staged:
+            self._splice()
+        self._index = 0
+        return self._times[0]
+
+    '''
+    Perform the first transitions as normal, recording the time at which they were performed. Thereafter the table fires
+    directly through _fire.
+    '''
+    def _fireMarked(self):
+        remaining = EventTable._fire(self)
+        self._firstTicks = self._markClock.ticks_ms()
+        del self._fire
+        return remaining
+
+    '''
+    Get the time (ms) from the transition(s) that are due until the following ones
+    '''
+    def _nextDelay(self):
+        times = self._times
+        i = self._index
+        if i >= len(times):
+            # At the end of the period, with the first transition(s) of the new cycle following
+            return (times if self._merged is None else self._merged[0])[0]
+        currentTime = times[i]
+        while i < len(times) and times[i] == currentTime:
+            i += 1
+        if i >= len(times):
+            if self._stagedPeriod is not None or self._staged:
+                return self._periodMs - currentTime
+            return self._periodMs - currentTime + times[0]
+        return times[i] - currentTime
+
+    '''
+    Move on past the transition(s) that are due without performing them, with only the level of each LED being kept, so
+    that the final levels are applied (via _flush) along with the transition(s) that are due next. As the table only
+    places the LEDs into their states, skipping and coalescing the transitions are one and the same.
+
+    Returns the time (ms) from the skipped transition(s) at which the next ones are due
+    '''
+    def _skip(self):
+        if len(self._deferred) != len(self._lights):
+            self._deferred = bytearray(b'\xff' * len(self._lights))
+        times = self._times
+        i = self._index
+        if i >= len(times):
+            # Nothing is performed at the end of the period other than splicing in the staged changes
+            return self._boundary()
+        currentTime = times[i]
+        while i < len(times) and times[i] == currentTime:
+            self._deferred[self._channels[i]] = self._levels[i]
+            i += 1
+        self._hasDeferred = True
+
+        if i >= len(times):
+            return self._endCycle(currentTime)
+        self._index = i
+        return times[i] - currentTime
+
+    '''
+    Skip the transition(s) that are due, as with _skip
+
+    Returns the time (ms) from the skipped transition(s) at which the next ones are due
+    '''
+    def _coalesce(self):
+        return self._skip()
+
+    '''
+    Apply the final levels of the skipped transitions, other than those of the LEDs which the transition(s) that are due
+    place anyway (the outputs are committed once those are performed)
+    '''
+    def _flush(self):
+        if not self._hasDeferred:
+            return
+        deferred = self._deferred
+        times = self._times
+        i = self._index
+        while i < len(times) and times[i] == times[self._index]:
+            if self._channels[i] < len(deferred):
+                deferred[self._channels[i]] = 0xff
+            i += 1
+        for c in range(len(deferred)):
+            if deferred[c] != 0xff:
+                self._lights[c]._set(self._aspects[c], deferred[c])
+                deferred[c] = 0xff
+        self._hasDeferred = False
+
+    '''
+    Freeze the table ahead of being driven by a frozen driver. The transitions are already packed into preallocated
+    arrays, and firing them allocates no memory, so there is nothing further to prepare.
+    '''
+    def _freeze(self):
+        pass
+
+    '''
+    Get the position of the table within its cycle, so that it can be kept while the board is reset (i.e.: by a deepsleep)
+
+    Returns the position, None while waiting out the period to splice in staged changes (as those are lost when reset)
+    '''
+    def _position(self):
+        if self._index >= len(self._times):
+            # Waiting to splice in the staged changes, which are lost when reset
+            return None
+        return self._index
+
+    '''
+    Continue on from a position within the cycle (once reset), as kept via _position. As the transitions only change the
+    LEDs which they affect, each LED is first placed into the level it has at the position: that of its last transition
+    ahead of the position, or (if it has none since the start of the cycle) its last transition of the previous cycle.
+
+    * position - within the cycle, being the first of the transitions that are due at the same time
+
+    Returns True if resumed, False if the position is not the start of the transitions of a time within the cycle
+    '''
+    def _resume(self, position):
+        times = self._times
+        if position < 0 or position >= len(times) or (position > 0 and times[position - 1] == times[position]):
+            return False
+
+        levels = bytearray(b'\xff' * len(self._lights))
+        for i in range(position, len(times)):
+            levels[self._channels[i]] = self._levels[i]
+        for i in range(position):
+            levels[self._channels[i]] = self._levels[i]
+        for c in range(len(levels)):
+            if levels[c] != 0xff:
+                self._lights[c]._set(self._aspects[c], levels[c])
+        for output in self._outputs:
+            output.commit()
+
+        self._index = position
+        return True
@@ -0,0 +1,230 @@
+from common.driver import Schedule
+from lights.light import Light
+import common.driver as driver
+
+try:
+    import rp2
+except ImportError:
+    rp2 = None
+
+'''
+A light which repeats a fixed periodic pattern, such as the wig-wag of a level crossing or an amber beacon. The pattern is a
+sequence of steps, each being the value of the pins (a bitmask, bit n being the n-th pin) and how long (ms) it is held for.
+
+On the RP2040 the pattern is compiled into a PIO program, run by a state machine with its clock divided down so that the
+whole pattern fits within the program. Once started, the pattern then runs with no involvement of the CPU at all, with the
+timing exact to the cycle of the state machine. As the PIO can only set consecutive pins, the pins of the light are the
+numPins starting from basePinNum.
+
+Each step is assembled into the instructions
+
+set(pins, value)
+set(y, m)
+label(outer)
+set(x, k) [d]
+label(inner)
+jmp(x_dec, inner) [31]
+jmp(y_dec, outer)
+
+taking 2 + (m + 1) * (2 + d + 32 * (k + 1)) cycles of the state machine, so that any number of cycles from 36 to 33826 can be
+held (exactly up to 1059 cycles, and to within (m + 1) / 2 cycles beyond). The actual duration of each step is available via
+actualMs().
+
+Where PIO is not available (or not wanted), the pattern is instead registered as a Schedule with the driver.instance, with
+the pins toggled by the driver as with any other light.
+
+Example:
+
+beacon = Flasher.beacon(15, 500, 500)
+wigwag = Flasher.wigwag(16, 1000, 1)
+beacon.start()
+wigwag.start()
+'''
+class Flasher(Light):
+
+    # Limits of the state machine
+    SYS_CLOCK_HZ = 125000000
+    MIN_FREQ = SYS_CLOCK_HZ // 65536 + 1
+    MAX_STEPS = 6
+    MAX_PINS = 5
+
+    # Range of cycles each step can be held for
+    MIN_STEP_CYCLES = 36
+    MAX_STEP_CYCLES = 2 + 32 * 1057
+
+    '''
+    CTOR
+
+    * basePinNum - the first of the (consecutive) pins of the light
+    * pattern - list of tupples (value, durationMs) making up the pattern, with the value being the bitmask of the pins
+    * numPins - the number of pins of the light (default 1)
+    * stateMachineId - id of the PIO state machine to run the pattern (default 0)
+    * usePio - whether to run the pattern via PIO (default True). If False, or PIO is not available, the driver is used
+    '''
+    def __init__(self, basePinNum, pattern, numPins = 1, stateMachineId = 0, usePio = True):
+        if numPins < 1 or numPins > self.MAX_PINS:
+            raise ValueError("Number of pins out of range", numPins)
+        if not pattern or len(pattern) > self.MAX_STEPS:
+            raise ValueError("Pattern must have between 1 and " + str(self.MAX_STEPS) + " steps", len(pattern))
+        for value, durationMs in pattern:
+            if durationMs <= 0:
+                raise ValueError("Step duration must be greater than 0", durationMs)
+            if value < 0 or value >= (1 << numPins):
+                raise ValueError("Step value out of range", value)
+
+        super(Flasher, self).__init__([basePinNum + i for i in range(numPins)])
+        self._basePinNum = basePinNum
+        self._pattern = pattern
+        self._stateMachineId = stateMachineId
+        self._usePio = usePio and rp2 is not None
+        self._stateMachine = None
+        self._schedule = None
+
+        if self._usePio:
+            self._freq = self._frequency(pattern)
+            self._steps = [self._assembleStep(value, self._cycles(durationMs)) for value, durationMs in pattern]
+        else:
+            self._freq = None
+            self._steps = None
+
+    '''
+    Create a flasher for a beacon, which is on and off for the specified times
+
+    * pinNum - of the beacon
+    * onMs - time (ms) for which the beacon is on
+    * offMs - time (ms) for which the beacon is off
+    * stateMachineId - id of the PIO state machine to run the pattern (default 0)
+    '''
+    @staticmethod
+    def beacon(pinNum, onMs, offMs, stateMachineId = 0):
+        return Flasher(pinNum, [(1, onMs), (0, offMs)], 1, stateMachineId)
+
+    '''
+    Create a flasher for a wig-wag, with two lights alternating (each lit for half the period)
+
+    * basePinNum - of the first of the two lights (the second being the next pin)
+    * periodMs - time (ms) for both lights to have lit once
+    * stateMachineId - id of the PIO state machine to run the pattern (default 0)
+    '''
+    @staticmethod
+    def wigwag(basePinNum, periodMs, stateMachineId = 0):
+        return Flasher(basePinNum, [(1, periodMs // 2), (2, periodMs - periodMs // 2)], 2, stateMachineId)
+
+    '''
+    Check whether the pattern is run via PIO
+    '''
+    def usesPio(self):
+        return self._usePio
+
+    '''
+    Get the frequency (Hz) of the state machine, None if PIO is not used
+    '''
+    def frequency(self):
+        return self._freq
+
+    '''
+    Get the actual duration (ms) of each step of the pattern, as run by the state machine
+    '''
+    def actualMs(self):
+        if not self._usePio:
+            return [durationMs for value, durationMs in self._pattern]
+        return [self._stepCycles(step) * 1000 / self._freq for step in self._steps]
+
+    '''
+    Start the pattern. Via PIO it starts running right away, otherwise once the driver.instance is started
+    '''
+    def start(self):
+        if self._usePio:
+            if self._stateMachine is None:
+                self._stateMachine = rp2.StateMachine(self._stateMachineId, self._program(), freq=self._freq,
+                                                      set_base=self._lights[0])
+            self._stateMachine.active(1)
+        elif self._schedule is None:
+            self._schedule = self._createSchedule()
+            driver.instance.add(self._schedule)
+
+    '''
+    Stop the pattern running via PIO (a pattern run by the driver runs for as long as the driver does)
+    '''
+    def stop(self):
+        if self._stateMachine is not None:
+            self._stateMachine.active(0)
+
+    '''
+    Get the highest frequency of the state machine at which all steps of the pattern can be held
+
+    * pattern - for which to get the frequency
+    '''
+    def _frequency(self, pattern):
+        longest = max([durationMs for value, durationMs in pattern])
+        shortest = min([durationMs for value, durationMs in pattern])
+        freq = self.MAX_STEP_CYCLES * 1000 // longest
+        if freq > self.SYS_CLOCK_HZ:
+            freq = self.SYS_CLOCK_HZ
+        if freq < self.MIN_FREQ or shortest * freq // 1000 < self.MIN_STEP_CYCLES:
+            raise ValueError("Pattern cannot be run via PIO", (shortest, longest))
+        return freq
+
+    '''
+    Get the number of cycles of the state machine for which to hold a step
+
+    * durationMs - of the step
+    '''
+    def _cycles(self, durationMs):
+        return (durationMs * self._freq + 500) // 1000
+
+    '''
+    Determine the parameters of the instructions which hold a step for the specified number of cycles
+
+    * value - of the pins during the step
+    * cycles - for which to hold the step
+
+    Returns the tupple (value, m, k, d)
+    '''
+    def _assembleStep(self, value, cycles):
+        loops = (cycles - 2 + 1056) // 1057
+        inner = ((cycles - 2) * 2 + loops) // (2 * loops)
+        k = (inner - 2) // 32 - 1
+        d = (inner - 2) % 32
+        return (value, loops - 1, k, d)
+
+    '''
+    Get the number of cycles for which the assembled step is held
+
+    * step - tupple of (value, m, k, d)
+    '''
+    def _stepCycles(self, step):
+        value, m, k, d = step
+        return 2 + (m + 1) * (2 + d + 32 * (k + 1))
+
+    '''
+    Assemble the PIO program for the pattern. Note that the instructions are only available as globals while the function
+    is assembled (by rp2.asm_pio), so it must only make use of local variables.
+    '''
+    def _program(self):
+        steps = self._steps
+
+        def program():
+            for i in range(len(steps)):
+                value, m, k, d = steps[i]
+                set(pins, value)
+                set(y, m)
+                label('outer' + str(i))
+                set(x, k) [d]
+                label('inner' + str(i))
+                jmp(x_dec, 'inner' + str(i)) [31]
+                jmp(y_dec, 'outer' + str(i))
+
+        return rp2.asm_pio(set_init=(rp2.PIO.OUT_LOW,) * len(self._lights))(program)
+
+    '''
+    Create the schedule which runs the pattern through the driver (when PIO is not used)
+    '''
+    def _createSchedule(self):
+        schedule = Schedule(sum([durationMs for value, durationMs in self._pattern]))
+        time = 0
+        for value, durationMs in self._pattern:
+            for pin in range(len(self._lights)):
+                schedule.registerMs(time, self.action(pin, bool(value & (1 << pin))))
+            time += durationMs
+        return schedule
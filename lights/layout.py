@@ -0,0 +1,149 @@
+from lights.trafficlight import IntersectionBuilder
+import utime
+
+try:
+    import json
+except ImportError:
+    import ujson as json
+
+'''
+Loads the intersections of a layout from a config, rather than hard-coding each IntersectionBuilder and addTrafficLight
+call. The config is newline delimited JSON (one entry per line), so that it can be read and parsed one entry at a time
+(i.e.: straight from flash), without the whole config ever having to fit in RAM at once. Blank lines, and lines starting
+with #, are ignored.
+
+Each intersection starts with an intersection entry, followed by an entry for each of its traffic lights (in order):
+
+* {"intersection": "<TYPE>", "yellow": <sec>} - TYPE being the name of an IntersectionBuilder.TYPE, with the yellow time
+  optional (default 3s)
+* {"light": [<red pin>, <yellow pin>, <green pin>], "green": <sec>} - with the green time optional (default 42s)
+
+Each intersection is built as soon as its last traffic light has been read, behaving exactly as the equivalent
+IntersectionBuilder calls would. The time taken to parse the entries and to build the intersections is tracked.
+
+Example:
+
+# layout.ndjson
+{"intersection": "RED_GREEN_YELLOW", "yellow": 3}
+{"light": [0, 1, 2], "green": 20}
+{"light": [10, 11, 12], "green": 25}
+{"intersection": "RED_REDYELLOW_GREEN_YELLOW"}
+{"light": [3, 4, 5]}
+{"light": [13, 14, 15]}
+
+loader = LayoutLoader()
+builders = loader.loadFile('layout.ndjson')
+print(loader.parseMs(), loader.buildMs())
+'''
+class LayoutLoader:
+
+    '''
+    CTOR
+
+    * output - through which the pins of all traffic lights are controlled (i.e.: a PortBank). If None (default) the pins
+               are controlled directly as GPIO pins
+    * clock - providing ticks_ms/ticks_diff through which the parse and build times are measured. If None (default) utime
+              is used
+    '''
+    def __init__(self, output = None, clock = None):
+        self._output = output
+        self._clock = utime if clock is None else clock
+        self._parseMs = 0
+        self._buildMs = 0
+
+    '''
+    Load the layout from the config file at the specified path
+
+    * path - of the config file
+
+    Returns the IntersectionBuilder of each of the (built) intersections
+    '''
+    def loadFile(self, path):
+        with open(path) as stream:
+            return self.load(stream)
+
+    '''
+    Load the layout from a stream of config lines (i.e.: an open file), one line at a time
+
+    * stream - iterable of the lines of the config
+
+    Returns the IntersectionBuilder of each of the (built) intersections
+    '''
+    def load(self, stream):
+        clock = self._clock
+        self._parseMs = 0
+        self._buildMs = 0
+        builders = []
+        builder = None
+        lineNum = 0
+        for line in stream:
+            lineNum += 1
+            line = line.strip()
+            if not line or line[0] == '#':
+                continue
+
+            start = clock.ticks_ms()
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                raise ValueError("Invalid layout entry", lineNum)
+            parsed = clock.ticks_ms()
+            self._parseMs += clock.ticks_diff(parsed, start)
+
+            if not isinstance(entry, dict):
+                raise ValueError("Unknown layout entry", lineNum)
+            if 'intersection' in entry:
+                if builder is not None:
+                    builder.build()
+                builder = self._createIntersection(entry, lineNum)
+                builders.append(builder)
+            elif 'light' in entry:
+                if builder is None:
+                    raise ValueError("Traffic light defined outside of an intersection", lineNum)
+                self._addTrafficLight(builder, entry, lineNum)
+            else:
+                raise ValueError("Unknown layout entry", lineNum)
+            self._buildMs += clock.ticks_diff(clock.ticks_ms(), parsed)
+
+        if builder is not None:
+            start = clock.ticks_ms()
+            builder.build()
+            self._buildMs += clock.ticks_diff(clock.ticks_ms(), start)
+        return builders
+
+    '''
+    Get the time (ms) taken to parse the entries of the last loaded config
+    '''
+    def parseMs(self):
+        return self._parseMs
+
+    '''
+    Get the time (ms) taken to create and build the intersections of the last loaded config
+    '''
+    def buildMs(self):
+        return self._buildMs
+
+    '''
+    Create the builder for an intersection entry
+
+    * entry - the parsed intersection entry
+    * lineNum - of the entry (for reporting errors)
+    '''
+    def _createIntersection(self, entry, lineNum):
+        typeOfLight = getattr(IntersectionBuilder.TYPE, str(entry['intersection']), None)
+        if not isinstance(typeOfLight, int):
+            raise ValueError("Unknown intersection type", lineNum)
+        return IntersectionBuilder(typeOfLight, entry.get('yellow', 3), self._output)
+
+    '''
+    Add the traffic light of a light entry to the intersection
+
+    * builder - of the intersection
+    * entry - the parsed light entry
+    * lineNum - of the entry (for reporting errors)
+    '''
+    def _addTrafficLight(self, builder, entry, lineNum):
+        pins = entry['light']
+        if len(pins) != 3:
+            raise ValueError("Traffic light requires red, yellow and green pins", lineNum)
+        builder.addTrafficLight(pins[0], pins[1], pins[2], entry.get('green', 42))
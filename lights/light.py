@@ -0,0 +1,138 @@
+from machine import Pin
+
+'''
+Provides controls for a light made up of any number of aspects (LEDs), each controlled through its own pin. The type of light
+is defined purely by the pins provided for it, so for example a 2-aspect bike light (red, green) or a 4-aspect railway signal
+(red, yellow, green, double yellow) are both simply a Light with the corresponding number of pins. Aspects are identified by
+their index, in the order in which their pins were provided.
+
+The state of the LEDs is tracked in a bitfield (one bit per aspect), so that changes which would not alter the state of an
+LED are skipped rather than written to the pin. The number of writes issued versus skipped is available via writeStats().
+
+For each aspect the action which turns it on and the one which turns it off are created once, when the light is created, and
+are thereafter available through a direct lookup via action(aspect, isOn).
+
+Example:
+
+BIKE = enum.create('RED', 'GREEN')
+bikeLight = Light([4, 5])
+bikeLight.on(BIKE.GREEN)
+driver.register(10, bikeLight.action(BIKE.GREEN, False))
+'''
+class Light:
+
+    '''
+    CTOR
+
+    * pinNums - the numbers of the pins through which to control each of the aspects (LEDs) of the light, in order of aspect
+    * output - through which the pins are controlled (i.e.: a PortBank), must provide pin(pinNum) and commit(). If None (default)
+               the pins are controlled directly as GPIO pins. Changes made through an output take effect once it is committed
+    '''
+    def __init__(self, pinNums, output = None):
+        if not pinNums:
+            raise ValueError("A light must have at least one aspect")
+
+        self._output = output
+        self._lights = [self.__pin(p) for p in pinNums]
+        self._state = 0
+        self._writes = 0
+        self._skipped = 0
+        self.__allOff()
+        self._actions = self._createActions()
+
+    '''
+    Get the pin with the specified number, through the output if there is one
+    '''
+    def __pin(self, pinNum):
+        if self._output is None:
+            return Pin(pinNum, Pin.OUT)
+        return self._output.pin(pinNum)
+
+    '''
+    Turns off all LEDs. The state of the pins is not known beforehand, so they are always written
+    '''
+    def __allOff(self):
+        for led in self._lights:
+            led.low()
+        self._state = 0
+        self._writes += len(self._lights)
+
+    '''
+    Create the table of actions, with the action turning aspect a off at index 2a and on at index 2a + 1
+    '''
+    def _createActions(self):
+        actions = []
+        for aspect in range(len(self._lights)):
+            actions.append(self.__createAction(aspect, False))
+            actions.append(self.__createAction(aspect, True))
+        return actions
+
+    '''
+    Create the action which places the specified aspect into the specified state
+    '''
+    def __createAction(self, aspect, isOn):
+        return lambda: self._set(aspect, isOn)
+
+    '''
+    Get the number of aspects of the light
+    '''
+    def numAspects(self):
+        return len(self._lights)
+
+    '''
+    Get the action (callable as action()) which places the LED of the specified aspect into the specified state
+
+    * aspect - the index of the aspect
+    * isOn - true if the LED should turn on
+    '''
+    def action(self, aspect, isOn):
+        if aspect < 0 or aspect >= len(self._lights):
+            raise ValueError("Invalid aspect specified", aspect)
+        return self._actions[aspect * 2 + (1 if isOn else 0)]
+
+    '''
+    Turns on the LED of the specified aspect
+
+    * aspect - the index of the aspect
+    '''
+    def on(self, aspect):
+        self._set(aspect, True)
+
+    '''
+    Turns off the LED of the specified aspect
+
+    * aspect - the index of the aspect
+    '''
+    def off(self, aspect):
+        self._set(aspect, False)
+
+    '''
+    Places the LED at the given index into the specified state
+
+    * index - of the LED (aspect)
+    * isOn - true (or 1) if the LED should turn on
+    '''
+    def _set(self, index, isOn):
+        bit = 1 << index
+        if isOn:
+            if self._state & bit:
+                self._skipped += 1
+                return
+            self._lights[index].high()
+            self._state |= bit
+        else:
+            if not self._state & bit:
+                self._skipped += 1
+                return
+            self._lights[index].low()
+            self._state &= ~bit
+        self._writes += 1
+
+    '''
+    Get the number of writes to the pins that have been issued, and the number that were skipped as they would not
+    have changed the state of the LED
+
+    Returns a tupple of (issued, skipped)
+    '''
+    def writeStats(self):
+        return (self._writes, self._skipped)
@@ -0,0 +1,130 @@
+'''
+Helper that acts as a tupple associating which colour LED turn on/off at what time (milliseconds).
+'''
+class LightAction:
+    def __init__(self, colour, isOn, time):
+        self._colour = colour
+        self._isOn = isOn
+        self._time = time
+
+'''
+Limits the value to be within 0 and the period.
+
+* value - to ensure within the period (must be greater than or equal to 0)
+* period - the limit (must be greater than 0)
+
+Both are expected to be in the same unit (milliseconds when employed for the driver timings)
+'''
+def _limitToPeriod(value, period):
+    if (value < 0):
+        raise ValueError("Negative value is not allowed", value)
+    if (period <= 0):
+        raise ValueError("Period must be greater than 0", period)
+    if (value <= period):
+        return value
+    
+    return value % period
+
+"""
+Declarative description of the pattern that a light repeats, as a sequence of states which are each held for a duration.
+Each state is the bitmask of the aspects (LEDs) of the light which are lit (bit n being aspect n), and the period of the
+pattern is the total duration of all of its steps. The pattern starts at an offset within its period, wrapping around at
+the end of the period, such that the patterns of several lights can be staggered over the same cycle. A transition which
+falls exactly on the end of the period is performed at the end of the cycle (rather than at the start of the next), so that
+it takes place before those at the start of the next cycle.
+
+Rather than every aspect being switched at the start of every step, the pattern is compiled into the minimal set of
+LightActions for an EventTable: only the aspects which differ from the previous state are transitioned. Steps without a
+duration are never held, so the transitions into and out of them are merged into the single transition between the
+states either side of them, and a step which repeats the previous state transitions nothing at all. At any one time the
+aspects are turned off before others are turned on.
+
+Example (a traffic light, which is red for 60s, green for 20s and yellow for 3s, turning green 10s into the cycle):
+
+pattern = Pattern([(GREEN, 20000), (YELLOW, 3000), (RED, 60000)], 10000)
+table = EventTable(pattern.periodMs())
+table.addPattern(trafficLight, pattern.compile())
+"""
+class Pattern:
+
+    '''
+    CTOR
+
+    * steps - list of tupples (state, durationMs) making up the pattern, with the state being the bitmask of the aspects
+              that are lit
+    * offsetMs - time (ms) within the period at which the first step starts (default 0)
+    '''
+    def __init__(self, steps, offsetMs = 0):
+        if not steps:
+            raise ValueError("Pattern must have at least one step")
+        periodMs = 0
+        for state, durationMs in steps:
+            if durationMs < 0:
+                raise ValueError("Step duration cannot be negative", durationMs)
+            if state < 0:
+                raise ValueError("Step state cannot be negative", state)
+            periodMs += durationMs
+        if periodMs <= 0:
+            raise ValueError("Pattern must have a period greater than 0", periodMs)
+        if offsetMs < 0:
+            raise ValueError("Offset cannot be negative", offsetMs)
+
+        self._steps = steps
+        self._offsetMs = offsetMs % periodMs
+        self._periodMs = periodMs
+
+    '''
+    Get the period (ms) of the pattern
+    '''
+    def periodMs(self):
+        return self._periodMs
+
+    '''
+    Get the state (bitmask of the lit aspects) of the pattern at the specified time
+
+    * timeMs - within the period (ms)
+    '''
+    def stateAt(self, timeMs):
+        timeMs = (timeMs - self._offsetMs) % self._periodMs
+        for state, durationMs in self._steps:
+            if timeMs < durationMs:
+                return state
+            timeMs -= durationMs
+        return self._steps[-1][0]
+
+    '''
+    Compile the pattern into the LightActions which transition the aspects from one state to the next
+
+    Returns the list of LightActions, in the order of their time within the period
+    '''
+    def compile(self):
+        held = [step for step in self._steps if step[1] > 0]
+        actions = []
+        previous = held[-1][0]
+        time = self._offsetMs
+        for state, durationMs in held:
+            changed = previous ^ state
+            if changed:
+                at = _limitToPeriod(time, self._periodMs)
+                self._appendChanges(actions, at, changed & previous, False)
+                self._appendChanges(actions, at, changed & state, True)
+            previous = state
+            time += durationMs
+        actions.sort(key=lambda act: act._time)
+        return actions
+
+    '''
+    Append an action for each of the aspects in the mask
+
+    * actions - list to which to append
+    * time - (ms) at which the aspects are transitioned
+    * mask - bitmask of the aspects to transition
+    * isOn - whether the aspects are turned on
+    '''
+    def _appendChanges(self, actions, time, mask, isOn):
+        aspect = 0
+        while mask:
+            if mask & 1:
+                actions.append(LightAction(aspect, isOn, time))
+            mask >>= 1
+            aspect += 1
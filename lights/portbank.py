@@ -0,0 +1,102 @@
+from machine import Pin, mem32
+
+"""
+Bank of GPIO pins on the RP2040, through which all changes to the pins are collected and then applied together. Rather than
+each LED being switched by a separate Pin.high()/Pin.low() call (with a visible skew between LEDs changing at the same time),
+the changes are collected into masks of the pins to set and to clear, which are then written to the SIO GPIO_OUT_SET and
+GPIO_OUT_CLR registers (via machine.mem32) when the bank is committed. All pins changed at the same time are thus switched by
+a single register write.
+
+The pins provided by the bank can be used in place of a machine.Pin by the lights (i.e.: passed as the output of a TrafficLight
+or IntersectionBuilder), with the changes taking effect only once the bank is committed. When driven via an EventTable, the
+bank is committed after each set of transitions taking place at the same time.
+
+Example:
+
+bank = PortBank()
+red = bank.pin(0)
+green = bank.pin(1)
+red.low()
+green.high()
+bank.commit()
+"""
+class PortBank:
+
+    # Number of GPIO pins available through the bank
+    NUM_PINS = 30
+    # Addresses of the SIO registers through which the GPIO outputs are set/cleared
+    SIO_BASE = 0xd0000000
+    GPIO_OUT_SET = SIO_BASE + 0x014
+    GPIO_OUT_CLR = SIO_BASE + 0x018
+
+    '''
+    CTOR
+    '''
+    def __init__(self):
+        self._setMask = 0
+        self._clrMask = 0
+
+    '''
+    Get a pin of the bank, configuring the GPIO pin as an output
+
+    * pinNum - the number of the GPIO pin
+    '''
+    def pin(self, pinNum):
+        if pinNum < 0 or pinNum >= self.NUM_PINS:
+            raise ValueError("Invalid pin number", pinNum)
+
+        Pin(pinNum, Pin.OUT)
+        return BankPin(self, 1 << pinNum)
+
+    '''
+    Apply all changes collected since the last commit, with one register write for all pins to set and one for all
+    pins to clear
+    '''
+    def commit(self):
+        if self._setMask:
+            mem32[self.GPIO_OUT_SET] = self._setMask
+        if self._clrMask:
+            mem32[self.GPIO_OUT_CLR] = self._clrMask
+        self._setMask = 0
+        self._clrMask = 0
+
+'''
+A single pin of a PortBank, which can be used in place of a machine.Pin. Changes are collected by the bank, and only
+applied once it is committed.
+'''
+class BankPin:
+
+    '''
+    CTOR
+
+    * bank - to which the pin belongs
+    * mask - of the pin within the bank
+    '''
+    def __init__(self, bank, mask):
+        self._bank = bank
+        self._mask = mask
+
+    '''
+    Set the pin high (once committed)
+    '''
+    def high(self):
+        self._bank._setMask |= self._mask
+        self._bank._clrMask &= ~self._mask
+
+    '''
+    Set the pin low (once committed)
+    '''
+    def low(self):
+        self._bank._clrMask |= self._mask
+        self._bank._setMask &= ~self._mask
+
+    '''
+    Set the pin to the specified value (once committed)
+
+    * value - true (or 1) for high
+    '''
+    def value(self, value):
+        if value:
+            self.high()
+        else:
+            self.low()
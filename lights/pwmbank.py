@@ -0,0 +1,351 @@
+from machine import Pin, PWM
+import common.driver as driver
+
+"""
+Output through which LEDs are driven via PWM rather than being simply switched on and off, so that they can be dimmed (i.e.:
+to night levels) and fade in and out as incandescent signals do. A PwmBank can be provided as the output of any light (i.e.:
+an IntersectionBuilder or TrafficLight), with each LED turned on being brought to the brightness of the bank, and each LED
+turned off being brought to 0.
+
+When a fade time is specified, the LEDs are faded by a Fader, which is a single timeline added to the driver updating all
+LEDs that are fading at a fixed frame rate. Rather than a task being dispatched for every step of every fade, each frame
+updates only the LEDs that are currently fading, so the cost scales with the number of active fades (not the number of LEDs),
+and once a fade completes its LED is no longer touched. The Fader is only queued in the driver while LEDs are fading, so that
+no frames are dispatched (and the board is free to sleep) in between fades. Unless specified, all banks share a single Fader
+(added to the driver.instance when the first fading bank is created).
+
+Example:
+
+bank = PwmBank(fadeMs = 150)
+builder = IntersectionBuilder(IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 3, bank)
+builder.addTrafficLight(0, 1, 2)
+builder.addTrafficLight(10, 11, 12)
+builder.build()
+...
+bank.setBrightness(0.3)
+"""
+class PwmBank:
+
+    # Full brightness, as the duty cycle of the PWM
+    MAX_DUTY = 65535
+
+    '''
+    CTOR
+
+    * fadeMs - time (ms) over which the LEDs fade in and out (default 0, the LEDs change immediately)
+    * brightness - fraction (0 to 1) of full brightness at which LEDs that are on are lit (default 1)
+    * freq - frequency (Hz) of the PWM (default 1000)
+    * fader - Fader through which the LEDs are faded. If None (default) the shared Fader is used
+    '''
+    def __init__(self, fadeMs = 0, brightness = 1, freq = 1000, fader = None):
+        if fadeMs < 0:
+            raise ValueError("Fade time cannot be negative", fadeMs)
+
+        self._freq = freq
+        self._onDuty = self._toDuty(brightness)
+        self._leds = []
+        if fadeMs > 0:
+            self._fader = sharedFader() if fader is None else fader
+            self._fadeFrames = max(1, fadeMs // self._fader.frameMs())
+        else:
+            self._fader = None
+            self._fadeFrames = 0
+
+    '''
+    Get an LED of the bank, configuring the GPIO pin for PWM
+
+    * pinNum - the number of the GPIO pin
+    '''
+    def pin(self, pinNum):
+        pwm = PWM(Pin(pinNum, Pin.OUT))
+        pwm.freq(self._freq)
+        led = PwmLed(self, pwm)
+        self._leds.append(led)
+        return led
+
+    '''
+    Change the brightness at which LEDs that are on are lit, with LEDs that are currently on being brought to the new
+    brightness (faded if the bank fades)
+
+    * brightness - fraction (0 to 1) of full brightness
+    '''
+    def setBrightness(self, brightness):
+        self._onDuty = self._toDuty(brightness)
+        for led in self._leds:
+            if led._isOn:
+                led._moveTo(self._onDuty)
+
+    '''
+    Get the brightness at which LEDs that are on are lit, as a fraction of full brightness
+    '''
+    def brightness(self):
+        return self._onDuty / self.MAX_DUTY
+
+    '''
+    Changes to the LEDs take effect (or start fading) right away, so there is nothing to commit
+    '''
+    def commit(self):
+        pass
+
+    '''
+    Convert the brightness to the duty cycle of the PWM
+    '''
+    def _toDuty(self, brightness):
+        if brightness < 0 or brightness > 1:
+            raise ValueError("Brightness must be between 0 and 1", brightness)
+        return round(brightness * self.MAX_DUTY)
+
+'''
+A single LED of a PwmBank, which can be used in place of a machine.Pin. Turning it on (high) brings it to the brightness of
+the bank, and turning it off (low) brings it to 0, fading when the bank fades.
+'''
+class PwmLed:
+
+    '''
+    CTOR
+
+    * bank - to which the LED belongs
+    * pwm - through which the LED is driven
+    '''
+    def __init__(self, bank, pwm):
+        self._bank = bank
+        self._pwm = pwm
+        self._isOn = False
+        self._duty = 0
+        self._fromDuty = 0
+        self._toDuty = 0
+        self._endFrame = 0
+        self._isFading = False
+        pwm.duty_u16(0)
+
+    '''
+    Turn the LED on
+    '''
+    def high(self):
+        self._isOn = True
+        self._moveTo(self._bank._onDuty)
+
+    '''
+    Turn the LED off
+    '''
+    def low(self):
+        self._isOn = False
+        self._moveTo(0)
+
+    '''
+    Turn the LED on or off
+
+    * value - true (or 1) for on
+    '''
+    def value(self, value):
+        if value:
+            self.high()
+        else:
+            self.low()
+
+    '''
+    Get the current duty cycle of the LED
+    '''
+    def duty(self):
+        return self._duty
+
+    '''
+    Bring the LED to the specified duty cycle, fading from its current duty cycle if the bank fades
+
+    * duty - to bring the LED to
+    '''
+    def _moveTo(self, duty):
+        fader = self._bank._fader
+        if fader is None:
+            self._toDuty = duty
+            self._write(duty)
+            return
+        if duty == self._toDuty and (self._isFading or duty == self._duty):
+            return
+
+        self._fromDuty = self._duty
+        self._toDuty = duty
+        self._endFrame = fader._frame + self._bank._fadeFrames
+        if not self._isFading:
+            self._isFading = True
+            fader._start(self)
+
+    '''
+    Update the duty cycle of the fading LED for the frame
+
+    * frame - the number of the current frame of the Fader
+
+    Returns True once the fade is complete
+    '''
+    def _update(self, frame):
+        remaining = self._endFrame - frame
+        if remaining <= 0:
+            self._write(self._toDuty)
+            self._isFading = False
+            return True
+        self._write(self._toDuty - (self._toDuty - self._fromDuty) * remaining // self._bank._fadeFrames)
+        return False
+
+    '''
+    Write the duty cycle to the PWM, if changed
+    '''
+    def _write(self, duty):
+        if duty != self._duty:
+            self._duty = duty
+            self._pwm.duty_u16(duty)
+
+"""
+Timeline which is added to a Driver (in place of a Schedule), updating all fading LEDs once every frame. Only the LEDs which
+are currently fading are updated, with each being dropped from the frame once its fade is complete. Should frames be missed
+(i.e.: skipped by the overrun policy of the driver), the fades remain on time, as the duty cycle of each frame is determined
+by the number of the frame.
+
+The fader only runs while LEDs are fading: it is played on the driver which owns it (the driver.instance unless specified) as
+the first fade starts, and drops out of the driver once the last fade completes.
+
+Example:
+
+fader = Fader(50, myDriver)
+myDriver.add(fader)
+bank = PwmBank(200, fader = fader)
+"""
+class Fader:
+
+    '''
+    CTOR
+
+    * fps - frames per second at which the fading LEDs are updated (default 50)
+    * owner - Driver on which the fader is played as fades start. If None (default) the driver.instance (at the time the
+              fader is created) is used
+    '''
+    def __init__(self, fps = 50, owner = None):
+        if fps <= 0 or fps > 1000:
+            raise ValueError("Frame rate must be between 1 and 1000", fps)
+        self._owner = driver.instance if owner is None else owner
+        self._frameMs = 1000 // fps
+        self._frame = 0
+        self._active = []
+
+    '''
+    Get the time (ms) between frames
+    '''
+    def frameMs(self):
+        return self._frameMs
+
+    '''
+    Get the number of LEDs currently fading
+    '''
+    def numFading(self):
+        return len(self._active)
+
+    '''
+    The fader only has anything to do while LEDs are fading
+    '''
+    def hasTasks(self):
+        return len(self._active) > 0
+
+    '''
+    Get the period (ms) of the fader
+    '''
+    def period(self):
+        return self._frameMs
+
+    '''
+    Prepare the fader to run
+
+    Returns the time (ms) from the start at which the first frame is due
+    '''
+    def _reset(self):
+        return self._frameMs
+
+    '''
+    Start fading the LED, playing the fader (starting its frames) on its driver if it is the first LED to fade
+
+    * led - PwmLed to fade
+    '''
+    def _start(self, led):
+        self._active.append(led)
+        if len(self._active) == 1:
+            self._owner.play(self)
+
+    '''
+    Update all of the fading LEDs for the next frame, dropping those whose fade is complete
+
+    Returns the time (ms) from now at which the next frame is due, None once no LEDs remain fading (the fader is then
+    played again when the next fade starts)
+    '''
+    def _fire(self):
+        self._frame += 1
+        frame = self._frame
+        active = self._active
+        i = 0
+        while i < len(active):
+            if active[i]._update(frame):
+                active[i] = active[-1]
+                active.pop()
+            else:
+                i += 1
+        if not active:
+            return None
+        return self._frameMs
+
+    '''
+    Get the time (ms) from the frame that is due until the following one
+    '''
+    def _nextDelay(self):
+        return self._frameMs
+
+    '''
+    Move on past the frame that is due without updating the LEDs (the next frame brings them to where they should be)
+
+    Returns the time (ms) until the next frame
+    '''
+    def _skip(self):
+        self._frame += 1
+        return self._frameMs
+
+    '''
+    Skip the frame that is due, as with _skip (only the latest frame matters)
+
+    Returns the time (ms) until the next frame
+    '''
+    def _coalesce(self):
+        return self._skip()
+
+    '''
+    Nothing is deferred by skipped frames
+    '''
+    def _flush(self):
+        pass
+
+    '''
+    Updating the frames allocates no memory (once the list of active fades has grown), so there is nothing to prepare
+    '''
+    def _freeze(self):
+        pass
+
+    '''
+    The duty cycles of the LEDs are lost when the board is reset, so the fader has no position which can be kept
+    '''
+    def _position(self):
+        return None
+
+    '''
+    The fader cannot continue on from a position
+    '''
+    def _resume(self, position):
+        return False
+
+# The Fader shared by all PwmBanks
+_shared = None
+
+'''
+Get the Fader shared by all PwmBanks, creating it (and adding it to the driver.instance) if it is not yet owned by the
+current driver.instance
+'''
+def sharedFader():
+    global _shared
+    if _shared is None or _shared._owner is not driver.instance:
+        _shared = Fader(owner = driver.instance)
+        driver.instance.add(_shared)
+    return _shared
@@ -0,0 +1,129 @@
+"""
+Output which records every transition of its pins, along with the time at which it took place, rather than controlling any
+actual pins. Combined with a Driver running against a VirtualClock, this allows for the behavior of lights to be verified
+without any hardware (i.e.: checking the duty cycle of each LED, or that conflicting LEDs are never lit at the same time,
+over hours of simulated time). Transitions which do not change the state of a pin are not recorded.
+
+The recorder can be used as the output of any light, with the pin numbers being used only to identify the transitions.
+
+Example:
+
+clock = VirtualClock()
+recorder = Recorder(clock)
+builder = IntersectionBuilder(IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 3, recorder)
+builder.addTrafficLight(0, 1, 2)
+builder.addTrafficLight(10, 11, 12)
+builder.build()
+driver.runFor(3600000)
+print(recorder.onTimeMs(2))
+"""
+class Recorder:
+
+    '''
+    CTOR
+
+    * clock - from which to obtain the time of each transition (must provide elapsedMs(), i.e.: a VirtualClock)
+    '''
+    def __init__(self, clock):
+        self._clock = clock
+        self._transitions = []
+        self._pins = {}
+
+    '''
+    Get the pin with the specified number
+
+    * pinNum - identifying the pin in the recorded transitions
+    '''
+    def pin(self, pinNum):
+        if not pinNum in self._pins:
+            self._pins[pinNum] = RecordedPin(self, pinNum)
+        return self._pins[pinNum]
+
+    '''
+    Nothing to commit, the transitions are recorded as they happen
+    '''
+    def commit(self):
+        pass
+
+    '''
+    Record the transition of a pin
+
+    * pinNum - which transitioned
+    * level - the new level (1 or 0) of the pin
+    '''
+    def _record(self, pinNum, level):
+        self._transitions.append((self._clock.elapsedMs(), pinNum, level))
+
+    '''
+    Get the recorded transitions as a list of tupples (time (ms), pinNum, level)
+
+    * pinNum - for which to get the transitions (default None, the transitions of all pins)
+    '''
+    def transitions(self, pinNum = None):
+        if pinNum is None:
+            return list(self._transitions)
+        return [t for t in self._transitions if t[1] == pinNum]
+
+    '''
+    Get the total time (ms) for which the pin was high, up until the specified time
+
+    * pinNum - for which to get the time
+    * untilMs - up to which to count (default None, the current time of the clock)
+    '''
+    def onTimeMs(self, pinNum, untilMs = None):
+        if untilMs is None:
+            untilMs = self._clock.elapsedMs()
+
+        total = 0
+        onSince = None
+        for time, num, level in self._transitions:
+            if num != pinNum or time > untilMs:
+                continue
+            if level and onSince is None:
+                onSince = time
+            elif not level and onSince is not None:
+                total += time - onSince
+                onSince = None
+
+        if onSince is not None:
+            total += untilMs - onSince
+        return total
+
+'''
+A single pin of a Recorder, which can be used in place of a machine.Pin
+'''
+class RecordedPin:
+
+    '''
+    CTOR
+
+    * recorder - to which the pin belongs
+    * pinNum - identifying the pin
+    '''
+    def __init__(self, recorder, pinNum):
+        self._recorder = recorder
+        self._pinNum = pinNum
+        self._level = None
+
+    '''
+    Set the pin high
+    '''
+    def high(self):
+        self.value(1)
+
+    '''
+    Set the pin low
+    '''
+    def low(self):
+        self.value(0)
+
+    '''
+    Set the pin to the specified value
+
+    * value - true (or 1) for high
+    '''
+    def value(self, value):
+        level = 1 if value else 0
+        if level != self._level:
+            self._level = level
+            self._recorder._record(self._pinNum, level)
@@ -0,0 +1,148 @@
+from machine import Pin
+
+"""
+Output through a chain of daisy-chained 74HC595 shift registers, allowing for far more LEDs to be controlled than there are
+GPIO pins on the board (8 per register, with only 3 GPIO pins required for the whole chain). The state of all outputs is kept
+in a shadow buffer (one byte per register), with changes only being made to the buffer. When committed, if anything in the
+buffer has changed the whole buffer is shifted out to the chain in a single burst (via SPI if provided, otherwise bit-banged
+through the data and clock pins) and then latched onto the outputs of the registers.
+
+Each output of the chain is identified by its channel, with channels 0-7 being the outputs (Q0-Q7) of the first register in
+the chain (the one connected to the board), 8-15 of the second, and so on. The pins provided for the channels can be used in
+place of a machine.Pin by the lights (i.e.: passed as the output of a TrafficLight or IntersectionBuilder, with channel numbers
+specified in place of pin numbers). When driven via an EventTable, the chain is committed after each set of transitions taking
+place at the same time.
+
+Example:
+
+chain = ShiftRegister(6, latchPinNum=5, spi=SPI(0, baudrate=1000000, sck=Pin(6), mosi=Pin(7)))
+builder = IntersectionBuilder(IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 3, chain)
+builder.addTrafficLight(0, 1, 2)
+builder.addTrafficLight(3, 4, 5)
+"""
+class ShiftRegister:
+
+    # Number of outputs per register
+    CHANNELS_PER_REGISTER = 8
+
+    '''
+    CTOR
+
+    * numRegisters - the number of registers in the chain
+    * latchPinNum - the number of the GPIO pin connected to the latch (RCLK) of the registers
+    * spi - SPI bus through which to shift out the data (its MOSI connected to SER and SCK to SRCLK). If None (default) the
+            data is bit-banged through the data and clock pins
+    * dataPinNum - the number of the GPIO pin connected to the data input (SER) of the first register, when bit-banging
+    * clockPinNum - the number of the GPIO pin connected to the shift clock (SRCLK) of the registers, when bit-banging
+    '''
+    def __init__(self, numRegisters, latchPinNum, spi = None, dataPinNum = None, clockPinNum = None):
+        if numRegisters <= 0:
+            raise ValueError("Must have at least one register", numRegisters)
+        if spi is None and (dataPinNum is None or clockPinNum is None):
+            raise ValueError("Data and clock pins are required when not using SPI")
+
+        self._spi = spi
+        self._latch = Pin(latchPinNum, Pin.OUT)
+        self._latch.low()
+        if spi is None:
+            self._data = Pin(dataPinNum, Pin.OUT)
+            self._clock = Pin(clockPinNum, Pin.OUT)
+            self._clock.low()
+
+        # Ordered as shifted out, the last register in the chain first
+        self._buffer = bytearray(numRegisters)
+        self._isDirty = True
+
+    '''
+    Get the number of channels (outputs) available in the chain
+    '''
+    def numChannels(self):
+        return len(self._buffer) * self.CHANNELS_PER_REGISTER
+
+    '''
+    Get the pin controlling the specified channel
+
+    * channel - the number of the output within the chain
+    '''
+    def pin(self, channel):
+        if channel < 0 or channel >= self.numChannels():
+            raise ValueError("Invalid channel", channel)
+
+        register = channel // self.CHANNELS_PER_REGISTER
+        return ShiftPin(self, len(self._buffer) - 1 - register, 1 << (channel % self.CHANNELS_PER_REGISTER))
+
+    '''
+    Shift out the buffer and latch it onto the outputs, but only if anything has changed since the last commit
+    '''
+    def commit(self):
+        if not self._isDirty:
+            return
+
+        if self._spi is not None:
+            self._spi.write(self._buffer)
+        else:
+            self._bitBang()
+        self._latch.high()
+        self._latch.low()
+        self._isDirty = False
+
+    '''
+    Shift out the buffer through the data and clock pins, most significant bit (Q7) first
+    '''
+    def _bitBang(self):
+        data = self._data
+        clock = self._clock
+        for b in self._buffer:
+            mask = 0x80
+            while mask:
+                data.value(b & mask)
+                clock.high()
+                clock.low()
+                mask >>= 1
+
+'''
+A single output of a ShiftRegister chain, which can be used in place of a machine.Pin. Changes are made to the buffer of
+the chain, and only applied once it is committed.
+'''
+class ShiftPin:
+
+    '''
+    CTOR
+
+    * register - chain to which the output belongs
+    * index - of the byte within the buffer of the chain
+    * mask - of the output within the byte
+    '''
+    def __init__(self, register, index, mask):
+        self._register = register
+        self._index = index
+        self._mask = mask
+
+    '''
+    Set the output high (once committed)
+    '''
+    def high(self):
+        buffer = self._register._buffer
+        if not buffer[self._index] & self._mask:
+            buffer[self._index] |= self._mask
+            self._register._isDirty = True
+
+    '''
+    Set the output low (once committed)
+    '''
+    def low(self):
+        buffer = self._register._buffer
+        if buffer[self._index] & self._mask:
+            buffer[self._index] &= ~self._mask
+            self._register._isDirty = True
+
+    '''
+    Set the output to the specified value (once committed)
+
+    * value - true (or 1) for high
+    '''
+    def value(self, value):
+        if value:
+            self.high()
+        else:
+            self.low()
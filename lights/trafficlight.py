@@ -1,11 +1,25 @@
-from common.driver import instance as driver
-from machine import Pin
+from common.driver import toMs
+from lights.eventtable import EventTable
+from lights.light import Light
+from lights.pattern import LightAction, Pattern, _limitToPeriod
+import common.driver as driver
 import common.enum as enum
+import struct
+
+try:
+    import binascii
+except ImportError:
+    import ubinascii as binascii
+
+# Time (ticks) at which the traffic lights were first imported (i.e.: shortly after boot), from which bootMs() is measured.
+# Read from the clock of the driver.instance, as are the ticks of the first transitions
+_bootTicks = driver.instance.clock().ticks_ms()
 
 '''
-Provides controls for all of the lights (LEDs) that belond to a given traffic light.
+Provides controls for all of the lights (LEDs) that belond to a given traffic light. A Light with the
+three aspects RED, YELLOW and GREEN (in that order).
 '''
-class TrafficLight:   
+class TrafficLight(Light):   
     COLOUR = enum.create('RED', 'YELLOW', 'GREEN')
 
     '''
@@ -14,200 +28,143 @@ class TrafficLight:
     * redPinNum - the number of the pin on the board through which to control the RED LED of the traffic light
     * yellowPinNum - the number of the pin on the board through which to control the YELLOW LED of the traffic light
     * greenPinNum - the number of the pin on the board through which to control the GREEN LED of the traffic light
-    * greenTimeSec - the number of seconds the green light will be lit
+    * greenTimeSec - the number of seconds the green light will be lit (fractions of a second are allowed)
+    * output - through which the pins are controlled (i.e.: a PortBank), must provide pin(pinNum) and commit(). If None (default)
+               the pins are controlled directly as GPIO pins. Changes made through an output take effect once it is committed
     '''         
-    def __init__(self, redPinNum, yellowPinNum, greenPinNum, greenTimeSec):
-        self._lights = [Pin(redPinNum, Pin.OUT), Pin(yellowPinNum, Pin.OUT), Pin(greenPinNum, Pin.OUT)]
-        self.__allOff()
-        self._greenTime = greenTimeSec
-        
-    '''
-    Turns off all LEDs
-    '''
-    def __allOff(self):
-        for led in self._lights:
-            led.low()
-            
-    '''
-    Turns on the LED at the given index
-    '''
-    def __on(self, index):
-        self._lights[index].high()
-        
+    def __init__(self, redPinNum, yellowPinNum, greenPinNum, greenTimeSec, output = None):
+        super(TrafficLight, self).__init__([redPinNum, yellowPinNum, greenPinNum], output)
+        self._greenTimeMs = toMs(greenTimeSec)
+
     '''
-    Turns off the LED at the given index
+    Create the table of actions, employing the named methods for each colour
     '''
-    def __off(self, index):
-        self._lights[index].low()
+    def _createActions(self):
+        return [self.offRed, self.onRed, self.offYellow, self.onYellow, self.offGreen, self.onGreen]
     
     '''
     Turns on the RED LED
     '''
     def onRed(self):
-        self.__on(self.COLOUR.RED)
+        self._set(self.COLOUR.RED, True)
             
     '''
     Turns off the RED LED
     '''
     def offRed(self):
-        self.__off(self.COLOUR.RED)
+        self._set(self.COLOUR.RED, False)
             
     '''
     Turns on the YELLOW LED
     '''
     def onYellow(self):
-        self.__on(self.COLOUR.YELLOW)
+        self._set(self.COLOUR.YELLOW, True)
             
     '''
     Turns off the YELLOW LED
     '''
     def offYellow(self):
-        self.__off(self.COLOUR.YELLOW)
+        self._set(self.COLOUR.YELLOW, False)
             
     '''
     Turns on the Green LED
     '''
     def onGreen(self):
-        self.__on(self.COLOUR.GREEN)
+        self._set(self.COLOUR.GREEN, True)
             
     '''
-    Turns off the RED LED
+    Turns off the GREEN LED
     '''
     def offGreen(self):
-        self.__off(self.COLOUR.GREEN)
+        self._set(self.COLOUR.GREEN, False)
 
 '''
-Helper that acts as a tupple associating which colour LED turn on/off at what time.
-'''
-class LightAction:
-    def __init__(self, colour, isOn, time):
-        self._colour = colour
-        self._isOn = isOn
-        self._time = time
-
-'''
-Get a reference to the method which places the LED of the specified colour into the specified state
-
-* trafficLight - whose LEDs to update
-* colour - the colour of the traffic light to update
-* isOn - true if the light should turn on
-'''
-def _callForTrafficLight(trafficLight, colour, isOn):
-    if colour == trafficLight.COLOUR.RED and isOn:
-        return trafficLight.onRed
-    if colour == trafficLight.COLOUR.RED:
-        return trafficLight.offRed
-    if colour == trafficLight.COLOUR.YELLOW and isOn:
-        return trafficLight.onYellow
-    if colour == trafficLight.COLOUR.YELLOW:
-        return trafficLight.offYellow
-    if colour == trafficLight.COLOUR.GREEN and isOn:
-        return trafficLight.onGreen
-    if colour == trafficLight.COLOUR.GREEN:
-        return trafficLight.offGreen
-    
-    raise ValueError("Invalid color specified", colour)
-
-'''
-Register the specified LightActions with the driver
+Register the specified LightActions with the schedule
 
+* schedule - with which to register the actions
 * trafficLight - on which the action is to take place
 * actions - array of actions to perform (which colour, which state, at which time)
 '''
-def _registerPattern(trafficLight, actions):
+def _registerPattern(schedule, trafficLight, actions):
     for act in actions:
-        driver.register(act._time, _callForTrafficLight(trafficLight, act._colour, act._isOn))
+        schedule.registerMs(act._time, trafficLight.action(act._colour, act._isOn))
 
-'''
-Limits the value to be within 0 and the period.
+# Bitmasks of the aspects of a TrafficLight, for defining its patterns
+_RED = 1 << TrafficLight.COLOUR.RED
+_YELLOW = 1 << TrafficLight.COLOUR.YELLOW
+_GREEN = 1 << TrafficLight.COLOUR.GREEN
 
-* value - to ensure within the period (must be greater than or equal to 0)
-* period - the limit (must be greater than 0)
-'''
-def _limitToPeriod(value, period):
-    if (value < 0):
-        raise ValueError("Negative value is not allowed", value)
-    if (period <= 0):
-        raise ValueError("Period must be greater than 0", period)
-    if (value <= period):
-        return value
-    
-    return value % period
-    
 '''
-Create the blink pattern for a traffic light that goes Red -> Green -> Yellow
-
-* trafficLight - which controls the lights
-* offset - time (seconds) at which point the blink pattern should start
-* greenTime - time (second) that the green light is to be on for
-* yellowTime - time (seconds) that the yellow light is to be one for
-* redTime - time (seconds) that the rest light is to be on for
-* period - time (seconds) required for the whole intersection to cycle through
+Define the pattern for a traffic light that goes Red -> Green -> Yellow
+
+* greenTime - time (milliseconds) that the green light is to be on for
+* yellowTime - time (milliseconds) that the yellow light is to be one for
+* redTime - time (milliseconds) that the rest light is to be on for
+
+Returns the steps of the Pattern, starting from the green light turning on
 '''
-def _createRed_Green_Yellow(trafficLight, offset, greenTime, yellowTime, redTime, period):
-    nextTime = offset
-    actions = [LightAction(trafficLight.COLOUR.GREEN, True, nextTime)]
-    nextTime = _limitToPeriod(nextTime + greenTime, period)
-    actions.append(LightAction(trafficLight.COLOUR.GREEN, False, nextTime))
-    actions.append(LightAction(trafficLight.COLOUR.YELLOW, True, nextTime))
-    nextTime = _limitToPeriod(nextTime + yellowTime, period)
-    actions.append(LightAction(trafficLight.COLOUR.YELLOW, False, nextTime))
-    actions.append(LightAction(trafficLight.COLOUR.RED, True, nextTime))
-    nextTime = _limitToPeriod(nextTime + redTime, period)
-    actions.append(LightAction(trafficLight.COLOUR.RED, False, nextTime))
-    _registerPattern(trafficLight, actions)
+def _red_Green_Yellow(greenTime, yellowTime, redTime):
+    return [(_GREEN, greenTime), (_YELLOW, yellowTime), (_RED, redTime)]
 
 '''
-Create the blink pattern for a traffic light that goes Red -> Red+Yellow -> Green -> Yellow
-
-* trafficLight - which controls the lights
-* offset - time (seconds) at which point the blink pattern should start
-* greenTime - time (second) that the green light is to be on for
-* yellowTime - time (seconds) that the yellow light is to be one for
-* redTime - time (seconds) that the rest light is to be on for
-* period - time (seconds) required for the whole intersection to cycle through
+Define the pattern for a traffic light that goes Red -> Red+Yellow -> Green -> Yellow, with the red and yellow lights both
+on for the last yellowTime of the red time
+
+* greenTime - time (milliseconds) that the green light is to be on for
+* yellowTime - time (milliseconds) that the yellow light is to be one for
+* redTime - time (milliseconds) that the rest light is to be on for
+
+Returns the steps of the Pattern, starting from the green light turning on
 '''
-def _createRed_RedYellow_Green_Yellow(trafficLight, offset, greenTime, yellowTime, redTime, period):
-    nextTime = offset
-    actions = [LightAction(trafficLight.COLOUR.GREEN, True, nextTime)]
-    nextTime = _limitToPeriod(nextTime + greenTime, period)
-    actions.append(LightAction(trafficLight.COLOUR.GREEN, False, nextTime))
-    actions.append(LightAction(trafficLight.COLOUR.YELLOW, True, nextTime))
-    nextTime = _limitToPeriod(nextTime + yellowTime, period)
-    actions.append(LightAction(trafficLight.COLOUR.YELLOW, False, nextTime))
-    actions.append(LightAction(trafficLight.COLOUR.RED, True, nextTime))
-    nextTime = _limitToPeriod(nextTime + redTime - yellowTime, period)
-    actions.append(LightAction(trafficLight.COLOUR.YELLOW, True, nextTime))
-    nextTime = _limitToPeriod(nextTime + yellowTime, period)
-    actions.append(LightAction(trafficLight.COLOUR.RED, False, nextTime))
-    actions.append(LightAction(trafficLight.COLOUR.YELLOW, False, nextTime))
-    _registerPattern(trafficLight, actions)
+def _red_RedYellow_Green_Yellow(greenTime, yellowTime, redTime):
+    redYellowTime = min(yellowTime, redTime)
+    return [(_GREEN, greenTime), (_YELLOW, yellowTime), (_RED, redTime - redYellowTime), (_RED | _YELLOW, redYellowTime)]
 
 '''
 Builder which creates all of the lights and their behaviors for an intersection.
 Note that the singleton driver.instance driver is employed by the IntersectionBuilder
-and once everything is defined it must be started to the intersection operation
+and once everything is defined it must be started to the intersection operation.
+To employ a different kind of driver (i.e.: common.asyncdriver.AsyncDriver), assign
+it to driver.instance before building the intersection.
+
+Once built, the intersection can be reconfigured while the driver is running (changing
+the green or yellow times, or adding and removing traffic lights). Only the patterns of
+the traffic lights affected by the change are recomputed, and they are spliced into the
+EventTable at the next cycle boundary so that the intersection keeps its phase. When the
+driver runs in a thread of its own (ThreadDriver), reconfigure via driver.call().
+
+To speed up booting, the compiled EventTable can be cached in a file (build(cachePath)).
+The first build saves it, and later builds (with the same config) load it straight back
+in rather than computing the patterns again.
 '''
 class IntersectionBuilder:
     
     # The types of lights that can be employed in the intersection
     TYPE = enum.create('RED_GREEN_YELLOW', 'RED_REDYELLOW_GREEN_YELLOW')
-    # Mapping of light TYPE to the creator for desired behavior
-    _creators = {
-        TYPE.RED_GREEN_YELLOW: _createRed_Green_Yellow,
-        TYPE.RED_REDYELLOW_GREEN_YELLOW: _createRed_RedYellow_Green_Yellow
+    # Revision of the pattern definitions, part of the config hash so that tables cached by older definitions are not loaded
+    _PATTERN_REVISION = 1
+    # Mapping of light TYPE to the definition of its Pattern
+    _definitions = {
+        TYPE.RED_GREEN_YELLOW: _red_Green_Yellow,
+        TYPE.RED_REDYELLOW_GREEN_YELLOW: _red_RedYellow_Green_Yellow
     }
     
     '''
     CTOR
 
     * typeOfLight - TYPE indicating the behavior of the lights in the intersection
-    * yellowTimeSec - time (seconds) that the yellow light is to be on for (default 3s)
+    * yellowTimeSec - time (seconds) that the yellow light is to be on for (default 3s, fractions of a second are allowed)
+    * output - through which the pins of all traffic lights are controlled (i.e.: a PortBank). If None (default) the pins
+               are controlled directly as GPIO pins
     '''
-    def __init__(self, typeOfLight, yellowTimeSec = 3):
+    def __init__(self, typeOfLight, yellowTimeSec = 3, output = None):
         self._trafficLight = []
-        self._creator = self._creators[typeOfLight]
-        self._yellowTime = yellowTimeSec
+        self._output = output
+        self._typeOfLight = typeOfLight
+        self._definition = self._definitions[typeOfLight]
+        self._yellowTimeMs = toMs(yellowTimeSec)
+        self._table = None
+        self._clock = None
     
     '''
     Add a traffic light to the intersection
@@ -215,38 +172,196 @@ class IntersectionBuilder:
     * redPin - the number of the GPIO pin for controlling the red LED
     * yellowPin - the number of the GPIO pin for controlling the yellow LED
     * greenPin - the number of the GPIO pin for controlling the green LED
-    * greenTimeSec - time (seconds) that the green light is to be one for
+    * greenTimeSec - time (seconds) that the green light is to be one for (fractions of a second are allowed)
     '''
     def addTrafficLight(self, redPin, yellowPin, greenPin, greenTimeSec = 42):
-        self._trafficLight.append(TrafficLight(redPin, yellowPin, greenPin, greenTimeSec))
+        self._trafficLight.append(TrafficLight(redPin, yellowPin, greenPin, greenTimeSec, self._output))
+        self._restage(len(self._trafficLight) - 1)
+
+    '''
+    Remove a traffic light from the intersection. If already built, its LEDs are turned off at the next cycle boundary.
+
+    * index - of the traffic light (in the order in which they were added)
+    '''
+    def removeTrafficLight(self, index):
+        if index < 0 or index >= len(self._trafficLight):
+            raise ValueError("Invalid traffic light", index)
+        if self._table is not None and len(self._trafficLight) == 1:
+            raise ValueError("Cannot remove the only traffic light of a built intersection", index)
+
+        removed = self._trafficLight.pop(index)
+        self._restage(index, removed)
+
+    '''
+    Change the time the green light of a traffic light is on for
+
+    * index - of the traffic light (in the order in which they were added)
+    * greenTimeSec - time (seconds) that the green light is to be on for (fractions of a second are allowed)
+    '''
+    def setGreenTime(self, index, greenTimeSec):
+        if index < 0 or index >= len(self._trafficLight):
+            raise ValueError("Invalid traffic light", index)
+        self._trafficLight[index]._greenTimeMs = toMs(greenTimeSec)
+        self._restage(index)
 
     '''
-    Build the traffic lights and define their behavior.
+    Change the time the yellow light of all traffic lights is on for
+
+    * yellowTimeSec - time (seconds) that the yellow light is to be on for (fractions of a second are allowed)
+    '''
+    def setYellowTime(self, yellowTimeSec):
+        self._yellowTimeMs = toMs(yellowTimeSec)
+        self._restage(0)
+
+    '''
+    Get the number of writes to the pins that have been issued by all traffic lights in the intersection, and the
+    number that were skipped as they would not have changed the state of the LED
+
+    Returns a tupple of (issued, skipped)
     '''
-    def build(self):
-        period = self._yellowTime * len(self._trafficLight)
+    def writeStats(self):
+        writes = 0
+        skipped = 0
         for tl in self._trafficLight:
-            period += tl._greenTime
-        
-        offset = 0
+            writes += tl._writes
+            skipped += tl._skipped
+        return (writes, skipped)
+
+    '''
+    Build the traffic lights and define their behavior. The behavior of the intersection is compiled into an EventTable
+    which is added to the driver, repeating with the period of the intersection independently of anything else that is driven.
+
+    * cachePath - of the file in which to cache the compiled EventTable (default None, not cached). If the file holds the
+                  table of the same config (type, yellow time, and number and green times of the traffic lights) it is
+                  loaded rather than compiled, otherwise the table is compiled and saved to the file
+
+    Returns the EventTable of the intersection, None if the intersection has no traffic lights (in which case nothing is
+    built or added to the driver)
+    '''
+    def build(self, cachePath = None):
+        if not self._trafficLight:
+            return None
+
+        table = EventTable(self._period())
         for i in range(len(self._trafficLight)):
             tl = self._trafficLight[i]
             if i == 0:
                 tl.onGreen()
             else:
                 tl.onRed()
-                
-            gt = tl._greenTime
-            cycle = gt + self._yellowTime
-            self._creator(tl, offset, gt, self._yellowTime, period - cycle, period)
+
+        if self._output is not None:
+            self._output.commit()
+        if cachePath is None or not self._loadTable(table, cachePath):
+            self._createPatterns(0, table.addPattern)
+            table.compile()
+            if cachePath is not None:
+                with open(cachePath, 'wb') as f:
+                    table.save(f, self.configHash())
+
+        self._clock = driver.instance.clock()
+        table.markFirstTransition(self._clock)
+        driver.instance.add(table)
+        self._table = table
+        return table
+
+    '''
+    Get the hash of the config of the intersection, which determines the compiled EventTable (the pins of the traffic lights
+    don't affect the table, so they are not part of the hash)
+    '''
+    def configHash(self):
+        greenTimes = [tl._greenTimeMs for tl in self._trafficLight]
+        config = struct.pack('<BBII' + 'I' * len(greenTimes), self._PATTERN_REVISION, self._typeOfLight, self._yellowTimeMs,
+                             len(greenTimes), *greenTimes)
+        return binascii.crc32(config) & 0xffffffff
+
+    '''
+    Get the time (ms) from boot (the traffic lights being imported) until the first transitions of the built intersection
+    were performed, None if not built or not yet performed
+    '''
+    def bootMs(self):
+        ticks = None if self._table is None else self._table.firstTransitionTicks()
+        if ticks is None:
+            return None
+        return self._clock.ticks_diff(ticks, _bootTicks)
+
+    '''
+    Load the compiled EventTable from the cache file
+
+    * table - into which to load
+    * cachePath - of the cache file
+
+    Returns True if loaded, False if there is no cache file or it does not match the config
+    '''
+    def _loadTable(self, table, cachePath):
+        try:
+            with open(cachePath, 'rb') as f:
+                return table.load(f, self._trafficLight, self.configHash())
+        except OSError:
+            return False
+
+    '''
+    Get the period (ms) of the intersection
+    '''
+    def _period(self):
+        period = self._yellowTimeMs * len(self._trafficLight)
+        for tl in self._trafficLight:
+            period += tl._greenTimeMs
+        return period
+
+    '''
+    Create the patterns of the traffic lights from the specified one onwards (the offset of each following light depending
+    on those before it), along with that of the first traffic light (whose pattern ends at the end of the period). The
+    pattern of each light is compiled from the definition of the TYPE.
+
+    * fromIndex - of the first traffic light whose pattern is to be created
+    * addPattern - through which to add each pattern, as addPattern(trafficLight, actions)
+    '''
+    def _createPatterns(self, fromIndex, addPattern):
+        period = self._period()
+        offset = 0
+        for i in range(len(self._trafficLight)):
+            tl = self._trafficLight[i]
+            gt = tl._greenTimeMs
+            cycle = gt + self._yellowTimeMs
+            if i >= fromIndex or i == 0:
+                addPattern(tl, Pattern(self._definition(gt, self._yellowTimeMs, period - cycle), offset).compile())
             offset += cycle
 
+    '''
+    Stage the changed patterns with the EventTable of the built intersection, to be spliced in at its next cycle boundary.
+    All of the changes (along with the new period) are staged as a single batch.
+
+    * fromIndex - of the first traffic light affected by the change
+    * removed - traffic light which was removed from the intersection, whose pattern is to be removed (default None)
+    '''
+    def _restage(self, fromIndex, removed = None):
+        if self._table is None or not self._trafficLight:
+            return
+        changes = [] if removed is None else [(removed, None)]
+        self._createPatterns(fromIndex, lambda tl, actions: changes.append((tl, actions)))
+        self._table.stageChanges(changes, self._period())
+
 '''
 Starts the traffic light so that they begin blinking.
 
 Note this starts the driver.instance that is employed by the IntersectionBuilder.
 If that driver is used in multiple locations, then first register all tasks and
-once ready start it once.
+once ready start it once. If the driver.instance is an AsyncDriver, control of the
+thread is handed over to a new event loop running the driver.
 '''
 def start():
-    driver.start()
+    driver.instance.start()
+
+'''
+Coroutine which runs the traffic lights on an already running event loop, alongside
+any other coroutines. Requires the driver.instance to be an AsyncDriver.
+
+Example:
+
+common.driver.instance = AsyncDriver()
+... build intersections ...
+asyncio.create_task(trafficlight.run())
+'''
+def run():
+    return driver.instance.run()
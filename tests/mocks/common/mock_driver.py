@@ -5,26 +5,16 @@ class MockDriver(driver.Driver):
     def __init__(self):
         super(MockDriver, self).__init__()
         self._hasTakenStep = False
-        self._numTasksRegistered = 0
+        self._lastStepped = None
 
     def reset(self):
-        self._tasks = {}
-        self._timings = []
-        self._index = 0
-        self._currentTime = 0
-        self._isAlive = False
+        driver.Driver.__init__(self)
         self._hasTakenStep = False
-        self._numTasksRegistered = 0
-
-    def register(self, time, task):
-        super(MockDriver, self).register(time, task)
-        self._numTasksRegistered += 1
+        self._lastStepped = None
 
     def start(self):
-        self._isAlive = True
-        self._index = 0
+        self._prepare()
         self._hasTakenStep = False
-        self._organizeTasks()
 
     def step(self):
         if not self._isAlive:
@@ -32,18 +22,15 @@ class MockDriver(driver.Driver):
         
         self._hasTakenStep = True
         print('Stepping...')
-        for task in self._tasks[self._timings[self._index]]:
-            print('Executing :', task)
-            task()
-        
-        print('Index', self._index, 'Size', len(self._timings))
-        self._index = (self._index + 1) % len(self._timings)
+        self._lastStepped = self._queue[0][2]
+        print('Executing at', self._queue[0][0], ':', self._lastStepped)
+        self._trigger()
 
     def stop(self):
         self._isAlive = False
 
     def hasLooped(self):
-        return self._hasTakenStep and self._index == 0
+        return self._hasTakenStep and self._lastStepped._index == 0
 
 class TaskTupple:
     def __init__(self, time, task):
@@ -53,11 +40,26 @@ class TaskTupple:
 mockDriver = MockDriver()
 driver.instance = mockDriver
 
-def assertNumTasksRegistered(expectedNumTasks):
-    assert expectedNumTasks == mockDriver._numTasksRegistered, 'Incorrect number of registered tasks, expected ' + str(expectedNumTasks) +  ' but was ' + str(mockDriver._numTasksRegistered)
+'''
+Get all of the tasks registered with the schedule, or with all schedules of the mock driver if no schedule is specified,
+as a dict of time to list of tasks
+'''
+def registeredTasks(schedule = None):
+    schedules = mockDriver._schedules if schedule is None else [schedule]
+    registered = {}
+    for s in schedules:
+        for t in s._tasks.keys():
+            if not t in registered:
+                registered[t] = []
+            registered[t].extend(s._tasks[t])
+    return registered
+
+def assertNumTasksRegistered(expectedNumTasks, schedule = None):
+    numTasks = sum(map(len, registeredTasks(schedule).values()))
+    assert expectedNumTasks == numTasks, 'Incorrect number of registered tasks, expected ' + str(expectedNumTasks) +  ' but was ' + str(numTasks)
 
-def assertTasksRegistered(expectedTasks):
-    assertNumTasksRegistered(len(expectedTasks))
+def assertTasksRegistered(expectedTasks, schedule = None):
+    assertNumTasksRegistered(len(expectedTasks), schedule)
 
     expectedDict = {}
     for t in expectedTasks:
@@ -65,10 +67,11 @@ def assertTasksRegistered(expectedTasks):
             expectedDict[t._time] = []
         expectedDict[t._time].append(t._task)
 
+    registered = registeredTasks(schedule)
     for t in expectedDict.keys():
         exp = expectedDict[t]
-        assert t in mockDriver._tasks, 'No tasks registered at time ' + str(t) + '. Expected ' + str(len(exp)) + ' task(s)'
-        actual = mockDriver._tasks[t]
+        assert t in registered, 'No tasks registered at time ' + str(t) + '. Expected ' + str(len(exp)) + ' task(s)'
+        actual = registered[t]
 
         assert len(exp) == len(actual), 'Different number of tasks registered for time ' + str(t) + '. Expected ' + str(len(exp)) + ' but was ' + str(len(actual))
         for i in range(len(exp)):
@@ -6,21 +6,62 @@ import sys
 Mocking of the micropython machine module
 """
 
+# Every state set on any pin, in order, as (pinNum, state)
+pinLog = []
+
+def resetPinLog():
+    pinLog.clear()
+
 class Pin():
 
     IN = 'IN'
     OUT = 'OUT'
+    PULL_UP = 'PULL_UP'
+    PULL_DOWN = 'PULL_DOWN'
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
     
-    def __init__(self, pinNum, pinType):
+    def __init__(self, pinNum, pinType, pull = None):
         self._pinNum = pinNum
         self._pinType = pinType
-        self._state = False
+        self._pull = pull
+        self._state = pull == self.PULL_UP
+        self._irqHandler = None
+        self._irqTrigger = None
+
+    def irq(self, handler = None, trigger = IRQ_RISING | IRQ_FALLING):
+        self._irqHandler = handler
+        self._irqTrigger = trigger
+
+    # Simulate the input changing to the state, calling the IRQ handler should the edge match its trigger
+    def simulateInput(self, state):
+        state = bool(state)
+        if state == self._state:
+            return
+        self._state = state
+        edge = self.IRQ_RISING if state else self.IRQ_FALLING
+        if self._irqHandler is not None and self._irqTrigger & edge:
+            self._irqHandler(self)
+
+    # Simulate a pulse of the input (rising then falling edge, or the reverse if pulled up)
+    def simulatePulse(self):
+        self.simulateInput(not self._state)
+        self.simulateInput(not self._state)
 
     def low(self):
-        self._state = False
+        self._setState(False)
 
     def high(self):
-        self._state = True
+        self._setState(True)
+
+    def value(self, value = None):
+        if value is None:
+            return 1 if self._state else 0
+        self._setState(bool(value))
+
+    def _setState(self, state):
+        self._state = state
+        pinLog.append((self._pinNum, state))
 
     def assertPin(self, expectedNum, expectedType):
         assert expectedNum == self._pinNum, 'Incorrect pin number, expected ' + str(expectedNum) +  ' but was ' + str(self._pinNum)
@@ -30,3 +71,149 @@ class Pin():
         assert expectedState == self._state, 'Incorrect state, expected ' + str(expectedState) + ' but was ' + str(self._state)
 
 
+class PWM():
+
+    def __init__(self, pin):
+        self._pin = pin
+        self._freq = None
+        self._duty = 0
+        self._duties = []
+
+    def freq(self, value = None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value = None):
+        if value is None:
+            return self._duty
+        assert 0 <= value <= 65535, 'Duty out of range ' + str(value)
+        self._duty = value
+        self._duties.append(value)
+
+    def assertDuties(self, expectedDuties):
+        assert expectedDuties == self._duties, 'Incorrect duties, expected ' + str(expectedDuties) + ' but was ' + str(self._duties)
+
+class Timer():
+
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, timerId = -1):
+        self._id = timerId
+        self._mode = None
+        self._period = None
+        self._callback = None
+        self._isArmed = False
+        self._timesArmed = 0
+
+    def init(self, mode = PERIODIC, period = -1, callback = None):
+        self._mode = mode
+        self._period = period
+        self._callback = callback
+        self._isArmed = True
+        self._timesArmed += 1
+
+    def deinit(self):
+        self._isArmed = False
+
+    def fire(self):
+        assert self._isArmed, 'Timer fired while not armed'
+        if self._mode == self.ONE_SHOT:
+            self._isArmed = False
+        self._callback(self)
+
+    def assertArmed(self, expectedPeriod):
+        assert self._isArmed, 'Timer is not armed'
+        assert self.ONE_SHOT == self._mode, 'Incorrect timer mode, expected ONE_SHOT'
+        assert expectedPeriod == self._period, 'Incorrect period, expected ' + str(expectedPeriod) + ' but was ' + str(self._period)
+
+    def assertNotArmed(self):
+        assert not self._isArmed, 'Timer is armed'
+
+class Mem32():
+
+    def __init__(self):
+        self._writes = []
+
+    def __setitem__(self, address, value):
+        self._writes.append((address, value))
+
+    def reset(self):
+        self._writes = []
+
+    def assertWrites(self, expectedWrites):
+        assert expectedWrites == self._writes, 'Incorrect writes, expected ' + str(expectedWrites) + ' but was ' + str(self._writes)
+
+mem32 = Mem32()
+
+class SPI():
+
+    def __init__(self, spiId, **kwargs):
+        self._id = spiId
+        self._writes = []
+
+    def write(self, buf):
+        self._writes.append(bytes(buf))
+
+    def assertWrites(self, expectedWrites):
+        assert expectedWrites == self._writes, 'Incorrect writes, expected ' + str(expectedWrites) + ' but was ' + str(self._writes)
+
+'''
+Reconstruct the bytes bit-banged to a shift register from the pin log. The data is sampled on each rising edge of the clock,
+with the bytes shifted between latches (rising edges of the latch) being grouped together.
+'''
+def shiftedBytes(dataPinNum, clockPinNum, latchPinNum):
+    latched = []
+    bits = []
+    data = False
+    clock = False
+    latch = False
+    for pinNum, state in pinLog:
+        if pinNum == dataPinNum:
+            data = state
+        elif pinNum == clockPinNum:
+            if state and not clock:
+                bits.append(1 if data else 0)
+            clock = state
+        elif pinNum == latchPinNum:
+            if state and not latch:
+                latched.append(bytes([int(''.join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8)]))
+                bits = []
+            latch = state
+    return latched
+
+'''
+Low power modes. Sleeping moves the (mocked) utime forward by the time slept, plus wakeLatencyMs to simulate the time taken
+to wake up. Every sleep is logged as (mode, ms). As deepsleep resets the board (and never returns), it instead raises
+DeepSleepReset once logged.
+'''
+sleepLog = []
+wakeLatencyMs = 0
+
+class DeepSleepReset(Exception):
+    pass
+
+def lightsleep(ms = None):
+    sleepLog.append(('light', ms))
+    sys.modules['utime'].sleep_ms(ms + wakeLatencyMs)
+
+def deepsleep(ms = None):
+    sleepLog.append(('deep', ms))
+    raise DeepSleepReset()
+
+class RTC():
+
+    # Shared by all instances, as the memory survives a deepsleep
+    _memory = b''
+
+    def memory(self, data = None):
+        if data is None:
+            return RTC._memory
+        RTC._memory = bytes(data)
+
+def resetSleep():
+    global wakeLatencyMs
+    sleepLog.clear()
+    wakeLatencyMs = 0
+    RTC._memory = b''
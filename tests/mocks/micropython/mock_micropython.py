@@ -0,0 +1,21 @@
+import sys
+
+"""
+Mocking of the micropython micropython module
+"""
+
+# Callbacks which have been scheduled but not yet executed
+scheduled = []
+
+def schedule(func, arg):
+    scheduled.append((func, arg))
+
+def runScheduled():
+    while scheduled:
+        func, arg = scheduled.pop(0)
+        func(arg)
+
+def reset():
+    scheduled.clear()
+
+sys.modules['micropython'] = sys.modules[__name__]
@@ -0,0 +1,124 @@
+import sys
+
+"""
+Mocking of the micropython rp2 module. PIO programs are assembled into a list of instructions (rather than machine code),
+which can be checked directly or run via simulate to determine when the pins change.
+"""
+
+# State machines which have been created, by id
+stateMachines = {}
+
+def reset():
+    stateMachines.clear()
+
+class PIO():
+    OUT_LOW = 0
+    OUT_HIGH = 1
+
+'''
+A single assembled instruction, to which a delay can be added via [delay]
+'''
+class Instruction():
+
+    def __init__(self, program, op, args):
+        self.op = op
+        self.args = args
+        self.delay = 0
+        program.append(self)
+
+    def __getitem__(self, delay):
+        assert 0 <= delay <= 31, 'Delay out of range ' + str(delay)
+        self.delay = delay
+        return self
+
+    def __repr__(self):
+        return str((self.op,) + tuple(self.args) + (self.delay,))
+
+'''
+An assembled PIO program
+'''
+class Program():
+
+    def __init__(self, setInit):
+        self.setInit = setInit
+        self.instructions = []
+        self.labels = {}
+
+    def append(self, instruction):
+        self.instructions.append(instruction)
+        assert len(self.instructions) <= 32, 'Program too long'
+
+'''
+Decorator which assembles the program, by running the function with the PIO instructions available as globals
+'''
+def asm_pio(set_init = None, **kwargs):
+    def assemble(function):
+        program = Program(set_init)
+        instructions = {
+            'pins': 'pins', 'x': 'x', 'y': 'y', 'x_dec': 'x_dec', 'y_dec': 'y_dec',
+            'set': lambda dest, value: Instruction(program, 'set', (dest, value)),
+            'jmp': lambda cond, label = None: Instruction(program, 'jmp', (cond, label) if label is not None else ('always', cond)),
+            'nop': lambda: Instruction(program, 'nop', ()),
+            'label': lambda name: program.labels.__setitem__(name, len(program.instructions)),
+        }
+
+        gl = function.__globals__
+        saved = dict((k, gl[k]) for k in instructions if k in gl)
+        gl.update(instructions)
+        try:
+            function()
+        finally:
+            for k in instructions:
+                del gl[k]
+            gl.update(saved)
+        return program
+    return assemble
+
+class StateMachine():
+
+    def __init__(self, smId, program, freq = None, set_base = None):
+        self.id = smId
+        self.program = program
+        self.freq = freq
+        self.setBase = set_base
+        self.isActive = False
+        stateMachines[smId] = self
+
+    def active(self, value = None):
+        if value is None:
+            return 1 if self.isActive else 0
+        self.isActive = bool(value)
+
+'''
+Run the program for the specified number of cycles, returning the cycles at which the value of the set pins changed as a
+list of (cycle, value)
+'''
+def simulate(program, cycles):
+    registers = {'x': 0, 'y': 0, 'pins': None}
+    changes = []
+    pc = 0
+    cycle = 0
+    while cycle < cycles:
+        instruction = program.instructions[pc]
+        pc += 1
+        if instruction.op == 'set':
+            dest, value = instruction.args
+            if dest == 'pins' and value != registers['pins']:
+                changes.append((cycle, value))
+            registers[dest] = value
+        elif instruction.op == 'jmp':
+            cond, label = instruction.args
+            if cond == 'always':
+                pc = program.labels[label]
+            else:
+                reg = cond[0]
+                if registers[reg] != 0:
+                    pc = program.labels[label]
+                registers[reg] = (registers[reg] - 1) & 0xffffffff
+
+        cycle += 1 + instruction.delay
+        if pc >= len(program.instructions):
+            pc = 0
+    return changes
+
+sys.modules['rp2'] = sys.modules[__name__]
@@ -1,5 +1,7 @@
 from unittest.mock import call, MagicMock
 import sys
+import time
+from common.virtualclock import VirtualClock
 
 """
 Mocking of the micropython utime module
@@ -9,4 +11,61 @@ sys.modules['utime'] = mockutime
 
 def assertWaitCalled(*expectedSleepTimes):
     calls = map(lambda i: call(i), expectedSleepTimes)
-    mockutime.sleep.assert_has_calls(calls)
\ No newline at end of file
+    mockutime.sleep.assert_has_calls(calls)
+
+def assertSleepMsCalled(*expectedSleepTimes):
+    calls = map(lambda i: call(i), expectedSleepTimes)
+    mockutime.sleep_ms.assert_has_calls(calls)
+
+"""
+Simulated millisecond tick counter, being the VirtualClock with an optional overshoot added to every sleep to simulate a
+sleep which takes longer than requested.
+"""
+class FakeClock(VirtualClock):
+
+    def __init__(self, startMs = 0, overshootMs = 0):
+        super(FakeClock, self).__init__(startMs)
+        self._overshoot = overshootMs
+
+    def sleep_ms(self, ms):
+        self.advance(ms + self._overshoot)
+
+    def sleep(self, sec):
+        self.advance(round(sec * 1000) + self._overshoot)
+
+'''
+Make the mocked utime use the specified clock for ticks and sleeps
+'''
+def installClock(clock):
+    mockutime.ticks_ms.side_effect = clock.ticks_ms
+    mockutime.ticks_add.side_effect = clock.ticks_add
+    mockutime.ticks_diff.side_effect = clock.ticks_diff
+    mockutime.sleep_ms.side_effect = clock.sleep_ms
+    mockutime.sleep.side_effect = clock.sleep
+
+'''
+Revert the mocked utime to no longer use a clock
+'''
+def removeClock():
+    mockutime.ticks_ms.side_effect = None
+    mockutime.ticks_add.side_effect = None
+    mockutime.ticks_diff.side_effect = None
+    mockutime.sleep_ms.side_effect = None
+    mockutime.sleep.side_effect = None
+
+"""
+Millisecond tick counter which follows the actual (monotonic) time, for use when the code under test actually waits
+"""
+class MonotonicClock(FakeClock):
+
+    def __init__(self):
+        super(MonotonicClock, self).__init__()
+
+    def ticks_ms(self):
+        return int(time.monotonic() * 1000) & self.TICKS_MAX
+
+    def sleep_ms(self, ms):
+        time.sleep(ms / 1000)
+
+    def sleep(self, sec):
+        time.sleep(sec)
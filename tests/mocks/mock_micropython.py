@@ -2,6 +2,8 @@ import sys
 sys.path.append('src')
 
 import mocks.micropython.mock_utime
+import mocks.micropython.mock_micropython
 
 import mocks.micropython.mock_machine
-sys.modules['machine'] = sys.modules['mocks.micropython.mock_machine']
\ No newline at end of file
+sys.modules['machine'] = sys.modules['mocks.micropython.mock_machine']
+import mocks.micropython.mock_rp2
@@ -0,0 +1,100 @@
+import unittest
+import asyncio
+import mocks.mock_micropython
+import mocks.micropython.mock_utime as mu
+import common.asyncdriver as asyncdriver
+
+class TestAsyncDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = mu.MonotonicClock()
+        mu.installClock(self.clock)
+        self.testDriver = asyncdriver.AsyncDriver()
+
+    def tearDown(self):
+        mu.removeClock()
+
+    """
+    When trying to run the driver without any tasks registered, an exception is raised
+    """
+    def testRunNothingRegistered(self):
+        self.assertRaises(Exception, asyncio.run, self.testDriver.run())
+
+    """
+    Starting hands the thread over to an event loop, returning only once the driver is stopped
+    """
+    def testStartBlocksUntilStopped(self):
+        action1 = TimedTask(self.clock)
+        action2 = TimedTask(self.clock)
+        self.testDriver.registerMs(5, action1.call)
+        self.testDriver.registerMs(10, action2.call)
+        self.testDriver.registerMs(10, StopDriverAfterLoops(self.testDriver, 3).call)
+
+        self.testDriver.start()
+        self.assertEqual(3, len(action1._calledAt))
+        self.assertEqual(3, len(action2._calledAt))
+
+    """
+    Other coroutines continue to run on the same event loop while the driver waits for the next task(s)
+    """
+    def testRunsAlongsideOtherCoroutines(self):
+        action1 = TimedTask(self.clock)
+        self.testDriver.registerMs(20, action1.call)
+        self.testDriver.registerMs(40, self.testDriver.stop)
+        polls = []
+
+        async def poll():
+            while self.testDriver._isAlive or not polls:
+                polls.append(self.clock.ticks_ms())
+                await asyncio.sleep(0.002)
+
+        async def main():
+            await asyncio.gather(self.testDriver.run(), poll())
+
+        asyncio.run(main())
+        self.assertEqual(1, len(action1._calledAt))
+        self.assertTrue(len(polls) > 5, 'Polling coroutine was starved, only polled ' + str(len(polls)) + ' times')
+
+    """
+    The deadlines are kept, regardless of the time taken by the tasks
+    """
+    def testDeadlinesKept(self):
+        action1 = TimedTask(self.clock, 0.015)
+        action2 = TimedTask(self.clock)
+        self.testDriver.registerMs(10, action1.call)
+        self.testDriver.registerMs(30, action2.call)
+        self.testDriver.registerMs(30, StopDriverAfterLoops(self.testDriver, 5).call)
+        start = self.clock.ticks_ms()
+
+        self.testDriver.start()
+        for i in range(5):
+            # Allow for some leeway in the scheduling of the event loop, but it must not accumulate
+            late = self.clock.ticks_diff(action2._calledAt[i], start + (i + 1) * 30)
+            self.assertTrue(0 <= late < 20, 'Task called ' + str(late) + 'ms late in cycle ' + str(i))
+
+# Helper which tracks when it was called and (blocking) takes time to complete
+class TimedTask():
+    def __init__(self, clock, durationSec = 0):
+        self._clock = clock
+        self._duration = durationSec
+        self._calledAt = []
+
+    def call(self):
+        self._calledAt.append(self._clock.ticks_ms())
+        if self._duration:
+            self._clock.sleep(self._duration)
+
+# Helper which stops the driver after being called the appropriate number of times
+class StopDriverAfterLoops():
+    def __init__(self, driver, loopLimit):
+        self._driver = driver
+        self._timesCalled = 0
+        self._loopLimit = loopLimit
+
+    def call(self):
+        self._timesCalled += 1
+        if (self._timesCalled >= self._loopLimit):
+            self._driver.stop()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,13 @@
 import unittest
 import mocks.mock_micropython
 import mocks.micropython.mock_utime as mu
+import mocks.micropython.mock_machine as mm
 import common.driver as driver
+import gc
+import tracemalloc
+from unittest import mock
+from common.virtualclock import VirtualClock
+from common.latency import LatencyMonitor
 
 class TestDriver(unittest.TestCase):
 
@@ -50,7 +56,7 @@ class TestDriver(unittest.TestCase):
         self.assertEqual(0, action8.getTimesCalled())
 
         self.testDriver.start()
-        mu.assertWaitCalled(1, 4, 1229, 1)
+        mu.assertSleepMsCalled(1000, 4000, 1229000, 1000)
 
         # After the driver finished running, everything prior to the stop should have been called exactly once
         self.assertEqual(1, action1.getTimesCalled())
@@ -74,10 +80,685 @@ class TestDriver(unittest.TestCase):
         self.assertEqual(0, action1.getTimesCalled())
         self.assertEqual(0, action2.getTimesCalled())
         self.testDriver.start()
-        mu.assertWaitCalled(1, 1, 1, 1, 1, 1)
+        mu.assertSleepMsCalled(1000, 1000, 1000, 1000, 1000, 1000)
         self.assertEqual(3, action1.getTimesCalled())
         self.assertEqual(3, action2.getTimesCalled())
 
+    """
+    Tasks can be registered in fractions of a second or directly in milliseconds, which are tracked as integers
+    """
+    def testSubSecondTimings(self):
+        action1 = TestTask()
+        action2 = TestTask()
+        action3 = StopDriverAfterLoops(self.testDriver, 1)
+        self.testDriver.register(0.25, action1.call)
+        self.testDriver.registerMs(400, action2.call)
+        self.testDriver.register(1.5, action3.call)
+        self.assertEqual([250, 400, 1500], sorted(self.testDriver._default._tasks.keys()))
+        for t in self.testDriver._default._tasks.keys():
+            self.assertTrue(isinstance(t, int))
+
+        self.testDriver.start()
+        mu.assertSleepMsCalled(250, 150, 1100)
+        self.assertEqual(1, action1.getTimesCalled())
+        self.assertEqual(1, action2.getTimesCalled())
+
+    def testToMs(self):
+        self.assertEqual(0, driver.toMs(0))
+        self.assertEqual(3000, driver.toMs(3))
+        self.assertEqual(250, driver.toMs(0.25))
+        self.assertEqual(1, driver.toMs(0.0006))
+        self.assertTrue(isinstance(driver.toMs(1.5), int))
+
+class TestAbsoluteDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.testDriver = driver.Driver(driver.Driver.MODE.ABSOLUTE)
+
+    def tearDown(self):
+        mu.removeClock()
+
+    """
+    Tasks which take time to run, and sleeps which overshoot, must not cause the schedule to drift
+    """
+    def testNoDriftOverManyCycles(self):
+        clock = mu.FakeClock(1000, 3)
+        mu.installClock(clock)
+        action1 = SlowTask(clock, 137)
+        action2 = SlowTask(clock, 250)
+        action3 = StopDriverAfterLoops(self.testDriver, 500)
+        self.testDriver.register(1, action1.call)
+        self.testDriver.register(2.5, action2.call)
+        self.testDriver.register(10, action3.call)
+
+        self.testDriver.start()
+        self.assertEqual(500, action1.getTimesCalled())
+        self.assertEqual(500, action2.getTimesCalled())
+        # Each call is late only by the overshoot of its own sleep, which does not accumulate
+        for i in range(500):
+            self.assertEqual(1000 + i * 10000 + 1000 + 3, action1._calledAt[i])
+            self.assertEqual(1000 + i * 10000 + 2500 + 3, action2._calledAt[i])
+
+    """
+    The schedule is maintained when the tick counter wraps around
+    """
+    def testNoDriftWhenTicksWrap(self):
+        clock = mu.FakeClock(mu.FakeClock.TICKS_MAX - 2500, 1)
+        mu.installClock(clock)
+        action1 = SlowTask(clock, 10)
+        action2 = StopDriverAfterLoops(self.testDriver, 10)
+        self.testDriver.register(1, action1.call)
+        self.testDriver.register(2, action2.call)
+
+        self.testDriver.start()
+        self.assertEqual(10, action1.getTimesCalled())
+        for i in range(10):
+            expected = clock.ticks_add(mu.FakeClock.TICKS_MAX - 2500, i * 2000 + 1000 + 1)
+            self.assertEqual(expected, action1._calledAt[i])
+
+    """
+    If the tasks take longer than the time to the next deadline, the next tasks are triggered without waiting
+    """
+    def testOverrunDoesNotSleep(self):
+        clock = mu.FakeClock()
+        mu.installClock(clock)
+        action1 = SlowTask(clock, 1500)
+        action2 = SlowTask(clock, 0)
+        action3 = StopDriverAfterLoops(self.testDriver, 2)
+        self.testDriver.register(1, action1.call)
+        self.testDriver.register(2, action2.call)
+        self.testDriver.register(4, action3.call)
+
+        self.testDriver.start()
+        self.assertEqual([1000, 5000], action1._calledAt)
+        self.assertEqual([2500, 6500], action2._calledAt)
+
+class TestMultiRateDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = mu.FakeClock()
+        mu.installClock(self.clock)
+        self.testDriver = driver.Driver(driver.Driver.MODE.ABSOLUTE)
+
+    def tearDown(self):
+        mu.removeClock()
+
+    """
+    Schedules with different periods each remain periodic, without their cycles being combined
+    """
+    def testSchedulesKeepTheirOwnPeriod(self):
+        action1 = SlowTask(self.clock, 0)
+        action2 = SlowTask(self.clock, 0)
+        action3 = SlowTask(self.clock, 0)
+        schedule1 = driver.Schedule(51000)
+        schedule1.register(0, action1.call)
+        schedule2 = driver.Schedule(96000)
+        schedule2.register(10, action2.call)
+        schedule2.register(90, action3.call)
+        self.testDriver.add(schedule1)
+        self.testDriver.add(schedule2)
+        self.testDriver.register(51 * 96, self.testDriver.stop)
+
+        self.testDriver.start()
+        self.assertEqual([i * 51000 for i in range(96)], action1._calledAt)
+        self.assertEqual([i * 96000 + 10000 for i in range(51)], action2._calledAt)
+        self.assertEqual([i * 96000 + 90000 for i in range(51)], action3._calledAt)
+        # Only one entry per schedule is ever queued
+        self.assertEqual(3, len(self.testDriver._queue))
+
+    """
+    Tasks due at the same time in different schedules are triggered in the order the schedules were added, with tasks
+    registered directly with the driver first
+    """
+    def testSameTimeOrderedBySchedule(self):
+        calls = []
+        schedule1 = driver.Schedule(2000)
+        schedule1.register(1, lambda: calls.append('schedule1'))
+        schedule2 = driver.Schedule(1000)
+        schedule2.register(1, lambda: calls.append('schedule2'))
+        self.testDriver.add(schedule1)
+        self.testDriver.add(schedule2)
+        self.testDriver.register(1, lambda: calls.append('driver'))
+        self.testDriver.register(3, self.testDriver.stop)
+
+        self.testDriver.start()
+        self.assertEqual(['driver', 'schedule1', 'schedule2', 'schedule2'], calls)
+
+    """
+    Schedules without any tasks are ignored, but the driver cannot start if there are no tasks at all
+    """
+    def testEmptySchedules(self):
+        self.testDriver.add(driver.Schedule(1000))
+        self.assertRaises(Exception, self.testDriver.start)
+
+        action1 = StopDriverAfterLoops(self.testDriver, 1)
+        schedule = driver.Schedule(1000)
+        schedule.registerMs(500, action1.call)
+        self.testDriver.add(schedule)
+        self.testDriver.start()
+        self.assertEqual(1, action1.getTimesCalled())
+
+    """
+    The time since the start is rebased once it gets large, without affecting the deadlines
+    """
+    def testRebase(self):
+        action1 = SlowTask(self.clock, 0)
+        schedule = driver.Schedule(1000)
+        schedule.register(0, action1.call)
+        self.testDriver.add(schedule)
+        self.testDriver._REBASE_AT = 10000
+        self.testDriver.register(25, self.testDriver.stop)
+
+        self.testDriver.start()
+        self.assertEqual([i * 1000 for i in range(25)], action1._calledAt)
+        self.assertTrue(self.testDriver._now < 10000)
+
+class TestFrozenDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.testDriver = driver.Driver(driver.Driver.MODE.ABSOLUTE, self.clock)
+        self.testDriver.freeze(100)
+
+    def tearDown(self):
+        gc.enable()
+
+    """
+    A frozen driver triggers the same tasks at the same times, with automatic garbage collection disabled only while running
+    """
+    def testTasksTriggered(self):
+        action1 = SlowTask(self.clock, 10)
+        action2 = SlowTask(self.clock, 0)
+        gcEnabled = []
+        self.testDriver.registerMs(0, action1.call)
+        self.testDriver.registerMs(0, lambda: gcEnabled.append(gc.isenabled()))
+        self.testDriver.registerMs(250, action2.call)
+        self.testDriver.registerMs(1000, lambda: None)
+
+        self.testDriver.runFor(3000)
+        self.assertEqual([0, 1000, 2000, 3000], action1._calledAt)
+        self.assertEqual([250, 1250, 2250], action2._calledAt)
+        self.assertEqual([False] * 4, gcEnabled)
+        self.assertTrue(gc.isenabled())
+
+    """
+    Once started the schedule runs from its frozen structures, without looking up the registered tasks
+    """
+    def testScheduleFrozen(self):
+        action1 = TestTask()
+        self.testDriver.registerMs(0, action1.call)
+        self.testDriver.registerMs(100, action1.call)
+        self.testDriver._prepare()
+        self.testDriver._default._tasks = None
+
+        for i in range(10):
+            self.testDriver._trigger()
+        self.assertEqual(10, action1.getTimesCalled())
+        self.assertEqual(500, self.testDriver._now)
+
+    """
+    Unfreezing restores the regular behaviour on the next start
+    """
+    def testUnfreeze(self):
+        self.testDriver.registerMs(0, TestTask().call)
+        self.testDriver.registerMs(100, TestTask().call)
+        self.testDriver.runFor(1000)
+        self.assertTrue('_fire' in self.testDriver._default.__dict__)
+
+        self.testDriver.freeze(None)
+        self.testDriver.runFor(1000)
+        self.assertFalse('_fire' in self.testDriver._default.__dict__)
+
+    """
+    Garbage is only collected before waits which are at least as long as the idle threshold
+    """
+    def testCollectWhenIdle(self):
+        collectedAt = []
+        self.testDriver.registerMs(0, SlowTask(self.clock, 20).call)
+        self.testDriver.registerMs(50, TestTask().call)
+        self.testDriver.registerMs(500, TestTask().call)
+
+        with mock.patch.object(driver.gc, 'collect', side_effect=lambda: collectedAt.append(self.clock.ticks_ms())):
+            self.testDriver.runFor(1000)
+        # Once when starting, then only before the waits from 50 to 500 and from 550 to 1000
+        self.assertEqual([0, 50, 550], collectedAt)
+
+    """
+    Should the driver never be idle for long enough, garbage is still collected once the maximum time between collections
+    has passed
+    """
+    def testCollectWhenNeverIdle(self):
+        schedule = driver.Schedule(20)
+        schedule.registerMs(0, TestTask().call)
+        self.testDriver.add(schedule)
+        self.testDriver.freeze(100, 1000)
+
+        with mock.patch.object(driver.gc, 'collect') as collect:
+            self.testDriver.runFor(3600 * 1000)
+        # Once when starting, then once a second
+        self.assertEqual(1 + 3600, collect.call_count)
+
+        self.testDriver.freeze(100, None)
+        with mock.patch.object(driver.gc, 'collect') as collect:
+            self.testDriver.runFor(3600 * 1000)
+        self.assertEqual(1, collect.call_count)
+        self.assertRaises(ValueError, self.testDriver.freeze, 100, 0)
+
+    """
+    In MODE.RELATIVE the time taken to collect garbage is part of the wait, rather than delaying the following tasks
+    """
+    def testCollectRelative(self):
+        testDriver = driver.Driver(driver.Driver.MODE.RELATIVE, self.clock)
+        testDriver.freeze(50)
+        task = SlowTask(self.clock, 0)
+        schedule = driver.Schedule(1000)
+        schedule.registerMs(0, task.call)
+        schedule.registerMs(100, task.call)
+        testDriver.add(schedule)
+
+        # The collection when starting takes place before the first task
+        with mock.patch.object(driver.gc, 'collect', side_effect=lambda: self.clock.advance(30)):
+            testDriver.runFor(150)
+        self.assertEqual([30, 130], task._calledAt)
+
+    """
+    Once running, the loop of a frozen driver does not allocate any memory from one iteration to the next
+    """
+    def testNoAllocationPerIteration(self):
+        action1 = TestTask()
+        self.testDriver.registerMs(0, action1.call)
+        self.testDriver.registerMs(5, action1.call)
+        self.testDriver.registerMs(10, action1.call)
+        schedule = driver.Schedule(7)
+        schedule.registerMs(0, action1.call)
+        self.testDriver.add(schedule)
+
+        self.testDriver._prepare()
+        wait = self.testDriver._waitFunction()
+        for i in range(100):
+            wait(self.testDriver._queue[0][0])
+            self.testDriver._trigger()
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            for i in range(10000):
+                wait(self.testDriver._queue[0][0])
+                self.testDriver._trigger()
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+            self.testDriver._thaw()
+
+        # Only the handful of values held by the driver (i.e.: the current time) differ, rather than anything per iteration
+        growth = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+        self.assertTrue(growth < 20, growth)
+        self.assertTrue(action1.getTimesCalled() > 10000)
+
+class TestOverrunDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.driver = driver.Driver(driver.Driver.MODE.ABSOLUTE, self.clock)
+        self.tasks = [SlowTask(self.clock, 0) for i in range(10)]
+        # Stall for 350ms at 100, so that the timings at 200 and 300 are missed (400 being the latest due)
+        self.tasks[1]._duration = 350
+        schedule = driver.Schedule(1000)
+        for i in range(10):
+            schedule.registerMs(i * 100, self.tasks[i].call)
+        self.driver.add(schedule)
+
+    def calledAt(self):
+        return [t._calledAt for t in self.tasks]
+
+    def testInvalidPolicy(self):
+        self.assertRaises(ValueError, driver.Driver().overrun, driver.Driver.OVERRUN.SKIP)
+        self.assertRaises(ValueError, self.driver.overrun, 5)
+        driver.Driver().overrun(None)
+
+    """
+    Without a policy the missed timings are triggered in order as soon as possible, without being counted
+    """
+    def testNoPolicy(self):
+        self.driver.runFor(999)
+        self.assertEqual([[0], [100], [450], [450], [450], [500], [600], [700], [800], [900]], self.calledAt())
+        self.assertEqual((0, 0, 0), self.driver.overrunStats())
+
+    def testCatchUp(self):
+        self.driver.overrun(driver.Driver.OVERRUN.CATCH_UP)
+        self.driver.runFor(999)
+        self.assertEqual([[0], [100], [450], [450], [450], [500], [600], [700], [800], [900]], self.calledAt())
+        self.assertEqual((2, 0, 0), self.driver.overrunStats())
+
+    """
+    Only the latest due timing is triggered, with the schedule in phase straight away
+    """
+    def testSkip(self):
+        self.driver.overrun(driver.Driver.OVERRUN.SKIP)
+        self.driver.runFor(1999)
+        self.assertEqual([[0, 1000], [100, 1100], [], [], [450, 1450], [500, 1500], [600, 1600], [700, 1700], [800, 1800], [900, 1900]], self.calledAt())
+        self.assertEqual((0, 4, 0), self.driver.overrunStats())
+        self.driver.resetOverrunStats()
+        self.assertEqual((0, 0, 0), self.driver.overrunStats())
+
+    """
+    Once a schedule is moved on past its missed timings, any other schedule which is now due before it is triggered first,
+    so that the time of the driver never goes back
+    """
+    def testSkipKeepsOrder(self):
+        times = []
+        other = driver.Schedule(1000)
+        other.registerMs(250, lambda: times.append(self.driver._now))
+        self.driver.add(other)
+        self.driver._schedules[1].registerMs(400, lambda: times.append(self.driver._now))
+        self.driver._schedules[1].registerMs(500, lambda: times.append(self.driver._now))
+
+        self.driver.overrun(driver.Driver.OVERRUN.SKIP)
+        self.driver.runFor(999)
+        self.assertEqual([250, 400, 500], times)
+        self.assertEqual([[0], [100], [], [], [450], [500], [600], [700], [800], [900]], self.calledAt())
+        self.assertEqual((0, 2, 0), self.driver.overrunStats())
+
+    """
+    The tasks of the missed timings of a schedule are dropped when skipped, so the state they would have set is lost until
+    they are next triggered (in the following cycle), whereas coalescing them keeps it
+    """
+    def testSkipDropsState(self):
+        for policy, expected in ((driver.Driver.OVERRUN.SKIP, [False, True]), (driver.Driver.OVERRUN.COALESCE, [True, True])):
+            clock = VirtualClock()
+            testDriver = driver.Driver(driver.Driver.MODE.ABSOLUTE, clock)
+            light = [False]
+            seen = []
+            schedule = driver.Schedule(1000)
+            # Stall in the first cycle only, until 450, so that turning the light on at 200 is missed
+            schedule.registerMs(0, lambda: clock.advance(0 if seen else 450))
+            schedule.registerMs(200, lambda: light.__setitem__(0, True))
+            schedule.registerMs(400, lambda: seen.append(light[0]))
+            schedule.registerMs(900, lambda: light.__setitem__(0, False))
+            testDriver.add(schedule)
+            testDriver.overrun(policy)
+
+            # In the second cycle nothing is missed, so the light is turned on as normal
+            testDriver.runFor(1999)
+            self.assertEqual(expected, seen)
+
+    """
+    The tasks of the missed timings are triggered along with the latest due timing, each only once
+    """
+    def testCoalesce(self):
+        repeated = TestTask()
+        self.driver._schedules[1].registerMs(200, repeated.call)
+        self.driver._schedules[1].registerMs(300, repeated.call)
+        self.driver._schedules[1].registerMs(400, repeated.call)
+        self.driver._schedules[1].registerMs(600, repeated.call)
+
+        self.driver.overrun(driver.Driver.OVERRUN.COALESCE)
+        self.driver.runFor(999)
+        self.assertEqual([[0], [100], [450], [450], [450], [500], [600], [700], [800], [900]], self.calledAt())
+        self.assertEqual((0, 0, 2), self.driver.overrunStats())
+        self.assertEqual(2, repeated.getTimesCalled())
+
+    """
+    The overrun policy is also applied when instrumented, with the lateness of the latest due timing recorded
+    """
+    def testInstrumented(self):
+        monitor = LatencyMonitor()
+        self.driver.overrun(driver.Driver.OVERRUN.SKIP)
+        self.driver.instrument(monitor)
+        self.driver.runFor(999)
+        self.assertEqual((0, 2, 0), self.driver.overrunStats())
+        self.assertEqual([(0, 0, 0), (100, 0, 350), (400, 50, 0), (500, 0, 0)], monitor.samples()[:4])
+
+        self.driver.instrument(None)
+        self.assertEqual(self.driver._triggerOverrun, self.driver._trigger)
+        self.driver.overrun(None)
+        self.assertFalse('_trigger' in self.driver.__dict__)
+
+class TestEventSource(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.driver = driver.Driver(driver.Driver.MODE.ABSOLUTE, self.clock)
+        self.pin = mm.Pin(5, mm.Pin.IN)
+        self.events = SlowTask(self.clock, 0)
+
+    def testInvalidSettings(self):
+        self.assertRaises(ValueError, driver.EventSource, self.pin, self.events.call, -1)
+        self.assertRaises(ValueError, driver.EventSource, self.pin, self.events.call, 20, None, 0)
+
+    """
+    A frozen driver is never idle for long with a source polling every 10ms, so garbage is collected once the maximum
+    time between collections has passed instead
+    """
+    def testFrozenCollects(self):
+        self.driver.add(driver.EventSource(self.pin, self.events.call, clock = self.clock))
+        self.driver.freeze()
+
+        with mock.patch.object(driver.gc, 'collect') as collect:
+            self.driver.runFor(3600 * 1000)
+        self.assertEqual(1 + 3600, collect.call_count)
+
+    """
+    As the source is dispatched every pollMs for as long as the driver runs, it cannot be run by a driver in MODE.RELATIVE
+    """
+    def testRequiresAbsolute(self):
+        source = driver.EventSource(self.pin, self.events.call, clock = self.clock)
+        relative = driver.Driver(driver.Driver.MODE.RELATIVE, self.clock)
+        self.assertRaises(ValueError, relative.add, source)
+        self.assertRaises(ValueError, relative.play, source)
+        self.assertEqual(1, len(relative._schedules))
+
+    """
+    Edges within the debounce time of the last event are ignored, with the events only dispatched by the driver
+    """
+    def testDebounce(self):
+        source = driver.EventSource(self.pin, self.events.call, 20, clock = self.clock)
+        self.pin.simulatePulse()
+        self.clock.advance(5)
+        self.pin.simulatePulse()
+        self.clock.advance(20)
+        self.pin.simulatePulse()
+        self.assertEqual((2, 1), source.stats())
+        self.assertEqual(0, self.events.getTimesCalled())
+
+        self.assertEqual(10, source._fire())
+        self.assertEqual(2, self.events.getTimesCalled())
+        source._fire()
+        self.assertEqual(2, self.events.getTimesCalled())
+
+        # Events are no longer picked up once disabled
+        source.disable()
+        self.clock.advance(100)
+        self.pin.simulatePulse()
+        self.assertEqual((2, 1), source.stats())
+
+    """
+    The edge on which events occur can be chosen
+    """
+    def testFallingEdge(self):
+        pin = mm.Pin(6, mm.Pin.IN, mm.Pin.PULL_UP)
+        source = driver.EventSource(pin, self.events.call, 0, mm.Pin.IRQ_FALLING, clock = self.clock)
+        pin.simulateInput(0)
+        pin.simulateInput(1)
+        self.assertEqual((1, 0), source.stats())
+
+    """
+    Events are dispatched within the poll time, with the task playing a schedule which runs once each time it is played
+    """
+    def testPlayOneShot(self):
+        crossing = driver.Schedule(repeat = False)
+        lightsOn = SlowTask(self.clock, 0)
+        lightsOff = SlowTask(self.clock, 0)
+        crossing.registerMs(0, lightsOn.call)
+        crossing.registerMs(300, lightsOff.call)
+
+        trains = driver.Schedule(10000)
+        trains.registerMs(95, self.pin.simulatePulse)
+        trains.registerMs(2005, self.pin.simulatePulse)
+        trains.registerMs(2155, self.pin.simulatePulse)
+        self.driver.add(trains)
+        self.driver.add(driver.EventSource(self.pin, lambda: self.driver.play(crossing), clock = self.clock))
+        self.driver.runFor(5000)
+
+        # Playing again while running restarts the cycle
+        self.assertEqual([100, 2010, 2160], lightsOn._calledAt)
+        self.assertEqual([400, 2460], lightsOff._calledAt)
+        self.assertFalse(crossing in [entry[2] for entry in self.driver._queue])
+
+    """
+    A repeating schedule that is played runs until cancelled
+    """
+    def testPlayRepeating(self):
+        blink = driver.Schedule(100)
+        blinkTask = SlowTask(self.clock, 0)
+        blink.registerMs(0, blinkTask.call)
+
+        control = driver.Schedule(10000)
+        control.registerMs(50, lambda: self.driver.play(blink))
+        control.registerMs(400, lambda: self.driver.cancel(blink))
+        self.driver.add(control)
+        self.driver.runFor(1000)
+        self.assertEqual([50, 150, 250, 350], blinkTask._calledAt)
+
+        # Before starting, playing only adds the schedule
+        other = driver.Schedule(100)
+        self.driver.play(other)
+        self.assertTrue(other in self.driver._schedules)
+
+    """
+    The driver stops once the only schedules it has have run their cycle
+    """
+    def testStopsOnceNothingRemains(self):
+        once = driver.Schedule(repeat = False)
+        once.registerMs(0, self.events.call)
+        once.registerMs(100, self.events.call)
+        once.registerMs(250, self.events.call)
+        self.driver.add(once)
+        self.driver.freeze()
+        self.driver.start()
+        self.assertEqual([0, 100, 250], self.events._calledAt)
+
+class TestSequence(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.driver = driver.Driver(driver.Driver.MODE.ABSOLUTE, self.clock)
+        self.log = []
+
+    def testInvalidBudget(self):
+        self.assertRaises(ValueError, self.driver.spawn, iter([]), 0)
+
+    """
+    The steps of a sequence are due the yielded delay after the previous step was due, with the sequence dropped once done
+    """
+    def testDelays(self):
+        tick = driver.Schedule(1000)
+        tick.registerMs(0, lambda: self.log.append(('tick', self.clock.ticks_ms())))
+        self.driver.add(tick)
+
+        def chase():
+            for i in range(3):
+                self.log.append(('step', self.clock.ticks_ms()))
+                # Each step takes 10ms, which the following delay accounts for
+                self.clock.advance(10)
+                yield 400
+        sequence = self.driver.spawn(chase())
+        self.driver.runFor(2000)
+
+        self.assertEqual([('tick', 0), ('step', 0), ('step', 400), ('step', 800), ('tick', 1000), ('tick', 2000)], self.log)
+        self.assertTrue(sequence.isDone())
+        self.assertEqual([tick], [entry[2] for entry in self.driver._queue])
+
+    """
+    A sequence which is not yielding delays hands back once its time slice is used up, or once the next deadline of
+    anything else is reached (whichever comes first), so that what is due in the meantime is triggered on time
+    """
+    def testTimeSlicing(self):
+        other = driver.Schedule(1000)
+        other.registerMs(3, lambda: self.log.append(('other', self.clock.ticks_ms())))
+        other.registerMs(8, lambda: self.log.append(('other', self.clock.ticks_ms())))
+        self.driver.add(other)
+
+        def selfTest():
+            for i in range(12):
+                self.log.append((i, self.clock.ticks_ms()))
+                self.clock.advance(1)
+                yield
+        self.driver.spawn(selfTest(), 5)
+        self.driver.runFor(100)
+
+        self.assertEqual([(0, 0), (1, 1), (2, 2), ('other', 3), (3, 3), (4, 4), (5, 5), (6, 6), (7, 7), ('other', 8),
+                          (8, 8), (9, 9), (10, 10), (11, 11)], self.log)
+
+    """
+    Yielding 0 hands back right away, without holding up anything else due at the same time
+    """
+    def testHandBack(self):
+        def spin():
+            for i in range(3):
+                self.log.append(('spin', self.clock.ticks_ms()))
+                yield 0
+        tick = driver.Schedule(1000)
+        tick.registerMs(0, lambda: self.driver.spawn(spin()))
+        tick.registerMs(0, lambda: self.log.append(('tick', self.clock.ticks_ms())))
+        tick.registerMs(1, lambda: self.log.append(('tick', self.clock.ticks_ms())))
+        self.driver.add(tick)
+        self.driver.runFor(10)
+
+        self.assertEqual([('tick', 0), ('spin', 0), ('tick', 1), ('spin', 1), ('spin', 2)], self.log)
+
+    """
+    In MODE.RELATIVE a sequence that hands back is resumed after 1ms
+    """
+    def testRelative(self):
+        relative = driver.Driver(driver.Driver.MODE.RELATIVE, self.clock)
+        def slow():
+            for i in range(2):
+                self.log.append(self.clock.ticks_ms())
+                self.clock.advance(10)
+                yield
+        sequence = relative.spawn(slow(), 5)
+        self.assertEqual(0, sequence._reset())
+        self.assertEqual(1, sequence._fire())
+        self.assertEqual(1, sequence._fire())
+        self.assertIsNone(sequence._fire())
+        self.assertEqual([0, 10], self.log)
+
+class TestSchedule(unittest.TestCase):
+
+    def testInvalidPeriod(self):
+        self.assertRaises(ValueError, driver.Schedule, 0)
+        self.assertRaises(ValueError, driver.Schedule, -5)
+
+    def testTimeBeyondPeriod(self):
+        schedule = driver.Schedule(1000)
+        schedule.registerMs(1000, TestTask().call)
+        self.assertRaises(ValueError, schedule.registerMs, 1001, TestTask().call)
+
+    def testPeriod(self):
+        schedule = driver.Schedule()
+        schedule.register(3, TestTask().call)
+        schedule.register(1, TestTask().call)
+        self.assertEqual(3000, schedule.period())
+        self.assertEqual(5000, driver.Schedule(5000).period())
+
+    """
+    The delay returned after triggering each timing leads to the next one, wrapping around at the end of the period
+    """
+    def testFire(self):
+        action1 = TestTask()
+        action2 = TestTask()
+        schedule = driver.Schedule(10000)
+        schedule.registerMs(2000, action1.call)
+        schedule.registerMs(7500, action2.call)
+        self.assertEqual(2000, schedule._reset())
+        self.assertEqual(5500, schedule._fire())
+        self.assertEqual(1, action1.getTimesCalled())
+        self.assertEqual(4500, schedule._fire())
+        self.assertEqual(1, action2.getTimesCalled())
+        self.assertEqual(5500, schedule._fire())
+        self.assertEqual(2, action1.getTimesCalled())
+
 # Helper for tracking how many times a task is called
 class TestTask():
     def __init__(self):
@@ -89,6 +770,19 @@ class TestTask():
     def getTimesCalled(self):
         return self._timesCalled
 
+# Helper which takes time to complete and tracks when it was called
+class SlowTask(TestTask):
+    def __init__(self, clock, durationMs):
+        super(SlowTask, self).__init__()
+        self._clock = clock
+        self._duration = durationMs
+        self._calledAt = []
+
+    def call(self):
+        super(SlowTask, self).call()
+        self._calledAt.append(self._clock.ticks_ms())
+        self._clock.advance(self._duration)
+
 # Helper which stops the driver after being called the appropriate number of times
 class StopDriverAfterLoops():
     def __init__(self, driver, loopLimit):
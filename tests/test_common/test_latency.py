@@ -0,0 +1,121 @@
+import unittest
+import mocks.mock_micropython
+import mocks.micropython.mock_utime as mu
+import mocks.micropython.mock_micropython as mmp
+import common.driver as driver
+import common.timerdriver as timerdriver
+from common.latency import LatencyMonitor
+from common.virtualclock import VirtualClock
+
+class TestLatencyMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self._monitor = LatencyMonitor(4)
+
+    def testInvalidSize(self):
+        self.assertRaises(ValueError, LatencyMonitor, 0)
+
+    def testEmpty(self):
+        self.assertEqual(0, self._monitor.count())
+        self.assertEqual([], self._monitor.samples())
+        self.assertEqual((0, 0, 0, 0, 0), self._monitor.stats())
+
+    """
+    Once the buffer is full the oldest samples are replaced, with the statistics still covering every sample
+    """
+    def testRingBuffer(self):
+        self._monitor.record(0, 0, 1)
+        self._monitor.record(100, 1, 2)
+        self._monitor.record(200, 3, 3)
+        self.assertEqual([(0, 0, 1), (100, 1, 2), (200, 3, 3)], self._monitor.samples())
+
+        self._monitor.record(300, 12, 4)
+        self._monitor.record(400, 500, 5)
+        self._monitor.record(500, 0, 15)
+        self.assertEqual([(200, 3, 3), (300, 12, 4), (400, 500, 5), (500, 0, 15)], self._monitor.samples())
+        self.assertEqual((6, 86, 500, 5, 15), self._monitor.stats())
+        self.assertEqual([(0, 2), (1, 1), (2, 0), (5, 1), (10, 0), (20, 1), (50, 0), (100, 0), (None, 1)],
+                         self._monitor.histogram())
+
+        self._monitor.reset()
+        self.assertEqual(0, self._monitor.count())
+        self.assertEqual([], self._monitor.samples())
+        self.assertEqual(0, sum(num for bound, num in self._monitor.histogram()))
+
+class TestInstrumentedDriver(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = VirtualClock()
+        self._monitor = LatencyMonitor(16)
+
+    """
+    Each timing records its lateness and the time its tasks took, with the lateness not accumulating in absolute mode
+    """
+    def testAbsoluteDriver(self):
+        testDriver = driver.Driver(driver.Driver.MODE.ABSOLUTE, self._clock)
+        testDriver.registerMs(0, SlowTask(self._clock, 30))
+        testDriver.registerMs(0, SlowTask(self._clock, 20))
+        testDriver.registerMs(20, SlowTask(self._clock, 5))
+        testDriver.registerMs(100, lambda: None)
+        testDriver.instrument(self._monitor)
+
+        testDriver.runFor(200)
+        self.assertEqual([(0, 0, 50), (20, 30, 5), (100, 0, 0), (100, 0, 50), (120, 30, 5), (200, 0, 0), (200, 0, 50)],
+                         self._monitor.samples())
+
+    def testRelativeDriver(self):
+        testDriver = driver.Driver(driver.Driver.MODE.RELATIVE, self._clock)
+        testDriver.registerMs(0, SlowTask(self._clock, 10))
+        testDriver.registerMs(100, lambda: None)
+        testDriver.instrument(self._monitor)
+
+        testDriver.runFor(200)
+        self.assertEqual([(0, 0, 10), (100, 10, 0), (100, 10, 10), (200, 20, 0), (200, 20, 10)], self._monitor.samples())
+
+    """
+    Removing the instrumentation restores the regular trigger, with nothing further recorded
+    """
+    def testRemoveInstrumentation(self):
+        testDriver = driver.Driver(driver.Driver.MODE.ABSOLUTE, self._clock)
+        testDriver.registerMs(0, lambda: None)
+        testDriver.registerMs(100, lambda: None)
+
+        testDriver.instrument(self._monitor)
+        self.assertEqual(testDriver._triggerInstrumented, testDriver._trigger)
+        testDriver.instrument(None)
+        self.assertEqual(driver.Driver._trigger, type(testDriver)._trigger)
+        self.assertFalse('_trigger' in testDriver.__dict__)
+        testDriver.instrument(None)
+
+        testDriver.runFor(1000)
+        self.assertEqual(0, self._monitor.count())
+
+    """
+    The timer driver records the dispatches it triggers
+    """
+    def testTimerDriver(self):
+        clock = mu.FakeClock(500)
+        mu.installClock(clock)
+        mmp.reset()
+        try:
+            testDriver = timerdriver.TimerDriver()
+            testDriver.registerMs(1000, SlowTask(clock, 3))
+            testDriver.instrument(self._monitor)
+            testDriver.start()
+
+            clock.advance(1002)
+            testDriver._timer.fire()
+            mmp.runScheduled()
+            self.assertEqual([(1000, 2, 3)], self._monitor.samples())
+            testDriver.stop()
+        finally:
+            mu.removeClock()
+            mmp.reset()
+
+class SlowTask:
+    def __init__(self, clock, durationMs):
+        self._clock = clock
+        self._durationMs = durationMs
+
+    def __call__(self):
+        self._clock.sleep_ms(self._durationMs)
@@ -0,0 +1,194 @@
+import unittest
+import mocks.mock_micropython
+import mocks.micropython.mock_utime as mu
+import mocks.micropython.mock_machine as mm
+import common.driver as driver
+import common.sleepdriver as sleepdriver
+import lights.trafficlight as tl
+
+class TestSleepDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = mu.FakeClock(1000)
+        mu.installClock(self.clock)
+        mm.resetSleep()
+
+    def tearDown(self):
+        mu.removeClock()
+        mm.resetSleep()
+
+    def testInvalidThresholds(self):
+        self.assertRaises(ValueError, sleepdriver.SleepDriver, 50, None, -1)
+        self.assertRaises(ValueError, sleepdriver.SleepDriver, 5, None, 5)
+        self.assertRaises(ValueError, sleepdriver.SleepDriver, 50, 5, 5)
+
+    """
+    Long gaps are spent in lightsleep, waking ahead of the deadline by the margin, whereas short gaps are slept normally
+    """
+    def testLightSleep(self):
+        testDriver = sleepdriver.SleepDriver(100, None, 5)
+        task = TimedTask(self.clock)
+        testDriver.registerMs(0, task.call)
+        testDriver.registerMs(30, task.call)
+        testDriver.registerMs(530, task.call)
+        testDriver.registerMs(1000, testDriver.stop)
+
+        testDriver.start()
+        self.assertEqual([0, 30, 530], task.calledAt(1000))
+        self.assertEqual([('light', 495), ('light', 465)], mm.sleepLog)
+        self.assertEqual((2, 960, 0, 0), testDriver.wakeStats())
+
+    """
+    The latency of waking up is absorbed by the margin, with only latency beyond the margin making the tasks late
+    """
+    def testWakeLatency(self):
+        testDriver = sleepdriver.SleepDriver(100, None, 5)
+        task = TimedTask(self.clock)
+        testDriver.registerMs(0, task.call)
+        testDriver.registerMs(500, task.call)
+        testDriver.registerMs(1000, testDriver.stop)
+
+        mm.wakeLatencyMs = 3
+        testDriver.start()
+        self.assertEqual([0, 500], task.calledAt(1000))
+        self.assertEqual((2, 990, 3, 3), testDriver.wakeStats())
+
+        testDriver.resetWakeStats()
+        self.assertEqual((0, 0, 0, 0), testDriver.wakeStats())
+
+        mm.wakeLatencyMs = 8
+        testDriver.start()
+        self.assertEqual([0, 503], task.calledAt(2000)[2:])
+        self.assertEqual((2, 987, 8, 8), testDriver.wakeStats())
+
+    """
+    Without a lightsleep threshold the driver always sleeps normally
+    """
+    def testLightSleepDisabled(self):
+        testDriver = sleepdriver.SleepDriver(None)
+        task = TimedTask(self.clock)
+        testDriver.registerMs(0, task.call)
+        testDriver.registerMs(5000, testDriver.stop)
+        testDriver.start()
+        self.assertEqual([], mm.sleepLog)
+        self.assertEqual((0, 0, 0, 0), testDriver.wakeStats())
+
+    """
+    Long enough gaps are spent in deepsleep, with the position of the driver kept in RTC memory so that once reset it resumes
+    from where it left off
+    """
+    def testDeepSleepResume(self):
+        task1 = TimedTask(self.clock)
+        task2 = TimedTask(self.clock)
+        testDriver = self._createDeepSleepDriver(task1, task2)
+
+        self.assertRaises(mm.DeepSleepReset, testDriver.start)
+        self.assertEqual([0, 100], task1.calledAt(1000))
+        self.assertEqual([], task2._calledAt)
+        self.assertEqual([('light', 95), ('deep', 9895)], mm.sleepLog)
+        self.assertNotEqual(b'', mm.RTC().memory())
+
+        # The board is reset and boots, with the same tasks registered
+        self.clock = mu.FakeClock(0)
+        mu.installClock(self.clock)
+        task1 = TimedTask(self.clock)
+        task2 = StoppingTask(self.clock)
+        testDriver = self._createDeepSleepDriver(task1, task2)
+        task2.driver = testDriver
+        self.clock.advance(200)
+
+        # The tasks which were next due (at 10s, which is also the start of the next cycle) are triggered right away
+        testDriver.resume()
+        self.assertEqual([0], task1.calledAt(200))
+        self.assertEqual([0], task2.calledAt(200))
+        self.assertEqual(b'', mm.RTC().memory())
+        self.assertEqual(10000, testDriver._rebased + testDriver._now)
+
+    """
+    Without a stored position (or one which does not match the schedules) the driver starts from the beginning
+    """
+    def testResumeWithoutPosition(self):
+        task1 = TimedTask(self.clock)
+        task2 = TimedTask(self.clock)
+        testDriver = self._createDeepSleepDriver(task1, task2)
+        testDriver.registerMs(500, testDriver.stop)
+        mm.RTC().memory(b'\x00\x01\x02')
+
+        testDriver.resume()
+        self.assertEqual([0, 100], task1.calledAt(1000))
+
+    """
+    While anything whose position cannot be kept is queued (i.e.: an EventSource), the driver lightsleeps instead
+    """
+    def testNoDeepSleepWithoutPosition(self):
+        testDriver = sleepdriver.SleepDriver(100, 5000, 5)
+        task = TimedTask(self.clock)
+        testDriver.registerMs(0, task.call)
+        testDriver.registerMs(10000, testDriver.stop)
+        testDriver.add(driver.EventSource(mm.Pin(5, mm.Pin.IN), task.call, pollMs = 20000, clock = self.clock))
+
+        testDriver.start()
+        self.assertEqual([0], task.calledAt(1000))
+        self.assertEqual([('light', 9995)], mm.sleepLog)
+        self.assertEqual(b'', mm.RTC().memory())
+
+    """
+    When resumed part way through the cycle of an intersection, the lights are placed into the state they were in before
+    the deepsleep (rather than that of the start of the cycle, in which they are built)
+    """
+    def testDeepSleepResumesLights(self):
+        default = driver.instance
+        aspects = []
+        try:
+            for boot in range(4):
+                self.clock = mu.FakeClock(0)
+                mu.installClock(self.clock)
+                testDriver = sleepdriver.SleepDriver(100, 30000, 5)
+                driver.instance = testDriver
+                builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW)
+                for i in range(3):
+                    builder.addTrafficLight(i * 10, i * 10 + 1, i * 10 + 2)
+                builder.build()
+
+                self.assertRaises(mm.DeepSleepReset, testDriver.resume)
+                aspects.append([[int(led._state) for led in light._lights] for light in builder._trafficLight])
+        finally:
+            driver.instance = default
+
+        # Each boot sleeps through the green of the next light, with all others red
+        self.assertEqual([[[0, 0, 1], [1, 0, 0], [1, 0, 0]],
+                          [[1, 0, 0], [0, 0, 1], [1, 0, 0]],
+                          [[1, 0, 0], [1, 0, 0], [0, 0, 1]],
+                          [[0, 0, 1], [1, 0, 0], [1, 0, 0]]], aspects)
+
+    def _createDeepSleepDriver(self, task1, task2):
+        testDriver = sleepdriver.SleepDriver(100, 5000, 5)
+        testDriver.registerMs(0, task1.call)
+        testDriver.registerMs(100, task1.call)
+        testDriver.registerMs(10000, lambda: None)
+        schedule = driver.Schedule(20000)
+        schedule.registerMs(10000, task2.call)
+        testDriver.add(schedule)
+        return testDriver
+
+# Helper which tracks the ticks at which it was called
+class TimedTask():
+    def __init__(self, clock):
+        self._clock = clock
+        self._calledAt = []
+
+    def call(self):
+        self._calledAt.append(self._clock.ticks_ms())
+
+    def calledAt(self, startMs):
+        return [t - startMs for t in self._calledAt]
+
+# Helper which stops the driver once called
+class StoppingTask(TimedTask):
+    def __init__(self, clock):
+        super(StoppingTask, self).__init__(clock)
+        self.driver = None
+
+    def call(self):
+        super(StoppingTask, self).call()
+        self.driver.stop()
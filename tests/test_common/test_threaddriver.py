@@ -0,0 +1,185 @@
+import unittest
+import gc
+from unittest import mock
+import mocks.mock_micropython
+import mocks.micropython.mock_utime as mu
+import common.driver as driver
+import common.threaddriver as threaddriver
+from common.virtualclock import VirtualClock
+
+class TestThreadDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = mu.MonotonicClock()
+        mu.installClock(self.clock)
+        self.testDriver = threaddriver.ThreadDriver(2)
+
+    def tearDown(self):
+        self.testDriver.stop()
+        self.testDriver.join()
+        mu.removeClock()
+
+    def testInvalidPoll(self):
+        self.assertRaises(ValueError, threaddriver.ThreadDriver, 0)
+
+    def testStartNothingRegistered(self):
+        self.assertRaises(Exception, self.testDriver.start)
+
+    """
+    Starting returns right away, with the tasks triggered by the driver thread until it is stopped
+    """
+    def testStartReturnsImmediately(self):
+        action1 = TimedTask(self.clock)
+        self.testDriver.registerMs(10, action1.call)
+        self.testDriver.registerMs(20, StopDriverAfterLoops(self.testDriver, 3).call)
+
+        self.testDriver.start()
+        self.assertEqual([], action1._calledAt)
+        self.testDriver.join()
+        self.assertEqual(3, len(action1._calledAt))
+        self.assertFalse(self.testDriver._isAlive)
+
+    """
+    Tasks registered from the main thread while running are picked up by the driver thread
+    """
+    def testRegisterWhileRunning(self):
+        action1 = TimedTask(self.clock)
+        action2 = TimedTask(self.clock)
+        self.testDriver.registerMs(0, action1.call)
+        self.testDriver.registerMs(30, StopDriverAfterLoops(self.testDriver, 4).call)
+
+        self.testDriver.start()
+        self.testDriver.registerMs(15, action2.call)
+        schedule = driver.Schedule(10)
+        schedule.registerMs(0, action2.call)
+        self.testDriver.add(schedule)
+        self.testDriver.join()
+
+        self.assertEqual(4, len(action1._calledAt))
+        self.assertTrue(len(action2._calledAt) >= 4, action2._calledAt)
+        self.assertEqual([], self.testDriver._commands)
+
+    """
+    Functions can be called from the driver thread, between the triggering of tasks
+    """
+    def testCall(self):
+        calledFrom = []
+        self.testDriver.registerMs(10, lambda: None)
+        self.testDriver.start()
+        self.testDriver.call(lambda a, b: calledFrom.append((a, b)), 1, 2)
+        self.testDriver.call(self.testDriver.stop)
+        self.testDriver.join()
+        self.assertEqual([(1, 2)], calledFrom)
+
+    """
+    While paused no tasks are triggered, with the deadlines moved on by the time paused once resumed
+    """
+    def testPauseResume(self):
+        action1 = TimedTask(self.clock)
+        self.testDriver.registerMs(0, action1.call)
+        self.testDriver.registerMs(10, lambda: None)
+        self.testDriver.start()
+
+        self.testDriver.pause()
+        self.clock.sleep_ms(30)
+        self.assertTrue(self.testDriver.isPaused())
+        calls = len(action1._calledAt)
+        self.clock.sleep_ms(50)
+        self.assertEqual(calls, len(action1._calledAt))
+
+        self.testDriver.resume()
+        self.clock.sleep_ms(50)
+        self.assertFalse(self.testDriver.isPaused())
+        self.assertTrue(len(action1._calledAt) > calls)
+
+class TestRegisterNow(unittest.TestCase):
+
+    """
+    Registering new timings with a running schedule picks up those still to come, continuing on from the timing next due
+    """
+    def testResync(self):
+        testDriver = threaddriver.ThreadDriver(5, VirtualClock())
+        action1 = TimedTask(testDriver._clock)
+        testDriver.registerMs(0, action1.call)
+        testDriver.registerMs(100, action1.call)
+        testDriver.registerMs(200, lambda: None)
+        testDriver._prepare()
+        testDriver._trigger()
+        testDriver._trigger()
+
+        # Now at 100, with 200 next due
+        testDriver._registerNow(testDriver._default, 50, action1.call)
+        testDriver._registerNow(testDriver._default, 150, action1.call)
+        self.assertEqual(150, testDriver._queue[0][0])
+        testDriver._trigger()
+        self.assertEqual(200, testDriver._queue[0][0])
+        testDriver._trigger()
+        self.assertEqual(200, testDriver._queue[0][0])
+        testDriver._trigger()
+        self.assertEqual(250, testDriver._queue[0][0])
+
+        # Extending the period moves the start of the next cycle
+        testDriver._registerNow(testDriver._default, 300, action1.call)
+        self.assertEqual(250, testDriver._queue[0][0])
+        testDriver._trigger()
+        testDriver._trigger()
+        testDriver._trigger()
+        self.assertEqual(400, testDriver._queue[0][0])
+        testDriver._trigger()
+        self.assertEqual(500, testDriver._queue[0][0])
+        testDriver._trigger()
+        self.assertEqual(500, testDriver._queue[0][0])
+
+    def testResyncFrozen(self):
+        testDriver = threaddriver.ThreadDriver(5, VirtualClock())
+        testDriver.freeze()
+        action1 = TimedTask(testDriver._clock)
+        testDriver.registerMs(0, action1.call)
+        testDriver.registerMs(100, lambda: None)
+        testDriver._prepare()
+        testDriver._trigger()
+
+        testDriver._registerNow(testDriver._default, 50, action1.call)
+        testDriver._trigger()
+        self.assertEqual(2, len(action1._calledAt))
+        testDriver._thaw()
+
+    """
+    A frozen driver collects garbage once while idle ahead of each deadline (rather than on every poll), with automatic
+    garbage collection restored once it stops
+    """
+    def testCollectWhenIdle(self):
+        testDriver = threaddriver.ThreadDriver(5, VirtualClock())
+        testDriver.freeze(50)
+        testDriver.registerMs(0, lambda: None)
+        testDriver.registerMs(200, lambda: None)
+        testDriver.registerMs(230, lambda: None)
+        testDriver.registerMs(400, testDriver.stop)
+
+        with mock.patch.object(driver.gc, 'collect') as collect:
+            testDriver.start()
+            testDriver.join()
+        # Once when frozen at the start, then only within the gaps ahead of 200 and 400 (which are long enough)
+        self.assertEqual(3, collect.call_count)
+        self.assertTrue(gc.isenabled())
+
+# Helper which tracks the ticks at which it was called
+class TimedTask():
+    def __init__(self, clock):
+        self._clock = clock
+        self._calledAt = []
+
+    def call(self):
+        self._calledAt.append(self._clock.ticks_ms())
+
+# Helper which stops the driver after being called the appropriate number of times
+class StopDriverAfterLoops():
+    def __init__(self, driver, loopLimit):
+        self._driver = driver
+        self._timesCalled = 0
+        self._loopLimit = loopLimit
+
+    def call(self):
+        self._timesCalled += 1
+        if (self._timesCalled >= self._loopLimit):
+            self._driver.stop()
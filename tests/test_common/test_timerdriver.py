@@ -0,0 +1,153 @@
+import unittest
+import gc
+import mocks.mock_micropython
+import mocks.micropython.mock_utime as mu
+import mocks.micropython.mock_micropython as mmp
+import common.driver as driver
+import common.timerdriver as timerdriver
+
+class TestTimerDriver(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = mu.FakeClock(500)
+        mu.installClock(self.clock)
+        mmp.reset()
+        self.testDriver = timerdriver.TimerDriver()
+
+    def tearDown(self):
+        mu.removeClock()
+        mmp.reset()
+
+    """
+    When trying to start the driver without any tasks registered, an exception is raised
+    """
+    def testStartNothingRegistered(self):
+        self.assertRaises(Exception, self.testDriver.start)
+
+    """
+    Starting arms the timer for the first task and returns without triggering anything
+    """
+    def testStartArmsTimer(self):
+        action1 = TimedTask(self.clock)
+        self.testDriver.register(1.5, action1.call)
+        self.testDriver.start()
+        self.testDriver._timer.assertArmed(1500)
+        self.assertEqual(0, len(mmp.scheduled))
+        self.assertEqual([], action1._calledAt)
+
+    """
+    The timer callback only schedules the dispatch, the tasks are triggered from the scheduled callback and the timer
+    armed for the deadline of the next task(s)
+    """
+    def testTasksDispatchedViaSchedule(self):
+        action1 = TimedTask(self.clock)
+        action2 = TimedTask(self.clock)
+        self.testDriver.register(1, action1.call)
+        self.testDriver.register(1, action2.call)
+        self.testDriver.register(3, TimedTask(self.clock).call)
+        self.testDriver.start()
+
+        self.clock.advance(1000)
+        self.testDriver._timer.fire()
+        self.assertEqual([], action1._calledAt)
+        self.assertEqual(1, len(mmp.scheduled))
+
+        mmp.runScheduled()
+        self.assertEqual([1500], action1._calledAt)
+        self.assertEqual([1500], action2._calledAt)
+        self.testDriver._timer.assertArmed(2000)
+
+    """
+    The time taken by the tasks is accounted for when arming the timer, so that the schedule does not drift
+    """
+    def testNoDriftOverManyCycles(self):
+        action1 = TimedTask(self.clock, 120)
+        action2 = TimedTask(self.clock, 45)
+        self.testDriver.register(1, action1.call)
+        self.testDriver.register(4, action2.call)
+        self.testDriver.start()
+
+        for i in range(200):
+            elapse(self.testDriver, self.clock)
+            elapse(self.testDriver, self.clock)
+
+        for i in range(200):
+            self.assertEqual(500 + i * 4000 + 1000, action1._calledAt[i])
+            self.assertEqual(500 + i * 4000 + 4000, action2._calledAt[i])
+
+    """
+    If the tasks complete after the next deadline, the next tasks are dispatched without arming the timer
+    """
+    def testOverrunDispatchesImmediately(self):
+        action1 = TimedTask(self.clock, 2500)
+        action2 = TimedTask(self.clock)
+        self.testDriver.register(1, action1.call)
+        self.testDriver.register(2, action2.call)
+        self.testDriver.register(5, self.testDriver.stop)
+        self.testDriver.start()
+
+        elapse(self.testDriver, self.clock)
+        self.assertEqual([1500], action1._calledAt)
+        self.assertEqual([4000], action2._calledAt)
+        self.testDriver._timer.assertArmed(1500)
+
+    """
+    Stopping disables the timer, and any dispatch which has already been scheduled does nothing
+    """
+    def testStop(self):
+        action1 = TimedTask(self.clock)
+        self.testDriver.register(1, action1.call)
+        self.testDriver.register(2, self.testDriver.stop)
+        self.testDriver.register(3, action1.call)
+        self.testDriver.start()
+
+        elapse(self.testDriver, self.clock)
+        elapse(self.testDriver, self.clock)
+        self.testDriver._timer.assertNotArmed()
+        self.assertEqual([1500], action1._calledAt)
+
+        mmp.schedule(self.testDriver._dispatch, None)
+        mmp.runScheduled()
+        self.assertEqual([1500], action1._calledAt)
+
+    """
+    A frozen driver restores automatic garbage collection once nothing remains to be triggered, as when stopped
+    """
+    def testThawWhenQueueEmpties(self):
+        schedule = driver.Schedule(None, False)
+        action1 = TimedTask(self.clock)
+        schedule.registerMs(1000, action1.call)
+        self.testDriver.add(schedule)
+        self.testDriver.freeze(50)
+        try:
+            self.testDriver.start()
+            self.assertFalse(gc.isenabled())
+
+            elapse(self.testDriver, self.clock)
+            self.assertEqual([1500], action1._calledAt)
+            self.assertFalse(self.testDriver._isAlive)
+            self.assertTrue(gc.isenabled())
+        finally:
+            gc.enable()
+
+'''
+Let the time armed in the timer elapse, fire the timer and run the scheduled dispatch
+'''
+def elapse(testDriver, clock):
+    clock.advance(testDriver._timer._period)
+    testDriver._timer.fire()
+    mmp.runScheduled()
+
+# Helper which tracks when it was called and takes time to complete
+class TimedTask():
+    def __init__(self, clock, durationMs = 0):
+        self._clock = clock
+        self._duration = durationMs
+        self._calledAt = []
+
+    def call(self):
+        self._calledAt.append(self._clock.ticks_ms())
+        self._clock.advance(self._duration)
+
+if __name__ == '__main__':
+    unittest.main()
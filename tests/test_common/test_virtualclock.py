@@ -0,0 +1,110 @@
+import unittest
+import mocks.mock_micropython
+import common.driver as driver
+from common.virtualclock import VirtualClock
+
+class TestVirtualClock(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = VirtualClock()
+
+    """
+    Sleeping moves the clock forward by exactly the time slept, without any actual waiting
+    """
+    def testSleep(self):
+        self.assertEqual(0, self._clock.ticks_ms())
+        self._clock.sleep_ms(1500)
+        self.assertEqual(1500, self._clock.ticks_ms())
+        self._clock.sleep(2.25)
+        self.assertEqual(3750, self._clock.ticks_ms())
+        self._clock.sleep_ms(-10)
+        self.assertEqual(3750, self._clock.ticks_ms())
+        self.assertEqual(3750, self._clock.elapsedMs())
+
+    """
+    The tick counter wraps around as the micropython one does, with the elapsed time continuing on regardless
+    """
+    def testWrapAround(self):
+        clock = VirtualClock(VirtualClock.TICKS_MAX - 99)
+        start = clock.ticks_ms()
+        clock.sleep_ms(250)
+        self.assertEqual(150, clock.ticks_ms())
+        self.assertEqual(250, clock.ticks_diff(clock.ticks_ms(), start))
+        self.assertEqual(-250, clock.ticks_diff(start, clock.ticks_ms()))
+        self.assertEqual(150, clock.ticks_add(start, 250))
+        self.assertEqual(start, clock.ticks_add(150, -250))
+        self.assertEqual(250, clock.elapsedMs())
+
+class TestRunFor(unittest.TestCase):
+
+    """
+    Running against a virtual clock, days worth of tasks are simulated with every task run exactly on time
+    """
+    def testSimulateDays(self):
+        clock = VirtualClock(VirtualClock.TICKS_MAX - 5000)
+        testDriver = driver.Driver(driver.Driver.MODE.ABSOLUTE, clock)
+        fast = TimedTask(clock)
+        slow = TimedTask(clock)
+        testDriver.registerMs(0, fast)
+        testDriver.registerMs(250, lambda: None)
+        schedule = driver.Schedule(3600000)
+        schedule.registerMs(1000, slow)
+        testDriver.add(schedule)
+
+        durationMs = 3 * 24 * 3600000
+        testDriver.runFor(durationMs)
+
+        self.assertEqual(durationMs, clock.elapsedMs())
+        self.assertFalse(testDriver._isAlive)
+        self.assertEqual(durationMs // 250 + 1, len(fast.times))
+        self.assertEqual(72, len(slow.times))
+        for i in range(len(fast.times)):
+            self.assertEqual(i * 250, fast.times[i])
+        for i in range(len(slow.times)):
+            self.assertEqual(1000 + i * 3600000, slow.times[i])
+
+    """
+    In relative mode the time taken by the tasks is added to each cycle, with the duration being that of the schedule
+    """
+    def testRelativeMode(self):
+        clock = VirtualClock()
+        testDriver = driver.Driver(driver.Driver.MODE.RELATIVE, clock)
+        task = TimedTask(clock, 10)
+        testDriver.registerMs(0, task)
+        testDriver.registerMs(1000, lambda: None)
+
+        testDriver.runFor(10000)
+        self.assertEqual([0, 1010, 2020, 3030, 4040, 5050, 6060, 7070, 8080, 9090, 10100], task.times)
+        self.assertEqual(10110, clock.elapsedMs())
+
+    """
+    Stopping the driver from a task ends the run early
+    """
+    def testStopEarly(self):
+        clock = VirtualClock()
+        testDriver = driver.Driver(driver.Driver.MODE.ABSOLUTE, clock)
+        task = TimedTask(clock)
+        testDriver.registerMs(0, task)
+        testDriver.registerMs(500, testDriver.stop)
+        testDriver.registerMs(1000, task)
+
+        testDriver.runFor(10000)
+        self.assertEqual([0], task.times)
+        self.assertEqual(500, clock.elapsedMs())
+
+    def testNothingRegistered(self):
+        testDriver = driver.Driver(driver.Driver.MODE.ABSOLUTE, VirtualClock())
+        self.assertRaises(Exception, testDriver.runFor, 1000)
+
+'''
+Task which records the (virtual) time at which it is called, optionally taking some time to execute
+'''
+class TimedTask:
+    def __init__(self, clock, durationMs = 0):
+        self._clock = clock
+        self._durationMs = durationMs
+        self.times = []
+
+    def __call__(self):
+        self.times.append(self._clock.elapsedMs())
+        self._clock.sleep_ms(self._durationMs)
@@ -0,0 +1,398 @@
+import unittest
+import io
+import tracemalloc
+import mocks.mock_micropython
+import common.driver
+from mocks.micropython.mock_utime import FakeClock
+
+import lights.trafficlight as tl
+from lights.eventtable import EventTable
+
+RED = tl.TrafficLight.COLOUR.RED
+YELLOW = tl.TrafficLight.COLOUR.YELLOW
+GREEN = tl.TrafficLight.COLOUR.GREEN
+
+class TestEventTable(unittest.TestCase):
+
+    def setUp(self):
+        self._light1 = tl.TrafficLight(1, 2, 3, 4)
+        self._light2 = tl.TrafficLight(4, 5, 6, 4)
+
+    def testInvalidPeriod(self):
+        self.assertRaises(ValueError, EventTable, 0)
+        self.assertRaises(ValueError, EventTable, -1)
+
+    def testTimeBeyondPeriod(self):
+        table = EventTable(1000)
+        self.assertRaises(ValueError, table.addPattern, self._light1, [tl.LightAction(RED, True, 1001)])
+
+    def testMustCompileBeforeDriving(self):
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 0)])
+        self.assertRaises(Exception, table._reset)
+        table.compile()
+        self.assertEqual(0, table._reset())
+
+    """
+    Transitions are ordered by time, with those at the same time remaining in the order they were added. Each
+    LED of each light is given its own channel
+    """
+    def testCompile(self):
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 500), tl.LightAction(GREEN, False, 0), tl.LightAction(RED, False, 1000)])
+        table.addPattern(self._light2, [tl.LightAction(RED, True, 0), tl.LightAction(GREEN, True, 500)])
+        self.assertFalse(table.hasTasks())
+        table.compile()
+
+        self.assertTrue(table.hasTasks())
+        self.assertEqual(5, len(table))
+        self.assertEqual([(0, self._light1, GREEN, 0),
+                          (0, self._light2, RED, 1),
+                          (500, self._light1, RED, 1),
+                          (500, self._light2, GREEN, 1),
+                          (1000, self._light1, RED, 0)], transitions(table))
+        # Each LED of each light has a single channel
+        self.assertEqual(6, len(table._lights))
+
+        # Compiling again includes additional transitions, retaining those already compiled
+        table.addPattern(self._light2, [tl.LightAction(YELLOW, True, 250)])
+        table.compile()
+        self.assertEqual([0, 0, 250, 500, 500, 1000], list(table._times))
+
+    def testInvalidAspect(self):
+        table = EventTable(1000)
+        self.assertRaises(ValueError, table.addPattern, self._light1, [tl.LightAction(3, True, 0)])
+
+    def testTooManyChannels(self):
+        table = EventTable(1000)
+        for i in range(EventTable.MAX_CHANNELS // 3):
+            light = tl.TrafficLight(1, 2, 3, 4)
+            table.addPattern(light, [tl.LightAction(RED, True, 0), tl.LightAction(YELLOW, True, 0), tl.LightAction(GREEN, True, 0)])
+        self.assertRaises(ValueError, table.addPattern, self._light1, [tl.LightAction(RED, True, 0), tl.LightAction(YELLOW, True, 0)])
+
+    """
+    Firing performs all transitions at the current time, returning the delay to the next ones (wrapping at the end of the period)
+    """
+    def testFire(self):
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 200), tl.LightAction(GREEN, True, 200), tl.LightAction(RED, False, 900)])
+        table.compile()
+
+        self.assertEqual(200, table._reset())
+        self.assertEqual(700, table._fire())
+        self._light1._lights[RED].assertState(True)
+        self._light1._lights[GREEN].assertState(True)
+        self.assertEqual(300, table._fire())
+        self._light1._lights[RED].assertState(False)
+        self._light1._lights[GREEN].assertState(True)
+        self.assertEqual(700, table._fire())
+        self._light1._lights[RED].assertState(True)
+
+    """
+    Staged changes are only spliced in at the cycle boundary, replacing the transitions of the changed light only
+    """
+    def testSpliceAtCycleBoundary(self):
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 200), tl.LightAction(RED, False, 900)])
+        table.addPattern(self._light2, [tl.LightAction(GREEN, True, 100), tl.LightAction(GREEN, False, 600)])
+        table.compile()
+        self.assertEqual(100, table._reset())
+        self.assertEqual(100, table._fire())
+
+        table.setPeriod(1200)
+        table.replacePattern(self._light1, [tl.LightAction(YELLOW, False, 1100), tl.LightAction(YELLOW, True, 300)])
+        self.assertTrue(table.hasStaged())
+        self.assertEqual(4, len(table))
+
+        # The current cycle continues unchanged
+        self.assertEqual(400, table._fire())
+        self.assertEqual(300, table._fire())
+        self._light1._lights[YELLOW].assertState(False)
+
+        # The current cycle runs its full period, with the changes spliced in at its end and the light placed into its state
+        # at the start of the new cycle
+        self.assertEqual(100, table._fire())
+        self.assertTrue(table.hasStaged())
+        self.assertEqual(100, table._fire())
+        self.assertFalse(table.hasStaged())
+        self.assertEqual(1200, table.period())
+        self._light1._lights[RED].assertState(False)
+        self._light1._lights[YELLOW].assertState(False)
+        self.assertEqual([(100, self._light2, GREEN, 1),
+                          (300, self._light1, YELLOW, 1),
+                          (600, self._light2, GREEN, 0),
+                          (1100, self._light1, YELLOW, 0)], transitions(table))
+        self.assertEqual(200, table._fire())
+        self.assertEqual(300, table._fire())
+        self._light1._lights[YELLOW].assertState(True)
+
+    """
+    Changes staged part way through the cycle take effect at the end of the period, rather than following the last
+    transition of the cycle
+    """
+    def testSpliceAtPeriodEnd(self):
+        table = EventTable(1000)
+        table.addPattern(self._light2, [tl.LightAction(GREEN, True, 100), tl.LightAction(GREEN, False, 600)])
+        table.compile()
+        self.assertEqual(100, table._reset())
+
+        table.replacePattern(self._light2, [tl.LightAction(GREEN, True, 0)])
+        self.assertEqual(500, table._fire())
+        self.assertEqual(400, table._fire())
+        self._light2._lights[GREEN].assertState(False)
+        self.assertEqual(0, table._nextDelay())
+        self.assertIsNone(table._position())
+
+        # At the end of the period (1000)
+        self.assertEqual(0, table._fire())
+        self._light2._lights[GREEN].assertState(True)
+        self.assertEqual(1000, table._fire())
+        self.assertEqual([(0, self._light2, GREEN, 1)], transitions(table))
+
+    """
+    Shortening the period is rejected when staged should the transitions of a light which is not changed along with it
+    fall beyond the new period, with nothing being staged
+    """
+    def testStageBeyondPeriod(self):
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 0), tl.LightAction(RED, False, 900)])
+        table.addPattern(self._light2, [tl.LightAction(GREEN, True, 100), tl.LightAction(GREEN, False, 600)])
+        table.compile()
+
+        self.assertRaises(ValueError, table.setPeriod, 800)
+        self.assertRaises(ValueError, table.stageChanges, [(self._light2, [tl.LightAction(GREEN, True, 100)])], 800)
+        self.assertFalse(table.hasStaged())
+
+        # Once the light is changed before (or along with) the period, the changes are staged
+        table.replacePattern(self._light1, [tl.LightAction(RED, True, 0), tl.LightAction(RED, False, 800)])
+        table.setPeriod(800)
+        self.assertRaises(ValueError, table.setPeriod, 700)
+        self.assertEqual(0, table._reset())
+        self.assertEqual(800, table.period())
+        self.assertEqual([0, 100, 600, 800], list(table._times))
+
+    """
+    A batch of changes is validated against the period as a whole, and merged in a single pass
+    """
+    def testStageChanges(self):
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 0), tl.LightAction(RED, False, 900)])
+        table.addPattern(self._light2, [tl.LightAction(GREEN, True, 100), tl.LightAction(GREEN, False, 600)])
+        table.compile()
+
+        table.stageChanges([(self._light1, [tl.LightAction(RED, True, 0), tl.LightAction(RED, False, 400)]),
+                            (self._light2, None)], 500)
+        self.assertEqual([0, 400], list(table._merged[0]))
+        self.assertEqual(0, table._reset())
+        self.assertEqual(500, table.period())
+        self.assertEqual([(0, self._light1, RED, 1), (400, self._light1, RED, 0)], transitions(table))
+        self._light2._lights[GREEN].assertState(False)
+
+    """
+    Adding a light to a running table allocates its channels right away, whereas removing a light only turns it off once spliced
+    """
+    def testAddRemoveLight(self):
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 0), tl.LightAction(RED, False, 500)])
+        table.compile()
+        self.assertRaises(ValueError, table.removePattern, self._light2)
+        self.assertRaises(ValueError, table.replacePattern, self._light2, [tl.LightAction(RED, True, 1001)])
+        self.assertRaises(ValueError, table.setPeriod, 0)
+
+        table.replacePattern(self._light2, [tl.LightAction(GREEN, True, 250), tl.LightAction(GREEN, False, 750)])
+        self.assertEqual(6, len(table._lights))
+        self.assertEqual(2, len(table))
+
+        # Resetting also splices in the staged changes
+        self.assertEqual(0, table._reset())
+        self.assertEqual(4, len(table))
+        table._fire()
+        table._fire()
+        self._light2._lights[GREEN].assertState(True)
+
+        table.removePattern(self._light2)
+        table._fire()
+        self._light2._lights[GREEN].assertState(True)
+        table._fire()
+        self._light2._lights[GREEN].assertState(False)
+        self.assertEqual(4, len(table))
+        self.assertEqual(0, table._fire())
+        self.assertEqual([(0, self._light1, RED, 1), (500, self._light1, RED, 0)], transitions(table))
+
+    """
+    The merging of the staged changes takes place when they are staged, so that splicing them in at the cycle boundary (from
+    within the dispatch) only swaps in the merged arrays rather than building them
+    """
+    def testSplicePreparedWhenStaged(self):
+        lights = [tl.TrafficLight(1, 2, 3, 4) for i in range(48)]
+        table = EventTable(10000)
+        for i in range(len(lights)):
+            table.addPattern(lights[i], [tl.LightAction(RED, t % 2 == 0, t * 100 + (i % 4) * 25) for t in range(100)])
+        table.compile()
+        table._reset()
+        while table._index < len(table) - len(lights) // 4:
+            table._fire()
+
+        table.replacePattern(lights[0], [tl.LightAction(GREEN, True, 0), tl.LightAction(GREEN, False, 5000)])
+        self.assertIsNotNone(table._merged)
+        while table._index < len(table):
+            table._fire()
+
+        # At the end of the period
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            table._fire()
+            peak = tracemalloc.get_traced_memory()[1] - before
+        finally:
+            tracemalloc.stop()
+
+        self.assertFalse(table.hasStaged())
+        self.assertEqual(47 * 100 + 2, len(table))
+        self.assertTrue(peak < table.sizeBytes() // 10, 'Splice used ' + str(peak) + ' bytes')
+        lights[0]._lights[GREEN].assertState(False)
+
+    """
+    The compiled table requires less memory than registering the transitions with a schedule, with each transition
+    occupying only a few bytes
+    """
+    def testLessMemoryThanSchedule(self):
+        lights = [tl.TrafficLight(1, 2, 3, 4) for i in range(4 * 12)]
+        patterns = []
+        for i in range(len(lights)):
+            # Flash the red light of each traffic light, offset from one another
+            patterns.append([tl.LightAction(RED, t % 2 == 0, t * 100 + (i % 4) * 25) for t in range(100)])
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        schedules = []
+        for i in range(12):
+            schedule = common.driver.Schedule(10000)
+            for j in range(4):
+                tl._registerPattern(schedule, lights[i * 4 + j], patterns[i * 4 + j])
+            schedules.append(schedule)
+        scheduleMemory = tracemalloc.get_traced_memory()[0] - before
+
+        before = tracemalloc.get_traced_memory()[0]
+        tables = []
+        for i in range(12):
+            table = EventTable(10000)
+            for j in range(4):
+                table.addPattern(lights[i * 4 + j], patterns[i * 4 + j])
+            table.compile()
+            tables.append(table)
+        tableMemory = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        self.assertTrue(tableMemory < scheduleMemory / 4, 'Table used ' + str(tableMemory) + ' bytes vs ' + str(scheduleMemory) + ' bytes for schedules')
+        self.assertEqual(12 * 4 * 100 * 6 + 12 * 4 * 3, sum([t.sizeBytes() for t in tables]))
+
+    """
+    Skipped transitions only apply their final levels once flushed, other than to the LEDs which the transitions that
+    are due set anyway
+    """
+    def testSkip(self):
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 0), tl.LightAction(RED, False, 100),
+                                        tl.LightAction(GREEN, True, 200), tl.LightAction(RED, True, 300)])
+        table.compile()
+        self.assertEqual(0, table._reset())
+        self.assertEqual(100, table._fire())
+        writes = self._light1.writeStats()[0]
+
+        self.assertEqual(100, table._nextDelay())
+        self.assertEqual(100, table._skip())
+        self.assertEqual(100, table._coalesce())
+        self._light1._lights[GREEN].assertState(False)
+        self.assertEqual(writes, self._light1.writeStats()[0])
+
+        table._flush()
+        self._light1._lights[GREEN].assertState(True)
+        self.assertEqual(writes + 1, self._light1.writeStats()[0])
+        self.assertEqual(700, table._fire())
+        self._light1._lights[RED].assertState(True)
+        self.assertEqual(writes + 1, self._light1.writeStats()[0])
+
+        # Skipping across the end of the cycle wraps around
+        self.assertEqual(100, table._skip())
+        self.assertEqual(100, table._skip())
+        self.assertEqual(100, table._skip())
+        self.assertEqual(700, table._skip())
+        self.assertEqual(0, table._index)
+        self.assertEqual(100, table._nextDelay())
+
+    """
+    A saved table loads back in with the same transitions, without any patterns being added
+    """
+    def testSaveLoad(self):
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 500), tl.LightAction(GREEN, False, 0)])
+        table.addPattern(self._light2, [tl.LightAction(RED, True, 0), tl.LightAction(GREEN, True, 999)])
+        table.compile()
+        blob = io.BytesIO()
+        table.save(blob, 1234)
+
+        loaded = EventTable(1)
+        self.assertTrue(loaded.load(io.BytesIO(blob.getvalue()), [self._light1, self._light2], 1234))
+        self.assertEqual(1000, loaded.period())
+        self.assertEqual(transitions(table), transitions(loaded))
+        self.assertEqual(0, loaded._reset())
+        self.assertEqual(500, loaded._fire())
+
+    """
+    The blob is only loaded if it matches the config hash and lights, and is complete
+    """
+    def testLoadMismatch(self):
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 500)])
+        table.compile()
+        blob = io.BytesIO()
+        table.save(blob, 1234)
+        blob = blob.getvalue()
+
+        self.assertFalse(EventTable(1000).load(io.BytesIO(blob), [self._light1], 4321))
+        self.assertFalse(EventTable(1000).load(io.BytesIO(blob), [self._light1, self._light2], 1234))
+        self.assertFalse(EventTable(1000).load(io.BytesIO(blob[:-1]), [self._light1], 1234))
+        self.assertFalse(EventTable(1000).load(io.BytesIO(blob[:5]), [self._light1], 1234))
+        self.assertFalse(EventTable(1000).load(io.BytesIO(b'x' + blob[1:]), [self._light1], 1234))
+
+        # Patterns can still be added to a table which failed to load
+        fallback = EventTable(1000)
+        self.assertFalse(fallback.load(io.BytesIO(b''), [self._light1], 1234))
+        self.assertFalse(fallback.hasTasks())
+        fallback.addPattern(self._light1, [tl.LightAction(RED, True, 500)])
+        fallback.compile()
+        self.assertEqual(transitions(table), transitions(fallback))
+
+        table.addPattern(self._light1, [tl.LightAction(RED, False, 600)])
+        self.assertRaises(Exception, table.save, io.BytesIO(), 1234)
+
+    """
+    Only the time of the first transitions is marked
+    """
+    def testMarkFirstTransition(self):
+        clock = FakeClock(100)
+        table = EventTable(1000)
+        table.addPattern(self._light1, [tl.LightAction(RED, True, 200), tl.LightAction(RED, False, 900)])
+        table.compile()
+        table.markFirstTransition(clock)
+
+        table._reset()
+        self.assertIsNone(table.firstTransitionTicks())
+        clock.advance(200)
+        self.assertEqual(700, table._fire())
+        self.assertEqual(300, table.firstTransitionTicks())
+        clock.advance(700)
+        self.assertEqual(300, table._fire())
+        self.assertEqual(300, table.firstTransitionTicks())
+        self.assertFalse('_fire' in table.__dict__)
+
+def transitions(table):
+    converted = []
+    for i in range(len(table)):
+        c = table._channels[i]
+        converted.append((table._times[i], table._lights[c], table._aspects[c], table._levels[i]))
+    return converted
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import mocks.mock_micropython
+import mocks.micropython.mock_machine as mm
+import mocks.micropython.mock_rp2 as mrp2
+import common.driver
+import mocks.common.mock_driver as md
+
+from lights.flasher import Flasher
+
+class TestFlasher(unittest.TestCase):
+
+    def setUp(self):
+        mrp2.reset()
+        md.mockDriver.reset()
+
+    def testInvalidPattern(self):
+        self.assertRaises(ValueError, Flasher, 0, [])
+        self.assertRaises(ValueError, Flasher, 0, [(1, 100)] * 7)
+        self.assertRaises(ValueError, Flasher, 0, [(1, 100), (0, 0)])
+        self.assertRaises(ValueError, Flasher, 0, [(2, 100), (0, 100)])
+        self.assertRaises(ValueError, Flasher, 0, [(1, 100)], 0)
+        self.assertRaises(ValueError, Flasher, 0, [(1, 100)], 6)
+
+    """
+    Patterns beyond what the state machine can hold (too long, or too short compared to the longest step) are rejected
+    """
+    def testPatternOutOfRange(self):
+        self.assertRaises(ValueError, Flasher, 0, [(1, 20000), (0, 1000)])
+        self.assertRaises(ValueError, Flasher, 0, [(1, 10000), (0, 5)])
+        Flasher(0, [(1, 10000), (0, 1000)])
+
+    """
+    The frequency is the highest at which the longest step can be held, with each step held for the closest number of cycles
+    """
+    def testTimingMath(self):
+        beacon = Flasher.beacon(15, 500, 250)
+        self.assertTrue(beacon.usesPio())
+        self.assertEqual(Flasher.MAX_STEP_CYCLES * 2, beacon.frequency())
+        self.assertEqual([(1, 31, 31, 31), (0, 15, 31, 31)], beacon._steps)
+        self.assertEqual(500, beacon.actualMs()[0])
+        self.assertAlmostEqual(250, beacon.actualMs()[1], delta=0.05)
+
+        # Short steps are held exactly
+        quick = Flasher(0, [(1, 10), (0, 1)])
+        self.assertEqual(125000000, Flasher.SYS_CLOCK_HZ)
+        self.assertEqual(Flasher.MAX_STEP_CYCLES * 100, quick.frequency())
+        for cycles in [36, 37, 100, 1058, 1059, 1060, 2000, 33825, 33826]:
+            step = quick._assembleStep(1, cycles)
+            self.assertTrue(abs(cycles - quick._stepCycles(step)) <= (step[1] + 1) // 2, (cycles, step))
+            if cycles <= 1059:
+                self.assertEqual(cycles, quick._stepCycles(step))
+
+        for expected, actual in zip([10, 1], quick.actualMs()):
+            self.assertAlmostEqual(expected, actual, delta=0.001)
+
+    """
+    The program holds each step for its number of cycles, repeating once the last step is done
+    """
+    def testProgram(self):
+        wigwag = Flasher.wigwag(16, 1000)
+        program = wigwag._program()
+        self.assertEqual((0, 0), program.setInit)
+        self.assertEqual(10, len(program.instructions))
+        self.assertEqual({'outer0': 2, 'inner0': 3, 'outer1': 7, 'inner1': 8}, program.labels)
+        self.assertEqual("('set', 'pins', 1, 0)", repr(program.instructions[0]))
+        self.assertEqual("('jmp', 'x_dec', 'inner0', 31)", repr(program.instructions[3]))
+
+        # Run for just over two periods
+        first = wigwag._stepCycles(wigwag._steps[0])
+        period = first + wigwag._stepCycles(wigwag._steps[1])
+        changes = mrp2.simulate(program, 2 * period + 1)
+        self.assertEqual([(0, 1), (first, 2), (period, 1), (period + first, 2), (2 * period, 1)], changes)
+        self.assertEqual([500, 500], wigwag.actualMs())
+
+    """
+    Starting runs the program on the state machine, with the pins starting from the base pin
+    """
+    def testStart(self):
+        wigwag = Flasher.wigwag(16, 1000, 3)
+        wigwag.start()
+        sm = mrp2.stateMachines[3]
+        self.assertTrue(sm.isActive)
+        self.assertEqual(wigwag.frequency(), sm.freq)
+        sm.setBase.assertPin(16, mm.Pin.OUT)
+        wigwag._lights[1].assertPin(17, mm.Pin.OUT)
+        self.assertEqual(10, len(sm.program.instructions))
+
+        wigwag.stop()
+        self.assertFalse(sm.isActive)
+        wigwag.start()
+        self.assertIs(sm, mrp2.stateMachines[3])
+        self.assertTrue(sm.isActive)
+        md.assertNumTasksRegistered(0)
+
+    """
+    Without PIO the pattern is run by the driver
+    """
+    def testPythonFallback(self):
+        wigwag = Flasher(16, [(1, 300), (2, 300), (0, 400)], 2, usePio=False)
+        self.assertFalse(wigwag.usesPio())
+        self.assertEqual(None, wigwag.frequency())
+        self.assertEqual([300, 300, 400], wigwag.actualMs())
+        wigwag.start()
+        wigwag.start()
+        self.assertEqual(0, len(mrp2.stateMachines))
+        self.assertEqual(2, len(md.mockDriver._schedules))
+        self.assertEqual(1000, wigwag._schedule.period())
+
+        md.mockDriver.start()
+        expected = [(True, False), (False, True), (False, False), (True, False)]
+        for lit in expected:
+            md.mockDriver.step()
+            wigwag._lights[0].assertState(lit[0])
+            wigwag._lights[1].assertState(lit[1])
@@ -0,0 +1,125 @@
+import unittest
+import io
+import os
+import tempfile
+import mocks.mock_micropython
+import mocks.micropython.mock_utime as mu
+import common.driver
+import mocks.common.mock_driver as md
+
+import lights.trafficlight as tl
+from lights.layout import LayoutLoader
+
+LAYOUT = """# Main street
+{"intersection": "RED_GREEN_YELLOW", "yellow": 2.5}
+{"light": [0, 1, 2], "green": 20}
+{"light": [10, 11, 12], "green": 25.5}
+
+{"intersection": "RED_REDYELLOW_GREEN_YELLOW"}
+{"light": [3, 4, 5]}
+{"light": [13, 14, 15], "green": 30}
+{"light": [23, 24, 25], "green": 10}
+"""
+
+class TestLayoutLoader(unittest.TestCase):
+
+    def setUp(self):
+        md.mockDriver.reset()
+        self._clock = mu.FakeClock()
+
+    def tearDown(self):
+        md.mockDriver.reset()
+
+    """
+    Loading the config behaves exactly as the equivalent builder calls
+    """
+    def testSameAsBuilder(self):
+        builders = LayoutLoader(None, self._clock).load(io.StringIO(LAYOUT))
+        loaded = md.mockDriver._schedules[1:]
+        md.mockDriver.reset()
+
+        builder1 = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 2.5)
+        builder1.addTrafficLight(0, 1, 2, 20)
+        builder1.addTrafficLight(10, 11, 12, 25.5)
+        builder1.build()
+        builder2 = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_REDYELLOW_GREEN_YELLOW)
+        builder2.addTrafficLight(3, 4, 5)
+        builder2.addTrafficLight(13, 14, 15, 30)
+        builder2.addTrafficLight(23, 24, 25, 10)
+        built = md.mockDriver._schedules[1:]
+
+        self.assertEqual(2, len(builders))
+        self.assertEqual(2, len(loaded))
+        for table, expected in zip(loaded, [builder1._table, builder2.build()]):
+            self.assertEqual(expected.period(), table.period())
+            self.assertEqual(list(expected._times), list(table._times))
+            self.assertEqual(list(expected._channels), list(table._channels))
+            self.assertEqual(list(expected._levels), list(table._levels))
+
+    """
+    The config is read from the file one line at a time
+    """
+    def testLoadFile(self):
+        fd, path = tempfile.mkstemp(suffix='.ndjson')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(LAYOUT)
+            builders = LayoutLoader(None, self._clock).loadFile(path)
+        finally:
+            os.remove(path)
+        self.assertEqual([2, 3], [len(b._trafficLight) for b in builders])
+        self.assertEqual(3, len(md.mockDriver._schedules))
+
+    """
+    The time spent parsing and building is tracked separately
+    """
+    def testTimings(self):
+        loader = LayoutLoader(None, self._clock)
+        loader.load(io.StringIO(LAYOUT))
+        self.assertEqual(0, loader.parseMs())
+        self.assertEqual(0, loader.buildMs())
+
+        parseClock = ParseClock(self._clock, 2)
+        loader = LayoutLoader(None, parseClock)
+        loader.load(io.StringIO(LAYOUT))
+        # Each of the 7 entries takes 2 ms to parse and 2 ms to apply, with the last intersection built at the end
+        self.assertEqual(7 * 2, loader.parseMs())
+        self.assertEqual(7 * 2 + 2, loader.buildMs())
+
+    def testInvalidEntries(self):
+        loader = LayoutLoader(None, self._clock)
+        self.assertRaises(ValueError, loader.load, io.StringIO('{"light": [0, 1, 2]}'))
+        self.assertRaises(ValueError, loader.load, io.StringIO('{"intersection": "BLINKING"}'))
+        self.assertRaises(ValueError, loader.load, io.StringIO('{"intersection": "__module__"}'))
+        self.assertRaises(ValueError, loader.load, io.StringIO('{"intersection": "RED_GREEN_YELLOW"}\n{"light": [0, 1]}'))
+        self.assertRaises(ValueError, loader.load, io.StringIO('{"intersection": "RED_GREEN_YELLOW"}\n{"lamp": 4}'))
+        self.assertRaises(ValueError, loader.load, io.StringIO('{"intersection": "RED_GREEN_YELLOW"\n'))
+        self.assertRaises(ValueError, loader.load, io.StringIO('[1, 2]'))
+        try:
+            loader.load(io.StringIO('# comment\n{"intersection": "RED_GREEN_YELLOW"}\n\n{"light": [0, 1, 2], green}\n'))
+            self.fail('Expected ValueError')
+        except ValueError as e:
+            self.assertEqual(4, e.args[1])
+
+    """
+    An intersection without any traffic lights is loaded, with nothing built for it
+    """
+    def testIntersectionWithoutLights(self):
+        builders = LayoutLoader(None, self._clock).load(io.StringIO('{"intersection": "RED_GREEN_YELLOW"}\n' + LAYOUT))
+        self.assertEqual(3, len(builders))
+        self.assertIsNone(builders[0]._table)
+        self.assertEqual(2, len(md.mockDriver._schedules[1:]))
+
+# Helper clock which advances each time it is read
+class ParseClock():
+    def __init__(self, clock, stepMs):
+        self._clock = clock
+        self._stepMs = stepMs
+
+    def ticks_ms(self):
+        now = self._clock.ticks_ms()
+        self._clock.advance(self._stepMs)
+        return now
+
+    def ticks_diff(self, ticks1, ticks2):
+        return self._clock.ticks_diff(ticks1, ticks2)
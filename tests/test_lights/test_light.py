@@ -0,0 +1,80 @@
+import unittest
+import mocks.mock_micropython
+import mocks.micropython.mock_machine as mm
+import common.enum as enum
+
+import lights.trafficlight as tl
+from lights.light import Light
+from lights.eventtable import EventTable
+
+BIKE = enum.create('RED', 'GREEN')
+SIGNAL = enum.create('RED', 'YELLOW', 'GREEN', 'DOUBLE_YELLOW')
+
+class TestLight(unittest.TestCase):
+
+    def setUp(self):
+        self._bike = Light([4, 5])
+        self._signal = Light([10, 11, 12, 13])
+
+    def testNoAspects(self):
+        self.assertRaises(ValueError, Light, [])
+
+    def testSpecifiedValues(self):
+        self.assertEqual(2, self._bike.numAspects())
+        self.assertEqual(4, self._signal.numAspects())
+        self._bike._lights[BIKE.RED].assertPin(4, mm.Pin.OUT)
+        self._bike._lights[BIKE.GREEN].assertPin(5, mm.Pin.OUT)
+        for i in range(4):
+            self._signal._lights[i].assertPin(10 + i, mm.Pin.OUT)
+            self._signal._lights[i].assertState(False)
+
+    def testOnOff(self):
+        self._signal.on(SIGNAL.DOUBLE_YELLOW)
+        assertLightState(self._signal, False, False, False, True)
+        self._signal.on(SIGNAL.RED)
+        self._signal.off(SIGNAL.DOUBLE_YELLOW)
+        assertLightState(self._signal, True, False, False, False)
+
+    """
+    The actions are created once, the same action is provided each time it is looked up
+    """
+    def testActions(self):
+        self.assertEqual(4, len(self._bike._actions))
+        self.assertEqual(8, len(self._signal._actions))
+        greenOn = self._bike.action(BIKE.GREEN, True)
+        self.assertIs(greenOn, self._bike.action(BIKE.GREEN, True))
+        self.assertIsNot(greenOn, self._bike.action(BIKE.GREEN, False))
+
+        greenOn()
+        assertLightState(self._bike, False, True)
+        self._bike.action(BIKE.RED, True)()
+        self._bike.action(BIKE.GREEN, False)()
+        assertLightState(self._bike, True, False)
+
+        self.assertRaises(ValueError, self._bike.action, 2, True)
+        self.assertRaises(ValueError, self._bike.action, -1, False)
+
+    """
+    Lights with any number of aspects can be driven through an EventTable
+    """
+    def testEventTable(self):
+        table = EventTable(3000)
+        table.addPattern(self._bike, [tl.LightAction(BIKE.GREEN, True, 0), tl.LightAction(BIKE.GREEN, False, 2000), tl.LightAction(BIKE.RED, True, 2000)])
+        table.addPattern(self._signal, [tl.LightAction(SIGNAL.RED, True, 0), tl.LightAction(SIGNAL.RED, False, 2000), tl.LightAction(SIGNAL.DOUBLE_YELLOW, True, 2000)])
+        table.compile()
+        self.assertEqual(6, len(table._lights))
+
+        table._reset()
+        table._fire()
+        assertLightState(self._bike, False, True)
+        assertLightState(self._signal, True, False, False, False)
+        table._fire()
+        assertLightState(self._bike, True, False)
+        assertLightState(self._signal, False, False, False, True)
+
+def assertLightState(light, *states):
+    for i in range(len(states)):
+        light._lights[i].assertState(states[i])
+
+if __name__ == '__main__':
+    unittest.main()
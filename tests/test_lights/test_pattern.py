@@ -0,0 +1,98 @@
+import unittest
+import mocks.mock_micropython
+import mocks.common.mock_driver as md
+
+import lights.trafficlight as tl
+from lights.pattern import Pattern
+
+RED = 1
+YELLOW = 2
+GREEN = 4
+
+class TestPattern(unittest.TestCase):
+
+    def testInvalidPattern(self):
+        self.assertRaises(ValueError, Pattern, [])
+        self.assertRaises(ValueError, Pattern, [(RED, -1), (GREEN, 5)])
+        self.assertRaises(ValueError, Pattern, [(-1, 5)])
+        self.assertRaises(ValueError, Pattern, [(RED, 0), (GREEN, 0)])
+        self.assertRaises(ValueError, Pattern, [(RED, 5)], -1)
+
+    """
+    Only the aspects which change from one state to the next are transitioned, those turned off first
+    """
+    def testCompile(self):
+        pattern = Pattern([(GREEN, 20), (YELLOW, 3), (RED, 57), (RED | YELLOW, 3)])
+        self.assertEqual(83, pattern.periodMs())
+        self.assertEqual([(0, 0, False), (0, 1, False), (0, 2, True),
+                          (20, 2, False), (20, 1, True),
+                          (23, 1, False), (23, 0, True),
+                          (80, 1, True)], toTupples(pattern.compile()))
+
+    """
+    The pattern starts at the offset, wrapping around the period, with transitions falling on the end of the period
+    kept at the end of the cycle
+    """
+    def testOffset(self):
+        pattern = Pattern([(GREEN, 20), (YELLOW, 5), (RED, 15)], 15)
+        self.assertEqual([(15, 0, False), (15, 2, True),
+                          (35, 2, False), (35, 1, True),
+                          (40, 1, False), (40, 0, True)], toTupples(pattern.compile()))
+
+        pattern = Pattern([(GREEN, 20), (YELLOW, 5), (RED, 15)], 70)
+        self.assertEqual([(10, 2, False), (10, 1, True),
+                          (15, 1, False), (15, 0, True),
+                          (30, 0, False), (30, 2, True)], toTupples(pattern.compile()))
+
+    """
+    States which are not held are merged into a single transition, and repeated states transition nothing
+    """
+    def testMergeAndDropNoOps(self):
+        pattern = Pattern([(GREEN, 10), (RED, 0), (GREEN | YELLOW, 5), (GREEN | YELLOW, 5), (0, 10)])
+        self.assertEqual([(0, 2, True),
+                          (10, 1, True),
+                          (20, 1, False), (20, 2, False)], toTupples(pattern.compile()))
+        self.assertEqual([], Pattern([(RED, 10), (RED, 10)]).compile())
+
+    def testStateAt(self):
+        pattern = Pattern([(GREEN, 20), (YELLOW, 5), (RED, 15)], 10)
+        self.assertEqual(RED, pattern.stateAt(0))
+        self.assertEqual(GREEN, pattern.stateAt(10))
+        self.assertEqual(GREEN, pattern.stateAt(29))
+        self.assertEqual(YELLOW, pattern.stateAt(30))
+        self.assertEqual(RED, pattern.stateAt(35))
+        self.assertEqual(GREEN, pattern.stateAt(50))
+
+class TestIntersectionPatterns(unittest.TestCase):
+
+    def tearDown(self):
+        md.mockDriver.reset()
+
+    """
+    The transitions of the intersection types are unchanged, with fewer of them registered for a single traffic light
+    """
+    def testIntersectionDefinitions(self):
+        definition = tl.IntersectionBuilder._definitions[tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW]
+        self.assertEqual([(10, 0, False), (10, 2, True), (30, 2, False), (30, 1, True), (33, 1, False), (33, 0, True)],
+                         toTupples(Pattern(definition(20, 3, 27), 10).compile()))
+        self.assertEqual([(0, 1, False), (0, 2, True), (20, 2, False), (20, 1, True)],
+                         toTupples(Pattern(definition(20, 3, 0)).compile()))
+
+        definition = tl.IntersectionBuilder._definitions[tl.IntersectionBuilder.TYPE.RED_REDYELLOW_GREEN_YELLOW]
+        self.assertEqual([(7, 1, True),
+                          (10, 0, False), (10, 1, False), (10, 2, True),
+                          (30, 2, False), (30, 1, True),
+                          (33, 1, False), (33, 0, True)], toTupples(Pattern(definition(20, 3, 27), 10).compile()))
+        self.assertEqual([(0, 1, False), (0, 2, True), (20, 2, False), (20, 1, True)],
+                         toTupples(Pattern(definition(20, 3, 0)).compile()))
+
+    def testSingleTrafficLight(self):
+        builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_REDYELLOW_GREEN_YELLOW)
+        builder.addTrafficLight(1, 2, 3, 20)
+        self.assertEqual(4, len(builder.build()))
+
+def toTupples(actions):
+    return [(act._time, act._colour, act._isOn) for act in actions]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import mocks.mock_micropython
+import mocks.micropython.mock_machine as mm
+import common.driver
+import mocks.common.mock_driver as md
+
+import lights.trafficlight as tl
+from lights.portbank import PortBank
+
+SET = PortBank.GPIO_OUT_SET
+CLR = PortBank.GPIO_OUT_CLR
+
+class TestPortBank(unittest.TestCase):
+
+    def setUp(self):
+        mm.mem32.reset()
+        self._bank = PortBank()
+
+    def testInvalidPin(self):
+        self.assertRaises(ValueError, self._bank.pin, -1)
+        self.assertRaises(ValueError, self._bank.pin, PortBank.NUM_PINS)
+
+    """
+    Changes are only written once committed, with all pins set and cleared in one write each
+    """
+    def testCommit(self):
+        pin1 = self._bank.pin(1)
+        pin5 = self._bank.pin(5)
+        pin29 = self._bank.pin(29)
+        pin1.high()
+        pin5.low()
+        pin29.value(1)
+        mm.mem32.assertWrites([])
+
+        self._bank.commit()
+        mm.mem32.assertWrites([(SET, (1 << 1) | (1 << 29)), (CLR, 1 << 5)])
+
+        # Nothing to write if nothing changed
+        self._bank.commit()
+        mm.mem32.assertWrites([(SET, (1 << 1) | (1 << 29)), (CLR, 1 << 5)])
+
+    """
+    The latest change made to a pin before the commit is the one applied
+    """
+    def testLatestChangeApplied(self):
+        pin3 = self._bank.pin(3)
+        pin4 = self._bank.pin(4)
+        pin3.high()
+        pin3.low()
+        pin4.low()
+        pin4.high()
+        self._bank.commit()
+        mm.mem32.assertWrites([(SET, 1 << 4), (CLR, 1 << 3)])
+
+class TestPortBankIntersection(unittest.TestCase):
+
+    def setUp(self):
+        mm.mem32.reset()
+
+    def tearDown(self):
+        md.mockDriver.reset()
+
+    """
+    All transitions of an intersection at the same time are applied as a single set and a single clear
+    """
+    def testRedGreenYellowIntersection(self):
+        bank = PortBank()
+        builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 3, bank)
+        builder.addTrafficLight(1, 2, 3)
+        builder.addTrafficLight(4, 5, 6)
+        builder.build()
+
+        # Initial state, 1 = green, 2 = red
+        mm.mem32.assertWrites([(SET, mask(3, 4)), (CLR, mask(1, 2, 5, 6))])
+
+        tl.start()
+        mm.mem32.reset()
+        # Tick0: 1 - green, already on so nothing is written
+        md.mockDriver.step()
+        mm.mem32.assertWrites([])
+        mm.mem32.reset()
+        # Tick1: 1 = yellow
+        md.mockDriver.step()
+        mm.mem32.assertWrites([(SET, mask(2)), (CLR, mask(3))])
+        mm.mem32.reset()
+        # Tick2: 1 = red, 2 = green
+        md.mockDriver.step()
+        mm.mem32.assertWrites([(SET, mask(1, 6)), (CLR, mask(2, 4))])
+
+def mask(*pins):
+    m = 0
+    for p in pins:
+        m |= 1 << p
+    return m
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import unittest
+import mocks.mock_micropython
+import common.driver
+import mocks.common.mock_driver as md
+
+import lights.trafficlight as tl
+import lights.pwmbank as pwmbank
+from lights.pwmbank import PwmBank, Fader
+from common.virtualclock import VirtualClock
+
+class TestPwmBank(unittest.TestCase):
+
+    def tearDown(self):
+        # The faders are played on the (mock) driver.instance as the LEDs start fading
+        md.mockDriver.reset()
+
+    def testInvalidSettings(self):
+        self.assertRaises(ValueError, PwmBank, -1)
+        self.assertRaises(ValueError, PwmBank, 0, 1.5)
+        self.assertRaises(ValueError, PwmBank, 0, -0.1)
+        self.assertRaises(ValueError, Fader, 0)
+
+    """
+    Without fading, the LEDs are brought to the brightness right away
+    """
+    def testNoFade(self):
+        bank = PwmBank(0, 0.5, 500)
+        led = bank.pin(3)
+        self.assertEqual(500, led._pwm.freq())
+
+        led.high()
+        led.value(0)
+        led.value(1)
+        bank.setBrightness(0.25)
+        led.low()
+        bank.setBrightness(1)
+        led._pwm.assertDuties([0, 32768, 0, 32768, 16384, 0])
+        self.assertEqual(1, bank.brightness())
+
+    """
+    Fading LEDs are stepped by the fader once each frame, with the fade taking the specified time
+    """
+    def testFade(self):
+        fader = Fader(50)
+        bank = PwmBank(100, 1, fader = fader)
+        led = bank.pin(1)
+        other = bank.pin(2)
+
+        self.assertFalse(fader.hasTasks())
+        led.high()
+        self.assertEqual(1, fader.numFading())
+        self.assertTrue(fader.hasTasks())
+        self.assertTrue(fader in md.mockDriver._schedules)
+        self.assertEqual(20, fader._reset())
+        for i in range(4):
+            self.assertEqual(20, fader._fire())
+        # Once the last fade is complete the fader drops out of the driver
+        self.assertIsNone(fader._fire())
+        led._pwm.assertDuties([0, 13107, 26214, 39321, 52428, 65535])
+        self.assertEqual(0, fader.numFading())
+        self.assertFalse(fader.hasTasks())
+
+        # Nothing is written once the fade is complete
+        fader._fire()
+        self.assertEqual(6, len(led._pwm._duties))
+        other._pwm.assertDuties([0])
+
+    """
+    A fader created for a driver other than the driver.instance is played on its own driver as fades start
+    """
+    def testOwnDriver(self):
+        clock = VirtualClock()
+        owner = common.driver.Driver(common.driver.Driver.MODE.ABSOLUTE, clock)
+        fader = Fader(50, owner)
+        owner.add(fader)
+        bank = PwmBank(100, 1, fader = fader)
+        led = bank.pin(1)
+
+        schedule = common.driver.Schedule(1000)
+        schedule.registerMs(0, led.high)
+        owner.add(schedule)
+        owner.runFor(200)
+
+        led._pwm.assertDuties([0, 13107, 26214, 39321, 52428, 65535])
+        self.assertEqual(0, fader.numFading())
+        self.assertFalse(fader in md.mockDriver._schedules)
+
+    """
+    Reversing a fade part way through fades back from where the LED is
+    """
+    def testReverseFade(self):
+        fader = Fader(50)
+        bank = PwmBank(100, 1, fader = fader)
+        led = bank.pin(1)
+        led.high()
+        fader._fire()
+        fader._fire()
+        led.low()
+        for i in range(5):
+            fader._fire()
+        led._pwm.assertDuties([0, 13107, 26214, 20972, 15729, 10486, 5243, 0])
+
+        # Turning off an LED which is already off starts no fade
+        led.low()
+        self.assertEqual(0, fader.numFading())
+
+    """
+    Dimming the bank fades the LEDs which are on to the new brightness
+    """
+    def testDim(self):
+        fader = Fader(50)
+        bank = PwmBank(40, 1, fader = fader)
+        on = bank.pin(1)
+        off = bank.pin(2)
+        on.high()
+        fader._fire()
+        fader._fire()
+
+        bank.setBrightness(0.5)
+        self.assertEqual(1, fader.numFading())
+        fader._fire()
+        fader._fire()
+        on._pwm.assertDuties([0, 32768, 65535, 49152, 32768])
+        off._pwm.assertDuties([0])
+
+    """
+    Skipped frames keep the fades on time
+    """
+    def testSkippedFrames(self):
+        fader = Fader(50)
+        bank = PwmBank(100, 1, fader = fader)
+        led = bank.pin(1)
+        led.high()
+        self.assertEqual(20, fader._nextDelay())
+        self.assertEqual(20, fader._skip())
+        self.assertEqual(20, fader._coalesce())
+        fader._flush()
+        fader._fire()
+        led._pwm.assertDuties([0, 39321])
+
+class TestPwmBankIntersection(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = VirtualClock()
+        self._driver = common.driver.Driver(common.driver.Driver.MODE.ABSOLUTE, self._clock)
+        common.driver.instance = self._driver
+
+    def tearDown(self):
+        common.driver.instance = md.mockDriver
+
+    """
+    All banks share a single fader added to the driver, which only updates the LEDs that are fading
+    """
+    def testIntersection(self):
+        bank = PwmBank(200)
+        self.assertIs(pwmbank.sharedFader(), bank._fader)
+        self.assertIs(bank._fader, PwmBank(100)._fader)
+        self.assertEqual(2, len(self._driver._schedules))
+
+        builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 3, bank)
+        builder.addTrafficLight(0, 1, 2, 10)
+        builder.addTrafficLight(10, 11, 12, 20)
+        builder.build()
+
+        fading = []
+        fader = bank._fader
+        fire = fader._fire
+        fader._fire = lambda: fading.append(fader.numFading()) or fire()
+        self._driver.runFor(1000)
+
+        # Initially 1 green and 2 red fade in (over 10 frames), after which the fader no longer runs
+        self.assertEqual([2] * 10, fading)
+        self.assertFalse(fader in [entry[2] for entry in self._driver._queue])
+        green = builder._trafficLight[0]._lights[2]
+        self.assertEqual(65535, green.duty())
+        self.assertEqual(11, len(green._pwm._duties))
+
+        # Green fades out as yellow fades in, with the fader played again for the fades
+        self._driver.runFor(10000 + 200)
+        self.assertEqual(0, green.duty())
+        self.assertEqual(65535, builder._trafficLight[0]._lights[1].duty())
+        self.assertEqual([self._driver._default, fader, builder._table], self._driver._schedules)
+
+    """
+    A new shared fader is created when the driver is replaced
+    """
+    def testSharedFaderPerDriver(self):
+        fader = pwmbank.sharedFader()
+        common.driver.instance = common.driver.Driver()
+        self.assertIsNot(fader, pwmbank.sharedFader())
+
+if __name__ == '__main__':
+    unittest.main()
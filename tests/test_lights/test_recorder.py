@@ -0,0 +1,99 @@
+import unittest
+import mocks.mock_micropython
+import common.driver as driver
+import mocks.common.mock_driver as md
+
+import lights.trafficlight as tl
+from common.virtualclock import VirtualClock
+from lights.recorder import Recorder
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = VirtualClock()
+        self._recorder = Recorder(self._clock)
+
+    """
+    Only transitions which change the state of a pin are recorded, at the time they happen
+    """
+    def testTransitions(self):
+        pin1 = self._recorder.pin(1)
+        pin2 = self._recorder.pin(2)
+        self.assertIs(pin1, self._recorder.pin(1))
+
+        pin1.high()
+        self._clock.sleep_ms(100)
+        pin1.value(1)
+        pin2.value(0)
+        self._clock.sleep_ms(50)
+        pin1.low()
+        pin2.high()
+
+        self.assertEqual([(0, 1, 1), (100, 2, 0), (150, 1, 0), (150, 2, 1)], self._recorder.transitions())
+        self.assertEqual([(0, 1, 1), (150, 1, 0)], self._recorder.transitions(1))
+        self.assertEqual([], self._recorder.transitions(3))
+
+    def testOnTime(self):
+        pin = self._recorder.pin(1)
+        pin.high()
+        self._clock.sleep_ms(100)
+        pin.low()
+        self._clock.sleep_ms(100)
+        pin.high()
+        self._clock.sleep_ms(50)
+
+        self.assertEqual(150, self._recorder.onTimeMs(1))
+        self.assertEqual(100, self._recorder.onTimeMs(1, 150))
+        self.assertEqual(0, self._recorder.onTimeMs(2))
+
+class TestSimulatedIntersection(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = VirtualClock()
+        self._recorder = Recorder(self._clock)
+        self._driver = driver.Driver(driver.Driver.MODE.ABSOLUTE, self._clock)
+        driver.instance = self._driver
+
+    def tearDown(self):
+        driver.instance = md.mockDriver
+
+    """
+    Simulate an hour of a 4-way intersection, verifying the time each light spends in each colour and that no two lights
+    ever allow traffic through at the same time
+    """
+    def testFourWayIntersection(self):
+        builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 3, self._recorder)
+        greenTimes = [42, 30, 42, 20]
+        for i in range(4):
+            builder.addTrafficLight(i * 10, i * 10 + 1, i * 10 + 2, greenTimes[i])
+        table = builder.build()
+        period = table.period()
+        self.assertEqual(146000, period)
+
+        cycles = 25
+        self._driver.runFor(cycles * period)
+        self.assertEqual(cycles * period, self._clock.elapsedMs())
+
+        offset = 0
+        for i in range(4):
+            green = greenTimes[i] * 1000
+            self.assertEqual(cycles * green, self._recorder.onTimeMs(i * 10 + 2))
+            self.assertEqual(cycles * 3000, self._recorder.onTimeMs(i * 10 + 1))
+            self.assertEqual(cycles * (period - green - 3000), self._recorder.onTimeMs(i * 10))
+
+            # Every cycle turns green at exactly the same offset (the first light again as the run ends)
+            greens = [t[0] for t in self._recorder.transitions(i * 10 + 2) if t[2]]
+            expected = [offset + c * period for c in range(cycles + 1)]
+            self.assertEqual([t for t in expected if t <= cycles * period], greens)
+            offset += green + 3000
+
+        # At no point is more than one light anything other than red
+        lit = set()
+        for time, pinNum, level in self._recorder.transitions():
+            if pinNum % 10 == 0:
+                continue
+            if level:
+                lit.add(pinNum)
+            else:
+                lit.discard(pinNum)
+            self.assertTrue(len(set(p // 10 for p in lit)) <= 1, (time, lit))
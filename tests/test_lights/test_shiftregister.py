@@ -0,0 +1,99 @@
+import unittest
+import mocks.mock_micropython
+import mocks.micropython.mock_machine as mm
+import common.driver
+import mocks.common.mock_driver as md
+
+import lights.trafficlight as tl
+from lights.shiftregister import ShiftRegister
+
+class TestShiftRegister(unittest.TestCase):
+
+    def setUp(self):
+        mm.resetPinLog()
+        self._spi = mm.SPI(0)
+
+    def testInvalidConfiguration(self):
+        self.assertRaises(ValueError, ShiftRegister, 0, 1, self._spi)
+        self.assertRaises(ValueError, ShiftRegister, 1, 1)
+        self.assertRaises(ValueError, ShiftRegister, 1, 1, None, 2)
+
+    def testInvalidChannel(self):
+        chain = ShiftRegister(2, 1, self._spi)
+        self.assertEqual(16, chain.numChannels())
+        self.assertRaises(ValueError, chain.pin, -1)
+        self.assertRaises(ValueError, chain.pin, 16)
+
+    """
+    The buffer is shifted out over SPI (last register first) and latched, only when something has changed
+    """
+    def testCommitViaSpi(self):
+        chain = ShiftRegister(3, 1, self._spi)
+        chain.commit()
+        self._spi.assertWrites([bytes([0, 0, 0])])
+
+        chain.pin(0).high()
+        chain.pin(7).high()
+        chain.pin(9).high()
+        chain.pin(23).value(1)
+        chain.commit()
+        self._spi.assertWrites([bytes([0, 0, 0]), bytes([0x80, 0x02, 0x81])])
+
+        # Unchanged, nothing is shifted out
+        chain.pin(0).high()
+        chain.pin(1).low()
+        chain.commit()
+        self._spi.assertWrites([bytes([0, 0, 0]), bytes([0x80, 0x02, 0x81])])
+
+        chain.pin(23).low()
+        chain.commit()
+        self._spi.assertWrites([bytes([0, 0, 0]), bytes([0x80, 0x02, 0x81]), bytes([0x00, 0x02, 0x81])])
+
+    """
+    Without SPI the buffer is bit-banged through the data and clock pins, most significant bit first
+    """
+    def testCommitViaBitBang(self):
+        chain = ShiftRegister(2, 1, None, 2, 3)
+        chain.pin(0).high()
+        chain.pin(14).high()
+        chain.commit()
+        chain.pin(0).low()
+        chain.pin(3).high()
+        chain.commit()
+        self.assertEqual([bytes([0x40, 0x01]), bytes([0x40, 0x08])], mm.shiftedBytes(2, 3, 1))
+
+class TestShiftRegisterIntersection(unittest.TestCase):
+
+    def setUp(self):
+        self._spi = mm.SPI(0)
+
+    def tearDown(self):
+        md.mockDriver.reset()
+
+    """
+    The lights of an intersection are mapped onto channels of the chain, with all transitions at the same time shifted
+    out in a single burst
+    """
+    def testRedGreenYellowIntersection(self):
+        chain = ShiftRegister(2, 1, self._spi)
+        builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 3, chain)
+        builder.addTrafficLight(0, 1, 2)
+        builder.addTrafficLight(8, 9, 10)
+        builder.build()
+
+        # Initial state, 1 = green, 2 = red
+        self._spi.assertWrites([bytes([0x01, 0x04])])
+
+        tl.start()
+        # Tick0: 1 - green, unchanged
+        md.mockDriver.step()
+        self._spi.assertWrites([bytes([0x01, 0x04])])
+        # Tick1: 1 = yellow
+        md.mockDriver.step()
+        self._spi.assertWrites([bytes([0x01, 0x04]), bytes([0x01, 0x02])])
+        # Tick2: 1 = red, 2 = green
+        md.mockDriver.step()
+        self._spi.assertWrites([bytes([0x01, 0x04]), bytes([0x01, 0x02]), bytes([0x04, 0x01])])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,15 @@
 import unittest
+import os
+import tempfile
+from unittest import mock
 import mocks.mock_micropython
 import mocks.micropython.mock_machine as mm
 import common.driver
 import mocks.common.mock_driver as md
 
 import lights.trafficlight as tl
+from common.virtualclock import VirtualClock
+from lights.recorder import Recorder
 
 class TestTrafficLight(unittest.TestCase):
 
@@ -15,7 +20,7 @@ class TestTrafficLight(unittest.TestCase):
         self._light._lights[0].assertPin(1, mm.Pin.OUT)
         self._light._lights[1].assertPin(2, mm.Pin.OUT)
         self._light._lights[2].assertPin(3, mm.Pin.OUT)
-        self.assertEqual(4, self._light._greenTime)
+        self.assertEqual(4000, self._light._greenTimeMs)
 
     def testRedLed(self):
         self._light._lights[0].assertState(False)
@@ -38,6 +43,28 @@ class TestTrafficLight(unittest.TestCase):
         self._light.offGreen()
         self._light._lights[2].assertState(False)
 
+    """
+    Changes which do not alter the state of an LED are not written to the pin
+    """
+    def testRedundantWritesSkipped(self):
+        # Turning all off at creation is always written
+        self.assertEqual((3, 0), self._light.writeStats())
+        self._light.offRed()
+        self._light.offGreen()
+        self.assertEqual((3, 2), self._light.writeStats())
+
+        self._light.onRed()
+        self._light.onRed()
+        self._light._lights[0].assertState(True)
+        self.assertEqual((4, 3), self._light.writeStats())
+
+        # The pin is not touched when skipped
+        self._light._lights[0].low()
+        self._light.onRed()
+        self._light._lights[0].assertState(False)
+        self._light.offRed()
+        self.assertEqual((5, 4), self._light.writeStats())
+
 class TestLightAction(unittest.TestCase):
 
     def testVerifyRedColor(self):
@@ -66,20 +93,22 @@ class TestHelperFunctions(unittest.TestCase):
     def tearDown(self):
         md.mockDriver.reset()
 
-    def testCallForTrafficLightReferences(self):
-        self.assertEqual(self._light.onRed, tl._callForTrafficLight(self._light, tl.TrafficLight.COLOUR.RED, True))
-        self.assertEqual(self._light.offRed, tl._callForTrafficLight(self._light, tl.TrafficLight.COLOUR.RED, False))
-        self.assertEqual(self._light.onGreen, tl._callForTrafficLight(self._light, tl.TrafficLight.COLOUR.GREEN, True))
-        self.assertEqual(self._light.offGreen, tl._callForTrafficLight(self._light, tl.TrafficLight.COLOUR.GREEN, False))
-        self.assertEqual(self._light.onYellow, tl._callForTrafficLight(self._light, tl.TrafficLight.COLOUR.YELLOW, True))
-        self.assertEqual(self._light.offYellow, tl._callForTrafficLight(self._light, tl.TrafficLight.COLOUR.YELLOW, False))
+    def testActionReferences(self):
+        self.assertEqual(self._light.onRed, self._light.action(tl.TrafficLight.COLOUR.RED, True))
+        self.assertEqual(self._light.offRed, self._light.action(tl.TrafficLight.COLOUR.RED, False))
+        self.assertEqual(self._light.onGreen, self._light.action(tl.TrafficLight.COLOUR.GREEN, True))
+        self.assertEqual(self._light.offGreen, self._light.action(tl.TrafficLight.COLOUR.GREEN, False))
+        self.assertEqual(self._light.onYellow, self._light.action(tl.TrafficLight.COLOUR.YELLOW, True))
+        self.assertEqual(self._light.offYellow, self._light.action(tl.TrafficLight.COLOUR.YELLOW, False))
+        self.assertRaises(ValueError, self._light.action, 3, True)
 
     def testRegisterPattern(self):
         actions = [tl.LightAction(tl.TrafficLight.COLOUR.RED, False, 123),
                    tl.LightAction(tl.TrafficLight.COLOUR.YELLOW, False, 321),
                    tl.LightAction(tl.TrafficLight.COLOUR.GREEN, False, 123)]
-        tl._registerPattern(self._light, actions)
-        md.assertTasksRegistered(lightActionToTupple(self._light, actions))
+        schedule = common.driver.Schedule()
+        tl._registerPattern(schedule, self._light, actions)
+        md.assertTasksRegistered(lightActionToTupple(self._light, actions), schedule)
 
     def testLimitToPeriod(self):
         # Invalid values raise error
@@ -101,12 +130,26 @@ class IntersectionBuilderTest(unittest.TestCase):
     def tearDown(self):
         md.mockDriver.reset()
 
+    """
+    An intersection without traffic lights has nothing to build
+    """
+    def testBuildWithoutTrafficLights(self):
+        builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW)
+        schedules = len(md.mockDriver._schedules)
+        self.assertIsNone(builder.build())
+        self.assertEqual(schedules, len(md.mockDriver._schedules))
+        self.assertIsNone(builder.bootMs())
+
+        # Traffic lights can still be added and built afterwards
+        builder.addTrafficLight(1, 2, 3)
+        self.assertEqual(4, len(builder.build()))
+
     def testRedGreenYellowIntersection(self):
         builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW)
         builder.addTrafficLight(1, 2, 3)
         builder.addTrafficLight(4, 5, 6)
-        builder.build()
-        md.assertNumTasksRegistered(12)
+        table = builder.build()
+        self.assertEqual(12, len(table))
         traffic1 = builder._trafficLight[0]
         traffic2 = builder._trafficLight[1]
 
@@ -140,15 +183,15 @@ class IntersectionBuilderTest(unittest.TestCase):
         assertLightState(traffic2, False, True, False)
         self.assertFalse(md.mockDriver.hasLooped())
 
-        # Tick4: 1 = none, 2 = red
+        # Tick4: 1 = red, 2 = red
         md.mockDriver.step()
-        assertLightState(traffic1, False, False, False)
+        assertLightState(traffic1, True, False, False)
         assertLightState(traffic2, True, False, False)
         self.assertTrue(md.mockDriver.hasLooped())
 
         # Tick5: 1 = green, 2 = red
         # This is when it returns to the start and turn on green again
-        # Previous ticks is just half the transition
+        # The previous tick ends the cycle with all lights red
         md.mockDriver.step()
         assertLightState(traffic1, False, False, True)
         assertLightState(traffic2, True, False, False)
@@ -158,8 +201,8 @@ class IntersectionBuilderTest(unittest.TestCase):
         builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_REDYELLOW_GREEN_YELLOW, 1)
         builder.addTrafficLight(1, 2, 3, 1)
         builder.addTrafficLight(4, 5, 6, 2)
-        builder.build()
-        md.assertNumTasksRegistered(16)
+        table = builder.build()
+        self.assertEqual(16, len(table))
         traffic1 = builder._trafficLight[0]
         traffic2 = builder._trafficLight[1]
 
@@ -193,26 +236,279 @@ class IntersectionBuilderTest(unittest.TestCase):
         assertLightState(traffic2, False, True, False)
         self.assertFalse(md.mockDriver.hasLooped())
 
-        # Tick4: 1 = none, 2 = red
+        # Tick4: 1 = red+yellow, 2 = red
         md.mockDriver.step()
-        assertLightState(traffic1, False, False, False)
+        assertLightState(traffic1, True, True, False)
         assertLightState(traffic2, True, False, False)
         self.assertTrue(md.mockDriver.hasLooped())
 
         # Tick5: 1 = green, 2 = red
         # This is when it returns to the start and turn on green again
-        # Previous ticks is just half the transition
+        # The red+yellow of the previous tick is turned off along with the green turning on
         md.mockDriver.step()
         assertLightState(traffic1, False, False, True)
         assertLightState(traffic2, True, False, False)
         self.assertFalse(md.mockDriver.hasLooped())
 
+    def testWriteStats(self):
+        builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_REDYELLOW_GREEN_YELLOW, 1)
+        builder.addTrafficLight(1, 2, 3, 1)
+        builder.addTrafficLight(4, 5, 6, 2)
+        builder.build()
+        # Initial all off and the initial green/red
+        self.assertEqual((8, 0), builder.writeStats())
+
+        # The first step turns red and yellow off and green on for the first light, which it already is
+        tl.start()
+        md.mockDriver.step()
+        self.assertEqual((8, 3), builder.writeStats())
+        for i in range(4):
+            md.mockDriver.step()
+        self.assertEqual((8 + 13, 3), builder.writeStats())
+
+    def testSubSecondIntersection(self):
+        builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 0.5)
+        builder.addTrafficLight(1, 2, 3, 1.25)
+        builder.addTrafficLight(4, 5, 6, 0.75)
+        table = builder.build()
+        self.assertEqual(12, len(table))
+        traffic1 = builder._trafficLight[0]
+        traffic2 = builder._trafficLight[1]
+        RED = tl.TrafficLight.COLOUR.RED
+        YELLOW = tl.TrafficLight.COLOUR.YELLOW
+        GREEN = tl.TrafficLight.COLOUR.GREEN
+        assertTransitions(table, [
+            (0, traffic1, RED, 0),
+            (0, traffic1, GREEN, 1),
+            (1250, traffic1, GREEN, 0),
+            (1250, traffic1, YELLOW, 1),
+            (1750, traffic1, YELLOW, 0),
+            (1750, traffic1, RED, 1),
+            (1750, traffic2, RED, 0),
+            (1750, traffic2, GREEN, 1),
+            (2500, traffic2, GREEN, 0),
+            (2500, traffic2, YELLOW, 1),
+            (3000, traffic2, YELLOW, 0),
+            (3000, traffic2, RED, 1)])
+
+    def testIntersectionsWithDifferentPeriods(self):
+        builder1 = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW)
+        builder1.addTrafficLight(1, 2, 3, 20)
+        builder1.addTrafficLight(4, 5, 6, 25)
+        table1 = builder1.build()
+        builder2 = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_REDYELLOW_GREEN_YELLOW)
+        builder2.addTrafficLight(7, 8, 9, 45)
+        builder2.addTrafficLight(10, 11, 12, 45)
+        table2 = builder2.build()
+
+        # Each intersection is driven by its own table, repeating with its own period
+        self.assertEqual([table1, table2], md.mockDriver._schedules[-2:])
+        self.assertEqual(51000, table1.period())
+        self.assertEqual(96000, table2.period())
+        self.assertEqual(12, len(table1))
+        self.assertEqual(16, len(table2))
+
+class IntersectionReconfigureTest(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = VirtualClock()
+        self._recorder = Recorder(self._clock)
+        self._driver = common.driver.Driver(common.driver.Driver.MODE.ABSOLUTE, self._clock)
+        common.driver.instance = self._driver
+        self._builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 3, self._recorder)
+        self._builder.addTrafficLight(0, 1, 2, 10)
+        self._builder.addTrafficLight(10, 11, 12, 20)
+
+    def tearDown(self):
+        common.driver.instance = md.mockDriver
+
+    """
+    Reconfiguring before building simply changes what is built
+    """
+    def testBeforeBuild(self):
+        self._builder.setGreenTime(1, 25)
+        self._builder.addTrafficLight(20, 21, 22, 5)
+        self._builder.removeTrafficLight(0)
+        self.assertEqual(36000, self._builder.build().period())
+        self.assertRaises(ValueError, self._builder.setGreenTime, 2, 5)
+        self.assertRaises(ValueError, self._builder.removeTrafficLight, -1)
+
+    """
+    Changing the green time while running takes effect from the next cycle, keeping the phase of the intersection
+    """
+    def testChangeGreenTime(self):
+        table = self._builder.build()
+        self._at(5000, lambda: self._builder.setGreenTime(0, 15))
+        self._driver.runFor(36000 + 41000 + 41000)
+
+        self.assertEqual(41000, table.period())
+        self.assertEqual([0, 36000, 77000, 118000], self._greens(2))
+        self.assertEqual([13000, 36000 + 18000, 77000 + 18000], self._greens(12))
+        self.assertEqual(10000 + 15000 + 15000, self._recorder.onTimeMs(2, 36000 + 41000 + 41000))
+        self.assertEqual(3 * 20000, self._recorder.onTimeMs(12, 36000 + 41000 + 41000))
+        self.assertEqual(3 * 3000, self._recorder.onTimeMs(11, 36000 + 41000 + 41000))
+
+    """
+    Only the changed traffic light, those following it and the first (whose pattern ends with the period) are recomputed
+    """
+    def testOnlyAffectedRecomputed(self):
+        self._builder.addTrafficLight(20, 21, 22, 5)
+        self._builder.addTrafficLight(30, 31, 32, 5)
+        table = self._builder.build()
+
+        # The changes are staged (and merged) as a single batch
+        with mock.patch.object(table, '_prepareSplice', wraps=table._prepareSplice) as prepare:
+            self._builder.setGreenTime(2, 8)
+        self.assertEqual(1, prepare.call_count)
+        lights = self._builder._trafficLight
+        self.assertEqual(set([lights[0], lights[2], lights[3]]), set(table._staged.keys()))
+
+    """
+    Shortening the period of an intersection whose first light shows red and yellow at the end of the period restages the
+    first light as well, so that none of its transitions remain beyond the new period (and the deadlines never go back)
+    """
+    def testShortenRedYellowPeriod(self):
+        builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_REDYELLOW_GREEN_YELLOW, 3, self._recorder)
+        for i in range(3):
+            builder.addTrafficLight(40 + i * 10, 41 + i * 10, 42 + i * 10, 42)
+        table = builder.build()
+        deadlines = []
+        fire = table._fire
+        table._fire = lambda: deadlines.append(self._driver._now) or fire()
+
+        self._at(5000, lambda: builder.setGreenTime(2, 10))
+        self._driver.runFor(135000 + 103000 + 103000)
+
+        self.assertEqual(103000, table.period())
+        self.assertTrue(max(table._times) <= table.period())
+        self.assertEqual(sorted(deadlines), deadlines)
+        self.assertEqual([0, 135000, 238000, 341000], self._greens(42))
+        # Yellow follows each green, and is shown together with red for the last 3s ahead of the next green
+        self.assertEqual([42000, 132000, 177000, 235000, 280000, 338000], [t[0] for t in self._recorder.transitions(41) if t[2]])
+
+    """
+    Lights added while running join at the end of the next cycle, and removed lights are turned off
+    """
+    def testAddRemoveWhileRunning(self):
+        table = self._builder.build()
+        self._at(5000, lambda: self._builder.addTrafficLight(20, 21, 22, 5))
+        self._at(40000, lambda: self._builder.removeTrafficLight(1))
+        self._driver.runFor(36000 + 44000 + 21000)
+
+        self.assertEqual(21000, table.period())
+        self.assertEqual([0, 36000, 80000, 101000], self._greens(2))
+        self.assertEqual([13000, 36000 + 13000], self._greens(12))
+        self.assertEqual([36000 + 36000, 80000 + 13000], self._greens(22))
+
+        # Red from the start of the cycle in which it joins, off once removed
+        self.assertEqual((36000, 20, 1), self._recorder.transitions(20)[1])
+        self.assertEqual((80000, 10, 0), self._recorder.transitions(10)[-1])
+        self.assertRaises(ValueError, self._builder.removeTrafficLight, 5)
+
+    def testCannotRemoveOnlyLight(self):
+        self._builder.removeTrafficLight(1)
+        self._builder.build()
+        self.assertRaises(ValueError, self._builder.removeTrafficLight, 0)
+
+    def _at(self, timeMs, task):
+        schedule = common.driver.Schedule(1 << 28)
+        schedule.registerMs(timeMs, task)
+        self._driver.add(schedule)
+
+    def _greens(self, pinNum):
+        return [t[0] for t in self._recorder.transitions(pinNum) if t[2]]
+
+class IntersectionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = VirtualClock()
+        self._recorder = Recorder(self._clock)
+        self._driver = common.driver.Driver(common.driver.Driver.MODE.ABSOLUTE, self._clock)
+        common.driver.instance = self._driver
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, 'intersection.bin')
+        self._bootTicks = tl._bootTicks
+
+    def tearDown(self):
+        common.driver.instance = md.mockDriver
+        tl._bootTicks = self._bootTicks
+        if os.path.exists(self._path):
+            os.remove(self._path)
+        os.rmdir(self._dir)
+
+    """
+    The first build compiles and saves the table, with later builds of the same config loading it without computing
+    the patterns
+    """
+    def testBuildFromCache(self):
+        compiled = self._builder(10).build(self._path)
+        self.assertTrue(os.path.exists(self._path))
+
+        # The pins are not part of the config
+        builder = self._builder(10, 200)
+        builder._createPatterns = None
+        loaded = builder.build(self._path)
+        self.assertEqual(compiled.period(), loaded.period())
+        self.assertEqual(list(compiled._times), list(loaded._times))
+        self.assertEqual(list(compiled._channels), list(loaded._channels))
+        self.assertEqual(list(compiled._levels), list(loaded._levels))
+
+        # The loaded table drives the lights as the compiled one would
+        self._driver.runFor(36000)
+        self.assertEqual([0, 36000], [t[0] for t in self._recorder.transitions(202) if t[2]])
+        self.assertEqual([13000], [t[0] for t in self._recorder.transitions(212) if t[2]])
+
+    """
+    A change to the config recompiles the table, replacing the cached one
+    """
+    def testConfigChanged(self):
+        self._builder(10).build(self._path)
+        builder = self._builder(12)
+        self.assertNotEqual(self._builder(10).configHash(), builder.configHash())
+        self.assertEqual(38000, builder.build(self._path).period())
+
+        builder = self._builder(12)
+        builder._createPatterns = None
+        self.assertEqual(38000, builder.build(self._path).period())
+
+    """
+    The time from boot until the first transitions is measured, with both read from the clock of the driver
+    """
+    def testBootMs(self):
+        self.assertIs(self._clock, self._driver.clock())
+        tl._bootTicks = self._clock.ticks_ms()
+        builder = self._builder(10)
+        self.assertIsNone(builder.bootMs())
+        self._clock.advance(250)
+        builder.build()
+        self.assertIsNone(builder.bootMs())
+        self._clock.advance(50)
+        self._driver.runFor(1000)
+        self.assertEqual(300, builder.bootMs())
+
+        # Measured against the clock of the driver the intersection was built for, even once the driver.instance is replaced
+        common.driver.instance = md.mockDriver
+        self.assertEqual(300, builder.bootMs())
+
+    def _builder(self, greenTimeSec, basePin = 100):
+        builder = tl.IntersectionBuilder(tl.IntersectionBuilder.TYPE.RED_GREEN_YELLOW, 3, self._recorder)
+        builder.addTrafficLight(basePin, basePin + 1, basePin + 2, greenTimeSec)
+        builder.addTrafficLight(basePin + 10, basePin + 11, basePin + 12, 20)
+        return builder
+
 def lightActionToTupple(light, lightActions):
     converted = []
     for act in lightActions:
-        converted.append(md.TaskTupple(act._time, tl._callForTrafficLight(light, act._colour, act._isOn)))
+        converted.append(md.TaskTupple(act._time, light.action(act._colour, act._isOn)))
     return converted
 
+def assertTransitions(table, expectedTransitions):
+    assert len(expectedTransitions) == len(table), 'Incorrect number of transitions, expected ' + str(len(expectedTransitions)) + ' but was ' + str(len(table))
+    for i in range(len(table)):
+        c = table._channels[i]
+        actual = (table._times[i], table._lights[c], table._aspects[c], table._levels[i])
+        assert expectedTransitions[i] == actual, 'Different transition at position ' + str(i) + '. Expected ' + str(expectedTransitions[i]) + ' but was ' + str(actual)
+
 def assertLightState(trafficLight, redState, yellowState, greenState):
     trafficLight._lights[0].assertState(redState)
     trafficLight._lights[1].assertState(yellowState)